@@ -1,33 +1,147 @@
 import sys
+import argparse
 from app.parser.parser import Parser
-from app.evaluator.interpreter import Interpreter
-from app.evaluator.tokenizer import tokenize  # 如果你有词法分析模块
+from app.evaluator.interpreter import Interpreter, StackOverflow, DEFAULT_MAX_DEPTH
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.vm import VM
+from app.evaluator.bytecode import compile_program, disassemble
+from app.evaluator.transpiler import PythonInterpreter, transpile
+from app.evaluator import optimizer, shortcircuit
+from app.evaluator.feeds import ConsoleFeed, InputExhausted, MmapFeed
+from app.evaluator.limits import ExecutionLimitExceeded
+from app.evaluator.sinks import FLUSH_POLICIES, FileSink, OutputLimitExceeded, StdoutSink
+from app.evaluator.tokenizer import tokenize_iter  # 如果你有词法分析模块
+from app.parser import cache
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: ciecs <filename>")
-        sys.exit(1)
-
-    filename = sys.argv[1]
+# 可选的执行引擎，输出必须一致
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "vm": VM,
+    "python": PythonInterpreter,
+}
 
+def load_program(filename, use_cache=True, cache_dir=None):
     if not filename.endswith(".pseudo"):
         print("Error: File must have a .pesudo extension")
         sys.exit(1)
 
+    # 解析结果缓存在 __pseudocache__ 里，源码没变就不用重新解析
+    if use_cache:
+        return cache.load_program(filename, cache_dir)
+
+    # 边读文件边做词法分析，parser 按需取 token，大文件也不用整个读进内存
+    with open(filename, "r", encoding="utf-8-sig") as f:
+        parser = Parser(tokenize_iter(f))
+        return parser.parse()
+
+def add_cache_arguments(arg_parser):
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="always parse the source, do not read or write the AST cache")
+    arg_parser.add_argument("--cache-dir",
+                            help=f"AST cache directory (default: {cache.CACHE_DIR_NAME} next to the source file)")
+
+def add_optimize_arguments(arg_parser):
+    arg_parser.add_argument("-O", "--optimize", action="store_true",
+                            help="fold constant expressions and drop IF branches that can never run")
+
+def transpile_main(argv):
+    # ciecs transpile <filename>.pseudo [-o out.py]
+    arg_parser = argparse.ArgumentParser(prog="ciecs transpile")
+    arg_parser.add_argument("filename")
+    arg_parser.add_argument("-o", "--output", help="write the Python module here instead of stdout")
+    add_cache_arguments(arg_parser)
+    add_optimize_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
 
-    with open(filename, "r", encoding="utf-8") as f:
-        code = f.read()
+    program = load_program(args.filename, not args.no_cache, args.cache_dir)
+    if args.optimize:
+        program = optimizer.optimize(program)
+    source = transpile(program)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(source)
+    else:
+        print(source, end="")
 
-    # 词法分析
-    tokens = tokenize(code)
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "transpile":
+        transpile_main(sys.argv[2:])
+        return
+
+    arg_parser = argparse.ArgumentParser(prog="ciecs")
+    arg_parser.add_argument("filename")
+    arg_parser.add_argument("--engine", choices=sorted(ENGINES), default="tree",
+                            help="execution engine (default: tree)")
+    arg_parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                            help=f"maximum nested calls before a stack overflow (default: {DEFAULT_MAX_DEPTH})")
+    arg_parser.add_argument("--seed", type=int, default=None,
+                            help="seed for RAND, the same seed gives the same numbers on every engine")
+    arg_parser.add_argument("--output", metavar="FILE",
+                            help="write the program's OUTPUT to FILE instead of stdout")
+    arg_parser.add_argument("--max-output", type=int, default=None, metavar="BYTES",
+                            help="stop the program once its output passes this many bytes")
+    arg_parser.add_argument("--flush", choices=FLUSH_POLICIES, default=None,
+                            help="when OUTPUT is written out: every line, in blocks, or at the end "
+                                 "(default: line on a terminal, block otherwise)")
+    arg_parser.add_argument("--input", metavar="FILE",
+                            help="read INPUT values from FILE, one per line, instead of asking")
+    arg_parser.add_argument("--no-prompt", action="store_true",
+                            help="do not show the 'Enter value for ...' prompt before INPUT")
+    arg_parser.add_argument("--max-steps", type=int, default=None, metavar="N",
+                            help="stop the program after N loop iterations and calls in total")
+    arg_parser.add_argument("--time-limit", type=float, default=None, metavar="SECONDS",
+                            help="stop the program once it has run this long")
+    arg_parser.add_argument("--dis", action="store_true",
+                            help="print the bytecode listing instead of running")
+    arg_parser.add_argument("--dump-ast", action="store_true",
+                            help="print the AST before and after optimization instead of running")
+    arg_parser.add_argument("--check-short-circuit", action="store_true",
+                            help="list AND / OR expressions whose right side calls a function that may be skipped, "
+                                 "instead of running")
+    add_cache_arguments(arg_parser)
+    add_optimize_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    ast = load_program(args.filename, not args.no_cache, args.cache_dir)
+
+    if args.dump_ast:
+        print("# parsed")
+        print(optimizer.dump(ast))
+        print("# optimized")
+        print(optimizer.dump(optimizer.optimize(ast)))
+        return
 
-    # 语法分析
-    parser = Parser(tokens)
-    ast = parser.parse()
+    if args.check_short_circuit:
+        print(shortcircuit.report(ast))
+        return
+
+    # 优化在 --dis 之前做，反汇编看到的就是实际执行的代码
+    if args.optimize:
+        ast = optimizer.optimize(ast)
+
+    if args.dis:
+        print(disassemble(compile_program(ast)))
+        return
 
     # 执行
-    interpreter = Interpreter()
-    interpreter.eval(ast)
+    if args.output:
+        sink = FileSink(args.output, flush=args.flush or "block", limit=args.max_output)
+    else:
+        flush = args.flush or ("line" if sys.stdout.isatty() else "block")
+        sink = StdoutSink(flush=flush, limit=args.max_output)
+    feed = MmapFeed(args.input) if args.input else ConsoleFeed()
+    interpreter = ENGINES[args.engine](max_depth=args.max_depth, seed=args.seed, output=sink,
+                                       input=feed, prompts=False if args.no_prompt else None,
+                                       max_steps=args.max_steps, time_limit=args.time_limit)
+    try:
+        interpreter.eval(ast)
+    except (StackOverflow, OutputLimitExceeded, InputExhausted, ExecutionLimitExceeded) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        sink.close()
+        feed.close()
 
 if __name__ == "__main__":
     main()
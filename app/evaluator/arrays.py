@@ -0,0 +1,119 @@
+import array
+
+from app.evaluator.converters import converter
+
+# 这几种基本类型用 array.array 连续存放，其余（STRING、CHAR、DATE、自定义类型）用 list
+TYPECODES = {"INTEGER": "q", "REAL": "d", "BOOLEAN": "b"}
+
+
+def _unchanged(value):
+    return value
+
+
+def whole_index(ind, dim, name):
+    # 不是 int 的下标：整数值的 REAL（比如 4 / 2 的结果）当整数用，其余报错
+    if isinstance(ind, float) and ind.is_integer() or isinstance(ind, int):
+        return int(ind)
+    raise Exception(f"Index {ind} is not a whole number for dimension {dim} of array '{name}'")
+
+
+class PseudoArray:
+    # DECLARE A : ARRAY[l1:u1, l2:u2] OF T 的运行时对象。
+    # 元素按行优先连续存放，strides 在创建时算好，下标换算成一个偏移量。
+    __slots__ = ("name", "base_type", "lowers", "uppers", "strides", "ndim",
+                 "lo0", "hi0", "lo1", "hi1", "stride0", "data", "is_bool", "convert")
+
+    def __init__(self, name, lowers, uppers, base_type, default):
+        self.name = name
+        self.base_type = base_type
+        self.convert = converter(base_type) or _unchanged  # 元素赋值时的转换，按 base type 定一次
+        self.lowers = list(lowers)
+        self.uppers = list(uppers)
+        self.ndim = len(self.lowers)
+        dims = [max(hi - lo + 1, 0) for lo, hi in zip(self.lowers, self.uppers)]
+        strides = [1] * self.ndim
+        for k in range(self.ndim - 2, -1, -1):
+            strides[k] = strides[k + 1] * dims[k + 1]
+        self.strides = strides
+        size = strides[0] * dims[0] if dims else 0
+
+        # 1D / 2D 快速路径用到的边界
+        self.lo0, self.hi0 = self.lowers[0], self.uppers[0]
+        self.lo1, self.hi1 = (self.lowers[1], self.uppers[1]) if self.ndim > 1 else (0, -1)
+        self.stride0 = strides[0]
+
+        typecode = TYPECODES.get(base_type)
+        self.is_bool = base_type == "BOOLEAN"
+        if typecode is not None:
+            self.data = array.array(typecode, [default]) * size
+        else:
+            self.data = [default] * size
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        bounds = ", ".join(f"{lo}:{hi}" for lo, hi in zip(self.lowers, self.uppers))
+        return f"ARRAY[{bounds}] OF {self.base_type}"
+
+    def offset(self, indices):
+        lowers = self.lowers
+        if len(indices) != len(lowers):
+            raise Exception(f"Incorrect number of indices for array '{self.name}'")
+        pos = 0
+        for i, ind in enumerate(indices):
+            if ind.__class__ is not int:
+                ind = whole_index(ind, i + 1, self.name)
+            lo = lowers[i]
+            if not (lo <= ind <= self.uppers[i]):
+                raise Exception(f"Index {ind} out of bounds for dimension {i+1} of array '{self.name}'")
+            pos += (ind - lo) * self.strides[i]
+        return pos
+
+    # ---- 按偏移量读写（指针 / BYREF 的 Reference 也走这里）----
+    def __getitem__(self, pos):
+        value = self.data[pos]
+        return bool(value) if self.is_bool else value
+
+    def __setitem__(self, pos, value):
+        try:
+            self.data[pos] = value
+        except (TypeError, OverflowError):
+            # 放不进 array.array（超出 64 位的整数、经指针写入的其他类型），改用 list
+            self.data = [bool(v) for v in self.data] if self.is_bool else list(self.data)
+            self.is_bool = False
+            self.data[pos] = value
+
+    # ---- 按下标读写 ----
+    def get(self, indices):
+        return self[self.offset(indices)]
+
+    def set(self, indices, value):
+        self[self.offset(indices)] = value
+
+    # 快速路径只收 int 下标，其余的走 offset 换算 / 报错
+    def get1(self, i):
+        if self.ndim == 1 and i.__class__ is int and self.lo0 <= i <= self.hi0:
+            value = self.data[i - self.lo0]
+            return bool(value) if self.is_bool else value
+        return self.get((i,))
+
+    def set1(self, i, value):
+        if self.ndim == 1 and i.__class__ is int and self.lo0 <= i <= self.hi0:
+            self[i - self.lo0] = value
+        else:
+            self.set((i,), value)
+
+    def get2(self, i, j):
+        if (self.ndim == 2 and i.__class__ is int and j.__class__ is int
+                and self.lo0 <= i <= self.hi0 and self.lo1 <= j <= self.hi1):
+            value = self.data[(i - self.lo0) * self.stride0 + j - self.lo1]
+            return bool(value) if self.is_bool else value
+        return self.get((i, j))
+
+    def set2(self, i, j, value):
+        if (self.ndim == 2 and i.__class__ is int and j.__class__ is int
+                and self.lo0 <= i <= self.hi0 and self.lo1 <= j <= self.hi1):
+            self[(i - self.lo0) * self.stride0 + j - self.lo1] = value
+        else:
+            self.set((i, j), value)
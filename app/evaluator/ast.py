@@ -1,181 +1,292 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import Optional
 
+# 节点都是 __slots__ 的 dataclass：没有实例 __dict__，不能加槽位以外的属性。
+# 没用 frozen：内存一样，构造却慢一倍多（解析慢三成）。语法字段构造后按约定不改（parser 会共用字面量节点）。
+# resolver 的标注（scope / slot / nlocals / global_names / exact / table / builtin）是可写的槽位，
+# 用 annotate() 写入，不参与比较和 repr；一棵树只解析一次，要两套标注就复制一棵（见 optimizer.copy）。
+_node = dataclass(slots=True)
+
+
+def _annotation(default=None):
+    return field(default=default, init=False, repr=False, compare=False)
+
+
+def _line():
+    # 语句所在的源码行（parser 填写，手工构造的为 0），报错和分析报告用；不参与比较和 repr
+    return field(default=0, repr=False, compare=False)
+
+
+def annotate(target, **values):
+    for name, value in values.items():
+        object.__setattr__(target, name, value)
+
+
+def number_value(text):
+    # 字面量在解析时就转成 int / float
+    return float(text) if "." in text else int(text)
+
+
 class Node:
-    pass
+    __slots__ = ()
 
 class Statement:
-    pass
+    __slots__ = ()
 
 class Expr:
-    pass
+    __slots__ = ()
 
 class Stmt:
-    pass
+    __slots__ = ()
 
-@dataclass
+@_node
 class Program(Node):
     statements: list[Node]
+    global_names: list = _annotation()  # resolver 填写：全局槽位 -> 名字
 
-@dataclass
+@_node
 class Declare(Node):
     name: str
     type: str
+    line: int = _line()
+    scope: int = _annotation()   # resolver 填写：LOCAL / GLOBAL / REF / CONST
+    slot: object = _annotation()
 
-@dataclass
+@_node
 class Assign:
     target: any  # Var or FieldAccess
     value: any   # expression
+    line: int = _line()
+    exact: bool = _annotation(False)  # 右边已经是目标的声明类型，不用转换（converters.mark_exact_stores 填写）
 
-@dataclass
+@_node
 class Number(Node):
-    value: float
+    value: int | float
 
-@dataclass
+    def __post_init__(self):
+        # 手工构造的 Number("3") 也一样转成数值
+        if isinstance(self.value, str):
+            object.__setattr__(self, "value", number_value(self.value))
+
+@_node
 class Var(Node):
     name: str
+    scope: int = _annotation()   # resolver 填写：LOCAL / GLOBAL / REF / CONST
+    slot: object = _annotation()
 
-@dataclass
+@_node
 class BinaryOp(Node):
     left: Node
     operator: str
     right: Node
 
-@dataclass
+@_node
 class UnaryOp(Node):
     operator: str
     operand: Node
 
-@dataclass
+@_node
 class If(Node):
     condition: Node
     body: list[Node]
     else_body: Optional[list[Node]] = None
 
-@dataclass
+@_node
 class Output(Node):
     values: list[Node]
+    line: int = _line()
 
-@dataclass
+@_node
 class String(Node):
     value: str
 
-@dataclass
+@_node
+class Boolean(Node):  # 优化器折叠出来的 TRUE / FALSE 常量
+    value: bool
+
+@_node
 class While(Node):
     condition: Node
     body: list[Node]
+    line: int = _line()
 
-@dataclass
+@_node
 class If(Node):
     condition: Node
     then_body: list
     else_body: list | None = None
+    line: int = _line()
 
-@dataclass
+@_node
 class For(Node):
     var_name: str
     start: Node
     end: Node
     body: list[Node]
+    step: Node = None            # 没写 STEP 就是 1
+    line: int = _line()
+    scope: int = _annotation()   # resolver 填写：LOCAL / GLOBAL / REF / CONST
+    slot: object = _annotation()
 
 
+@_node
 class RepeatUntil(Node):
-    def __init__(self, body, condition):
-        self.body = body  # list of statements
-        self.condition = condition  # expression
+    body: list  # list of statements
+    condition: Node  # expression
+    line: int = _line()
 
-@dataclass
+@_node
 class CaseOf(Statement):
     expr: Expr
     cases: list[tuple[Expr, list[Statement]]]  # ← 应是 Expr
     otherwise: Optional[list[Statement]]
+    line: int = _line()
+    table: object = _annotation()  # 跳转表（cases.case_table 建），标签不全是常量时为 False
 
-@dataclass
+@_node
+class CaseRange(Node):  # CASE 里的范围标签 1 TO 10
+    low: Node
+    high: Node
+
+@_node
 class Input(Statement):
     var_name: str
+    line: int = _line()
+    scope: int = _annotation()   # resolver 填写：LOCAL / GLOBAL / REF / CONST
+    slot: object = _annotation()
 
-@dataclass
+@_node
 class TypeDef:
     name: str
     fields: list[tuple[str, str]]  # [(field_name, field_type)]
+    line: int = _line()
 
-@dataclass
+@_node
 class FieldAccess(Expr):  # 如果你有 Expr 基类
     var_name: str
     field_name: str
+    scope: int = _annotation()   # resolver 填写：LOCAL / GLOBAL / REF / CONST
+    slot: object = _annotation()
 
-@dataclass
+@_node
 class Param:
     name: str
     type: str
     byref: bool
 
-@dataclass
+@_node
 class ProcedureDef:
     name: str
     params: list[Param]
     body: list[Stmt]
     access: str = "PUBLIC"   # 默认 PUBLIC
+    line: int = _line()
+    nlocals: int = _annotation(0)    # resolver 填写：帧的槽位数
 
-@dataclass
+@_node
 class FunctionDef:
     name: str
     params: list[Param]
     return_type: str
     body: list[Stmt]
     access: str = "PUBLIC"   # 默认 PUBLIC
+    line: int = _line()
+    nlocals: int = _annotation(0)    # resolver 填写：帧的槽位数
 
-@dataclass
+@_node
 class Call:
     name: str
     args: list[Expr]
+    builtin: object = _annotation()  # resolver 填写：内建函数的名字（大写），不是内建为 False
 
-@dataclass
+@_node
 class CallStmt(Stmt):  # 作为语句的 CALL，比如 CALL Increment(v)
     call: Call
+    line: int = _line()
 
-@dataclass
+@_node
 class Return(Stmt):
     expr: Optional[Expr]
+    line: int = _line()
 
-@dataclass
+@_node
 class ArrayType:
     lowers: list[int]      # [1] 或 [1,1]
     uppers: list[int]      # [5] 或 [3,3]
     base_type: str         # "INTEGER", "REAL", etc.
 
-@dataclass
+@_node
 class ArrayAccess:
     name: str
     indices: list[Expr]  # 每个维度的表达式
+    scope: int = _annotation()   # resolver 填写：LOCAL / GLOBAL / REF / CONST
+    slot: object = _annotation()
 
-@dataclass
+@_node
 class AddressOf:
     target: Expr  # 比如 Var("x") 表示 ^x
 
-@dataclass
+@_node
 class Dereference:
     pointer: Expr  # 比如 Var("p") 表示 p^
 
-@dataclass
+@_node
 class PointerRef:
     var_name: str  # 表示指向哪个变量
 
-@dataclass
+@_node
 class PointerType:
     base_type: str  # e.g., "INTEGER", "REAL", etc.
 
-@dataclass
+@_node
 class ClassDef:
     name: str
     fields: list  # [(access, name, type)]
     methods: list  # [ProcedureDef / FunctionDef with access]
+    line: int = _line()
 
-@dataclass
+@_node
 class MethodDef:
     name: str
     access: str   # "PUBLIC" or "PRIVATE"
     body: list
     params: list
     returns: str | None
+
+
+# ---- 遍历 ----
+_CHILD_FIELDS = {}   # 节点类 -> 构造函数里的字段名（不含 resolver 写的标注）
+
+
+def _is_node(value):
+    # 不是所有节点类都继承 Node，按“是 dataclass 实例”判断
+    return hasattr(value.__class__, "__dataclass_fields__")
+
+
+def children(node):
+    # 节点的直接子节点（包括列表 / 元组里的）
+    names = _CHILD_FIELDS.get(node.__class__)
+    if names is None:
+        names = _CHILD_FIELDS[node.__class__] = tuple(f.name for f in fields(node) if f.init)
+    for name in names:
+        value = getattr(node, name)
+        if isinstance(value, (list, tuple)):
+            stack = [value]
+            while stack:
+                for item in stack.pop():
+                    if isinstance(item, (list, tuple)):
+                        stack.append(item)
+                    elif _is_node(item):
+                        yield item
+        elif _is_node(value):
+            yield value
+
+
+def walk(root):
+    # 先序遍历整棵子树，不递归
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(children(node))
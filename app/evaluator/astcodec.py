@@ -0,0 +1,257 @@
+import struct
+
+from app.evaluator.ast import *
+
+# AST 的二进制格式，用于缓存和把解析好的程序发给别的进程：
+#   MAGIC + 版本号(varint)
+#   常量池：个数(varint)，每项 一个字节的种类 + 内容（字符串 utf-8 带 varint 长度、整数 zigzag varint、实数 8 字节）
+#   节点流：后序排列的操作码，子节点在前、父节点在后，解码时一个值栈就够，不用递归，
+#           很长的运算链、很深的嵌套都不会爆栈
+MAGIC = b"PSAST"
+FORMAT_VERSION = 3        # 2: For 多了 step；3: 语句多了 line
+
+# ---- 操作码 ----
+OP_NONE = 0
+OP_TRUE = 1
+OP_FALSE = 2
+OP_CONST = 3        # varint：常量池下标
+OP_LIST = 4         # varint：元素个数，从栈顶取
+OP_TUPLE = 5
+OP_NODE = 16        # OP_NODE + 节点编号，字段个数见 NODE_TYPES
+
+# ---- 常量种类 ----
+K_STR = 0
+K_INT = 1
+K_FLOAT = 2
+
+# 节点编号就是在这张表里的位置，只能往后追加；字段按构造函数的参数顺序
+NODE_TYPES = [
+    (Program, ("statements",)),
+    (Declare, ("name", "type", "line")),
+    (Assign, ("target", "value", "line")),
+    (Number, ("value",)),
+    (Var, ("name",)),
+    (BinaryOp, ("left", "operator", "right")),
+    (UnaryOp, ("operator", "operand")),
+    (If, ("condition", "then_body", "else_body", "line")),
+    (Output, ("values", "line")),
+    (String, ("value",)),
+    (While, ("condition", "body", "line")),
+    (For, ("var_name", "start", "end", "body", "step", "line")),
+    (RepeatUntil, ("body", "condition", "line")),
+    (CaseOf, ("expr", "cases", "otherwise", "line")),
+    (Input, ("var_name", "line")),
+    (TypeDef, ("name", "fields", "line")),
+    (FieldAccess, ("var_name", "field_name")),
+    (Param, ("name", "type", "byref")),
+    (ProcedureDef, ("name", "params", "body", "access", "line")),
+    (FunctionDef, ("name", "params", "return_type", "body", "access", "line")),
+    (Call, ("name", "args")),
+    (CallStmt, ("call", "line")),
+    (Return, ("expr", "line")),
+    (ArrayType, ("lowers", "uppers", "base_type")),
+    (ArrayAccess, ("name", "indices")),
+    (AddressOf, ("target",)),
+    (Dereference, ("pointer",)),
+    (PointerRef, ("var_name",)),
+    (PointerType, ("base_type",)),
+    (ClassDef, ("name", "fields", "methods", "line")),
+    (MethodDef, ("name", "access", "body", "params", "returns")),
+    (Boolean, ("value",)),
+    (CaseRange, ("low", "high")),
+]
+
+
+class _Op(int):
+    # 编码时压在栈上的“待输出操作码”，和 AST 里普通的 int 区分开。
+    # 低 8 位是操作码，列表 / 元组的元素个数放在高位
+    __slots__ = ()
+
+
+NODE_OPS = {cls: (_Op(OP_NODE + i), fields) for i, (cls, fields) in enumerate(NODE_TYPES)}
+
+DOUBLE = struct.Struct("<d")
+
+
+class ASTFormatError(Exception):
+    pass
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[pos]
+        except IndexError:
+            raise ASTFormatError("Truncated AST data") from None
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def dumps(program) -> bytes:
+    consts = {}          # (种类, 值) -> 下标；1 和 1.0 不能混成一个
+    pool = bytearray()
+    body = bytearray()
+    write = body.append
+    node_ops = NODE_OPS
+
+    strings = {}         # 字符串最常见，单独一张表，省掉拼 key
+
+    def new_const(kind, value):
+        index = len(strings) + len(consts)
+        pool.append(kind)
+        if kind == K_STR:
+            raw = value.encode("utf-8")
+            _write_varint(pool, len(raw))
+            pool.extend(raw)
+            strings[value] = index
+        else:
+            if kind == K_INT:
+                _write_varint(pool, value * 2 if value >= 0 else -value * 2 - 1)  # zigzag
+            else:
+                pool.extend(DOUBLE.pack(value))
+            consts[(kind, value)] = index
+        return index
+
+    # 后序遍历：先压父节点的 _Op，再倒序压字段，出栈时字段按顺序先输出
+    stack = [program]
+    pop = stack.pop
+    push = stack.append
+    extend = stack.extend
+    while stack:
+        value = pop()
+        cls = type(value)
+        if cls is str:
+            index = strings.get(value)
+            if index is None:
+                index = new_const(K_STR, value)
+            write(OP_CONST)
+            if index < 0x80:
+                write(index)
+            else:
+                _write_varint(body, index)
+        elif cls is _Op:
+            # 字段都输出完了，轮到节点 / 容器自己
+            op = value & 0xFF
+            write(op)
+            if op < OP_NODE:
+                _write_varint(body, value >> 8)
+        elif value is None:
+            write(OP_NONE)
+        elif value is True:
+            write(OP_TRUE)
+        elif value is False:
+            write(OP_FALSE)
+        elif cls is int or cls is float:
+            kind = K_INT if cls is int else K_FLOAT
+            index = consts.get((kind, value))
+            if index is None:
+                index = new_const(kind, value)
+            write(OP_CONST)
+            _write_varint(body, index)
+        elif cls is list or cls is tuple:
+            push(_Op((OP_LIST if cls is list else OP_TUPLE) | len(value) << 8))
+            extend(reversed(value))
+        else:
+            entry = node_ops.get(cls)
+            if entry is None:
+                raise ASTFormatError(f"Cannot serialize {cls.__name__}")
+            op, fields = entry
+            push(op)
+            for name in reversed(fields):
+                push(getattr(value, name))
+
+    out = bytearray(MAGIC)
+    _write_varint(out, FORMAT_VERSION)
+    _write_varint(out, len(strings) + len(consts))
+    out += pool
+    out += body
+    return bytes(out)
+
+
+def loads(data: bytes):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ASTFormatError("Not a serialized AST")
+    version, pos = _read_varint(data, len(MAGIC))
+    if version != FORMAT_VERSION:
+        raise ASTFormatError(f"Unsupported AST format version {version} (expected {FORMAT_VERSION})")
+
+    count, pos = _read_varint(data, pos)
+    consts = []
+    for _ in range(count):
+        kind = data[pos]
+        pos += 1
+        if kind == K_STR:
+            size, pos = _read_varint(data, pos)
+            consts.append(data[pos:pos + size].decode("utf-8"))
+            pos += size
+        elif kind == K_INT:
+            value, pos = _read_varint(data, pos)
+            consts.append(value >> 1 if not value & 1 else -(value >> 1) - 1)
+        elif kind == K_FLOAT:
+            consts.append(DOUBLE.unpack_from(data, pos)[0])
+            pos += 8
+        else:
+            raise ASTFormatError(f"Unknown constant kind {kind}")
+
+    nodes = [(cls, len(fields)) for cls, fields in NODE_TYPES]
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    end = len(data)
+    try:
+        while pos < end:
+            op = data[pos]
+            pos += 1
+            if op == OP_CONST:
+                index = data[pos]
+                if index < 0x80:
+                    pos += 1
+                else:
+                    index, pos = _read_varint(data, pos)
+                push(consts[index])
+            elif op >= OP_NODE:
+                cls, n = nodes[op - OP_NODE]
+                # 字段数少的节点最多，不切片
+                if n == 1:
+                    stack[-1] = cls(stack[-1])
+                elif n == 2:
+                    second = pop()
+                    stack[-1] = cls(stack[-1], second)
+                else:
+                    args = stack[-n:]
+                    del stack[-n:]
+                    push(cls(*args))
+            elif op == OP_LIST or op == OP_TUPLE:
+                n, pos = _read_varint(data, pos)
+                if n:
+                    items = stack[-n:]
+                    del stack[-n:]
+                else:
+                    items = []
+                push(items if op == OP_LIST else tuple(items))
+            elif op == OP_NONE:
+                push(None)
+            elif op == OP_TRUE:
+                push(True)
+            elif op == OP_FALSE:
+                push(False)
+            else:
+                raise ASTFormatError(f"Unknown opcode {op}")
+    except (IndexError, TypeError) as e:
+        raise ASTFormatError(f"Corrupt AST data: {e}") from None
+    # 截断的数据也可能正好拼出一个完整的子节点，所以还要求最外层是 Program
+    if len(stack) != 1 or type(stack[0]) is not Program:
+        raise ASTFormatError("Corrupt AST data: unbalanced node stream")
+    return stack[0]
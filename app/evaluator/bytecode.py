@@ -0,0 +1,513 @@
+from app.evaluator.ast import *
+from app.evaluator.cases import case_table
+from app.evaluator.converters import converter
+from app.evaluator.library import lookup as lookup_builtin
+from app.evaluator.resolver import collect_declares, resolve_program
+
+# ---- 指令集 ----
+# 每条指令是 (opcode, arg)；arg 是槽位号、跳转目标、常量或小 tuple
+LOAD_CONST = 1
+LOAD_LOCAL = 2          # arg: slot
+LOAD_GLOBAL = 3         # arg: slot
+STORE_LOCAL = 4         # 赋值：变量必须已声明
+STORE_GLOBAL = 5
+SET_LOCAL = 6           # 直接写入（FOR 循环变量、临时槽）
+SET_GLOBAL = 7
+CONVERT = 8             # arg: 编译时按声明类型定好的转换函数（converters.converter）
+POP = 9
+
+ADD = 10
+SUB = 11
+MUL = 12
+DIV = 13
+CONCAT = 14
+LT = 15
+GT = 16
+EQ = 17
+NE = 18
+GE = 19
+LE = 20
+TO_BOOL = 21            # 栈顶换成 bool(栈顶)
+NOT = 23
+IN_RANGE = 24           # 弹出 high、low、value，压入 in_case_range 的结果
+
+JUMP = 30               # arg: 目标地址
+JUMP_IF_FALSE = 31
+JUMP_IF_TRUE = 32
+FOR_PREP = 33           # 弹出 step、end、start，压入 for_range 迭代器
+FOR_ITER = 34           # arg: (迭代器槽位, 结束地址)
+CASE_JUMP = 35          # arg: (CaseTable, 各分支地址, OTHERWISE 地址)，弹出值查表跳转
+AND_JUMP = 36           # 栈顶为假：换成 FALSE 跳到 arg，右边不求值；否则弹出
+OR_JUMP = 37            # 栈顶为真：换成 TRUE 跳到 arg；否则弹出
+LOOP = 38               # 循环跳回开头，arg: (目标地址, 循环所在行)；有执行预算时算一步
+LOOP_IF_FALSE = 39      # REPEAT 的回边：弹出条件，为假时同 LOOP
+
+INDEX_LOAD = 40         # arg: (scope, slot, 维数, 数组名)
+INDEX_STORE = 41        # arg: (scope, slot, 维数, 数组名, exact)；exact 时存入不转换
+FIELD_LOAD = 42         # arg: (scope, slot, 变量名, 字段名)
+FIELD_STORE = 43
+ADDRESS_OF = 44         # arg: (scope, slot)
+ADDRESS_OF_FIELD = 45   # arg: (scope, slot, 变量名, 字段名)
+ADDRESS_OF_INDEX = 46   # arg: (scope, slot, 维数, 数组名)
+DEREF = 47
+STORE_DEREF = 48
+
+DECLARE = 50            # arg: (scope, slot, 类型)
+INPUT = 51              # arg: (scope, slot, 变量名, 类型)
+OUTPUT = 52             # arg: 输出项个数
+EXEC = 53               # arg: 直接交给 Interpreter 处理的节点（TYPE 等），结果压栈
+
+CALL = 60               # arg: (名字, 参数个数)
+CALL_BUILTIN = 61       # arg: (名字, 参数个数)
+RETURN_VALUE = 62
+DEFINE = 63             # arg: (kind, 名字, CodeObject)
+
+OPNAMES = {value: name for name, value in list(globals().items())
+           if name.isupper() and isinstance(value, int)}
+
+BINARY_OPS = {
+    "+": ADD, "-": SUB, "*": MUL, "/": DIV, "&": CONCAT,
+    "<": LT, ">": GT, "=": EQ, "<>": NE, ">=": GE, "<=": LE,
+}
+# 短路运算：左边算完先条件跳转，跳过右边；没跳转就算右边再转成 bool
+SHORT_CIRCUIT_OPS = {"AND": AND_JUMP, "OR": OR_JUMP}
+
+SCALAR_TYPES = ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE")
+
+LOCAL = 0
+GLOBAL = 1
+
+
+class CodeObject:
+    def __init__(self, name, kind="MODULE"):
+        self.name = name
+        self.kind = kind            # MODULE / PROCEDURE / FUNCTION
+        self.instructions = []
+        self.varnames = []          # 局部槽位 -> 名字（含临时槽）
+        self.nparams = 0
+        self.global_names = None    # 全局槽位 -> 名字，整个程序共用一份
+        self.line = 0               # 过程/函数定义所在行
+
+    @property
+    def nlocals(self):
+        return len(self.varnames)
+
+    def __repr__(self):
+        return f"<code {self.kind} {self.name}: {len(self.instructions)} instructions>"
+
+
+class _Scope:
+    def __init__(self, code, is_global):
+        self.code = code
+        self.is_global = is_global
+        self.slots = {}             # 名字 -> 局部槽位
+        self.types = {}             # 名字 -> 声明的类型
+        self.byref = set()          # BYREF 参数名
+
+    def add_local(self, name):
+        if name not in self.slots:
+            self.slots[name] = len(self.code.varnames)
+            self.code.varnames.append(name)
+        return self.slots[name]
+
+    def temp(self):
+        slot = len(self.code.varnames)
+        self.code.varnames.append(f"<tmp{slot}>")
+        return slot
+
+
+class BytecodeCompiler:
+    # 把 Parser.parse() 得到的 Program 编译成 CodeObject
+    def __init__(self):
+        self.global_names = []
+        self.global_slots = {}
+        self.global_types = {}
+        self.signatures = {}        # 名字 -> params，用来在调用处处理 BYREF
+        self.scope = None
+
+    def compile_program(self, program):
+        code = CodeObject("<module>")
+        code.global_names = self.global_names
+        self.global_types = collect_declares(program.statements, {})
+        for stmt in program.statements:
+            if isinstance(stmt, (ProcedureDef, FunctionDef)):
+                self.signatures[stmt.name] = stmt.params
+        self.scope = _Scope(code, is_global=True)
+        self.compile_block(program.statements)
+        self.emit(LOAD_CONST, None)
+        self.emit(RETURN_VALUE)
+        return code
+
+    # ---- 基础工具 ----
+    def emit(self, op, arg=None):
+        self.scope.code.instructions.append((op, arg))
+        return len(self.scope.code.instructions) - 1
+
+    def here(self):
+        return len(self.scope.code.instructions)
+
+    def patch(self, index, target):
+        op, arg = self.scope.code.instructions[index]
+        if op == FOR_ITER:
+            arg = (arg[0], target)
+        else:
+            arg = target
+        self.scope.code.instructions[index] = (op, arg)
+
+    def global_slot(self, name):
+        if name not in self.global_slots:
+            self.global_slots[name] = len(self.global_names)
+            self.global_names.append(name)
+        return self.global_slots[name]
+
+    def resolve(self, name):
+        # 局部（形参 / 过程内 DECLARE）优先，否则是全局
+        scope = self.scope
+        if not scope.is_global and name in scope.slots:
+            return LOCAL, scope.slots[name]
+        return GLOBAL, self.global_slot(name)
+
+    def resolve_for_write(self, name):
+        # FOR / INPUT 在过程里写一个没声明过的名字：已有全局就写全局，否则新建局部
+        scope = self.scope
+        if scope.is_global or name in scope.slots or name in self.global_types:
+            return self.resolve(name)
+        return LOCAL, scope.add_local(name)
+
+    def declared_type(self, name):
+        scope = self.scope
+        if not scope.is_global and name in scope.slots:
+            return scope.types.get(name)
+        return self.global_types.get(name)
+
+    def compile_block(self, stmts):
+        for stmt in stmts or ():
+            self.compile_stmt(stmt)
+
+    # ---- 语句 ----
+    def compile_stmt(self, node):
+        method = getattr(self, "stmt_" + type(node).__name__, None)
+        if method is None:
+            raise Exception(f"Unknown node type: {type(node)}")
+        method(node)
+
+    def stmt_Declare(self, node):
+        scope, slot = self.resolve(node.name)
+        self.emit(DECLARE, (scope, slot, node.type))
+
+    def stmt_Assign(self, node):
+        target = node.target
+        self.compile_expr(node.value)
+        if isinstance(target, Var):
+            if target.name in self.scope.byref and not self.scope.is_global:
+                self.emit(LOAD_LOCAL, self.scope.slots[target.name])
+                self.emit(STORE_DEREF)
+                return
+            expected_type = self.declared_type(target.name)
+            if expected_type in SCALAR_TYPES and not node.exact:
+                self.emit(CONVERT, converter(expected_type))
+            scope, slot = self.resolve(target.name)
+            self.emit(STORE_LOCAL if scope == LOCAL else STORE_GLOBAL, slot)
+        elif isinstance(target, FieldAccess):
+            scope, slot = self.resolve(target.var_name)
+            self.emit(FIELD_STORE, (scope, slot, target.var_name, target.field_name))
+        elif isinstance(target, ArrayAccess):
+            for idx in target.indices:
+                self.compile_expr(idx)
+            scope, slot = self.resolve(target.name)
+            self.emit(INDEX_STORE, (scope, slot, len(target.indices), target.name, node.exact))
+        elif isinstance(target, Dereference):
+            self.compile_expr(target.pointer)
+            self.emit(STORE_DEREF)
+        else:
+            raise Exception("Unsupported assignment target")
+
+    def stmt_Output(self, node):
+        for value in node.values:
+            self.compile_expr(value)
+        self.emit(OUTPUT, len(node.values))
+
+    def stmt_Input(self, node):
+        scope, slot = self.resolve_for_write(node.var_name)
+        self.emit(INPUT, (scope, slot, node.var_name, self.declared_type(node.var_name)))
+
+    def stmt_If(self, node):
+        self.compile_expr(node.condition)
+        jump_else = self.emit(JUMP_IF_FALSE, None)
+        self.compile_block(node.then_body)
+        if node.else_body:
+            jump_end = self.emit(JUMP, None)
+            self.patch(jump_else, self.here())
+            self.compile_block(node.else_body)
+            self.patch(jump_end, self.here())
+        else:
+            self.patch(jump_else, self.here())
+
+    def stmt_While(self, node):
+        top = self.here()
+        self.compile_expr(node.condition)
+        jump_end = self.emit(JUMP_IF_FALSE, None)
+        self.compile_block(node.body)
+        self.emit(LOOP, (top, node.line))
+        self.patch(jump_end, self.here())
+
+    def stmt_RepeatUntil(self, node):
+        top = self.here()
+        self.compile_block(node.body)
+        self.compile_expr(node.condition)
+        self.emit(LOOP_IF_FALSE, (top, node.line))
+
+    def stmt_For(self, node):
+        # 和 for_range 一样：循环体里改循环变量不影响次数
+        self.compile_expr(node.start)
+        self.compile_expr(node.end)
+        if node.step is None:
+            self.emit(LOAD_CONST, 1)
+        else:
+            self.compile_expr(node.step)
+        self.emit(FOR_PREP)
+        iterator = self.scope.temp()
+        self.emit(SET_LOCAL, iterator)
+        top = self.emit(FOR_ITER, (iterator, None))
+        scope, slot = self.resolve_for_write(node.var_name)
+        self.emit(SET_LOCAL if scope == LOCAL else SET_GLOBAL, slot)
+        self.compile_block(node.body)
+        self.emit(LOOP, (top, node.line))
+        self.patch(top, self.here())
+
+    def stmt_CaseOf(self, node):
+        self.compile_expr(node.expr)
+        table = case_table(node)
+        if table is not None:
+            # 标签全是常量：查表直接跳到分支
+            jump = self.emit(CASE_JUMP, None)
+            targets = []
+            jumps_end = []
+            for _, body in node.cases:
+                targets.append(self.here())
+                self.compile_block(body)
+                jumps_end.append(self.emit(JUMP, None))
+            otherwise = self.here()
+            self.compile_block(node.otherwise)
+            self.patch(jump, (table, tuple(targets), otherwise))
+            for jump in jumps_end:
+                self.patch(jump, self.here())
+            return
+
+        value = self.scope.temp()
+        self.emit(SET_LOCAL, value)
+        jumps_end = []
+        for label, body in node.cases:
+            if isinstance(label, CaseRange):
+                self.emit(LOAD_LOCAL, value)
+                self.compile_expr(label.low)
+                self.compile_expr(label.high)
+                self.emit(IN_RANGE)
+            else:
+                self.compile_expr(label)
+                self.emit(LOAD_LOCAL, value)
+                self.emit(EQ)
+            jump_next = self.emit(JUMP_IF_FALSE, None)
+            self.compile_block(body)
+            jumps_end.append(self.emit(JUMP, None))
+            self.patch(jump_next, self.here())
+        self.compile_block(node.otherwise)
+        for jump in jumps_end:
+            self.patch(jump, self.here())
+
+    def stmt_CallStmt(self, node):
+        self.compile_call(node.call)
+        self.emit(POP)
+
+    def stmt_Return(self, node):
+        if self.scope.is_global:
+            # 顶层 RETURN 交给树遍历报错
+            self.emit(EXEC, node)
+            return
+        if node.expr is not None:
+            self.compile_expr(node.expr)
+        else:
+            self.emit(LOAD_CONST, None)
+        self.emit(RETURN_VALUE)
+
+    def stmt_ProcedureDef(self, node):
+        self.compile_routine(node, "PROCEDURE")
+
+    def stmt_FunctionDef(self, node):
+        self.compile_routine(node, "FUNCTION")
+
+    def stmt_TypeDef(self, node):
+        self.emit(EXEC, node)
+        self.emit(POP)
+
+    def stmt_ClassDef(self, node):
+        self.emit(EXEC, node)
+        self.emit(POP)
+
+    def compile_routine(self, node, kind):
+        code = CodeObject(node.name, kind)
+        code.global_names = self.global_names
+        code.line = node.line
+        outer = self.scope
+        self.scope = scope = _Scope(code, is_global=False)
+        for param in node.params:
+            scope.add_local(param.name)
+            scope.types[param.name] = param.type
+            if param.byref:
+                scope.byref.add(param.name)
+        code.nparams = len(node.params)
+        for name, type_ in collect_declares(node.body, {}).items():
+            scope.add_local(name)
+            scope.types[name] = type_
+        self.compile_block(node.body)
+        self.emit(LOAD_CONST, None)
+        self.emit(RETURN_VALUE)
+        self.scope = outer
+        self.emit(DEFINE, (kind, node.name, code))
+
+    # ---- 表达式 ----
+    def compile_expr(self, node):
+        method = getattr(self, "expr_" + type(node).__name__, None)
+        if method is None:
+            raise Exception(f"Unknown node type: {type(node)}")
+        method(node)
+
+    def expr_Number(self, node):
+        self.emit(LOAD_CONST, node.value)
+
+    def expr_String(self, node):
+        self.emit(LOAD_CONST, node.value)
+
+    def expr_Boolean(self, node):
+        self.emit(LOAD_CONST, node.value)
+
+    def expr_Var(self, node):
+        if node.name.upper() == "TRUE":
+            self.emit(LOAD_CONST, True)
+            return
+        if node.name.upper() == "FALSE":
+            self.emit(LOAD_CONST, False)
+            return
+        scope, slot = self.resolve(node.name)
+        self.emit(LOAD_LOCAL if scope == LOCAL else LOAD_GLOBAL, slot)
+        if node.name in self.scope.byref and scope == LOCAL:
+            self.emit(DEREF)
+
+    def expr_BinaryOp(self, node):
+        # 用显式栈做后序遍历：很长的 a + b + c ... 运算链不占 Python 递归
+        # AND / OR 的跳转在栈上是 [跳转指令, 地址]，地址先空着，右边编译完再回填
+        todo = [node]
+        while todo:
+            item = todo.pop()
+            if item.__class__ is int:
+                self.emit(item)
+            elif item.__class__ is list:
+                if item[1] is None:
+                    item[1] = self.emit(item[0])
+                else:
+                    self.patch(item[1], self.here())
+            elif isinstance(item, BinaryOp):
+                jump = SHORT_CIRCUIT_OPS.get(item.operator)
+                if jump is not None:
+                    pending = [jump, None]
+                    todo.append(pending)     # 第二次遇到：回填跳转地址
+                    todo.append(TO_BOOL)
+                    todo.append(item.right)
+                    todo.append(pending)     # 第一次遇到：发出跳转
+                    todo.append(item.left)
+                    continue
+                op = BINARY_OPS.get(item.operator)
+                if op is None:
+                    raise Exception(f"Unsupported operator: {item.operator}")
+                todo.append(op)
+                todo.append(item.right)
+                todo.append(item.left)
+            else:
+                self.compile_expr(item)
+
+    def expr_UnaryOp(self, node):
+        self.compile_expr(node.operand)
+        self.emit(NOT)
+
+    def expr_ArrayAccess(self, node):
+        for idx in node.indices:
+            self.compile_expr(idx)
+        scope, slot = self.resolve(node.name)
+        self.emit(INDEX_LOAD, (scope, slot, len(node.indices), node.name))
+
+    def expr_FieldAccess(self, node):
+        scope, slot = self.resolve(node.var_name)
+        self.emit(FIELD_LOAD, (scope, slot, node.var_name, node.field_name))
+
+    def expr_Call(self, node):
+        self.compile_call(node)
+
+    def expr_AddressOf(self, node):
+        target = node.target
+        if isinstance(target, Var):
+            self.emit(ADDRESS_OF, self.resolve(target.name))
+        elif isinstance(target, FieldAccess):
+            scope, slot = self.resolve(target.var_name)
+            self.emit(ADDRESS_OF_FIELD, (scope, slot, target.var_name, target.field_name))
+        elif isinstance(target, ArrayAccess):
+            for idx in target.indices:
+                self.compile_expr(idx)
+            scope, slot = self.resolve(target.name)
+            self.emit(ADDRESS_OF_INDEX, (scope, slot, len(target.indices), target.name))
+        else:
+            raise Exception(f"Cannot take address of {type(target)}")
+
+    def expr_Dereference(self, node):
+        self.compile_expr(node.pointer)
+        self.emit(DEREF)
+
+    def compile_call(self, node):
+        builtin = lookup_builtin(node.name)
+        if builtin is not None and isinstance(node, Call):
+            for arg in node.args:
+                self.compile_expr(arg)
+            self.emit(CALL_BUILTIN, (builtin.name, len(node.args)))
+            return
+        params = self.signatures.get(node.name, ())
+        for i, arg in enumerate(node.args):
+            if i < len(params) and params[i].byref:
+                self.expr_AddressOf(AddressOf(target=arg))
+            else:
+                self.compile_expr(arg)
+        self.emit(CALL, (node.name, len(node.args)))
+
+
+def compile_program(program):
+    resolve_program(program)  # 只用它标出的 exact（不用转换的赋值），槽位由 BytecodeCompiler 自己分配
+    return BytecodeCompiler().compile_program(program)
+
+
+def disassemble(code, out=None):
+    # 调试用：把 CodeObject（包括里面定义的过程/函数）按行列出来
+    lines = [] if out is None else out
+    lines.append(f"Disassembly of {code.kind} {code.name} "
+                 f"(params={code.nparams}, locals={code.nlocals}):")
+    nested = []
+    for offset, (op, arg) in enumerate(code.instructions):
+        text = f"{offset:>5}  {OPNAMES.get(op, op):<18}"
+        if op == DEFINE:
+            text += f"{arg[0]} {arg[1]}"
+            nested.append(arg[2])
+        elif op in (LOAD_LOCAL, STORE_LOCAL, SET_LOCAL):
+            text += f"{arg} ({code.varnames[arg]})"
+        elif op in (LOAD_GLOBAL, STORE_GLOBAL, SET_GLOBAL):
+            text += f"{arg} ({code.global_names[arg]})"
+        elif op == EXEC:
+            text += type(arg).__name__
+        elif op == CASE_JUMP:
+            text += f"{arg[0]!r} -> {list(arg[1])}, otherwise {arg[2]}"
+        elif op == CONVERT:
+            text += arg.__name__
+        elif arg is not None or op == LOAD_CONST:
+            text += repr(arg)
+        lines.append(text.rstrip())
+    for sub in nested:
+        lines.append("")
+        disassemble(sub, lines)
+    if out is None:
+        return "\n".join(lines)
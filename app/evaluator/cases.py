@@ -0,0 +1,104 @@
+from bisect import bisect_left
+
+from app.evaluator.ast import *
+
+# CASE OF 的标签匹配。标签是值（1: / "a": / x:）或范围（1 TO 10:），按顺序第一个匹配的分支执行。
+# 标签全是常量时，加载时建一张跳转表，执行时一次查表就找到分支，不用逐个比较。
+
+
+def in_case_range(value, low, high):
+    # 范围标签包含两端；类型比较不了（数字和字符串）就是不匹配，和 = 比较不相等一样
+    try:
+        return low <= value <= high
+    except TypeError:
+        return False
+
+
+class CaseTable:
+    # equal:   值 -> 分支号，同一个值只记最靠前的分支
+    # points:  所有范围端点排好序；端点本身和相邻端点之间的开区间各算一段，
+    # regions: 每段里最靠前的分支号（没有范围覆盖就是 None），
+    #          第 k 个端点是 regions[2k]，端点 k 和 k+1 之间是 regions[2k+1]
+    __slots__ = ("equal", "points", "regions")
+
+    def __init__(self, equal, ranges):
+        self.equal = equal
+        self.points = sorted({bound for low, high, _ in ranges for bound in (low, high)})
+        regions = [None] * max(2 * len(self.points) - 1, 0)
+        for low, high, index in ranges:
+            if not low <= high:
+                continue  # 空范围
+            first = 2 * bisect_left(self.points, low)
+            last = 2 * bisect_left(self.points, high)
+            for region in range(first, last + 1):
+                if regions[region] is None or index < regions[region]:
+                    regions[region] = index
+        self.regions = regions
+
+    def __repr__(self):
+        return f"<case table: {len(self.equal)} values, {len(self.points)} range bounds>"
+
+    def lookup(self, value):
+        # 匹配的分支号，都不匹配返回 None
+        try:
+            best = self.equal.get(value)
+        except TypeError:
+            best = None  # 不可哈希的值（结构体）不会等于常量
+        points = self.points
+        if points:
+            try:
+                i = bisect_left(points, value)
+            except TypeError:
+                return best
+            if i < len(points) and points[i] == value:
+                region = self.regions[2 * i]
+            elif 0 < i < len(points):
+                region = self.regions[2 * i - 1]
+            else:
+                return best
+            if region is not None and (best is None or region < best):
+                best = region
+        return best
+
+
+UNKNOWN = object()
+
+
+def _constant(label):
+    # 常量标签的值；不是常量返回 UNKNOWN
+    if isinstance(label, (Number, String, Boolean)):
+        return label.value
+    if isinstance(label, Var) and label.name.upper() in ("TRUE", "FALSE"):
+        return label.name.upper() == "TRUE"
+    return UNKNOWN
+
+
+def build_case_table(labels):
+    # 标签全是常量就建表，否则返回 None 走逐个比较
+    equal = {}
+    ranges = []
+    for index, label in enumerate(labels):
+        if isinstance(label, CaseRange):
+            low = _constant(label.low)
+            high = _constant(label.high)
+            if low is UNKNOWN or high is UNKNOWN:
+                return None
+            ranges.append((low, high, index))
+        else:
+            value = _constant(label)
+            if value is UNKNOWN:
+                return None
+            equal.setdefault(value, index)
+    try:
+        return CaseTable(equal, ranges)
+    except TypeError:
+        return None  # 范围端点有数字也有字符串，排不了序
+
+
+def case_table(node):
+    # CaseOf 节点的跳转表，第一次用时建好记在节点上；标签不全是常量时返回 None
+    table = node.table
+    if table is None:
+        table = build_case_table([label for label, _ in node.cases]) or False
+        annotate(node, table=table)
+    return table or None
@@ -0,0 +1,579 @@
+import operator
+
+from app.evaluator.ast import *
+from app.evaluator.arrays import PseudoArray
+from app.evaluator.cases import case_table, in_case_range
+from app.evaluator.interpreter import Interpreter, RETURN, SHORT_CIRCUIT, for_range
+from app.evaluator.library import LIBRARY, check_arity, lookup as lookup_builtin
+from app.evaluator.loops import address_taken, analyze_loop
+from app.evaluator.resolver import LOCAL, GLOBAL, REF, CONST, UNSET, resolve_program
+from app.evaluator.ropes import concat
+
+
+def _and(left, right):
+    return bool(left) and bool(right)
+
+
+def _or(left, right):
+    return bool(left) or bool(right)
+
+
+# 运算符在编译期就绑定成 Python 函数，运行时不再比较字符串
+OPERATORS = {
+    "AND": _and,
+    "OR": _or,
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "&": concat,
+    "<": operator.lt,
+    ">": operator.gt,
+    "=": operator.eq,
+    "<>": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+
+def _run_block(block):
+    # 编译后的语句同样返回完成值（None / RETURN）
+    for stmt in block:
+        if stmt() is RETURN:
+            return RETURN
+    return None
+
+
+class ClosureInterpreter(Interpreter):
+    # 把 AST 一次性编译成嵌套的 Python 闭包，运行时只调用闭包。
+    # 运行时状态（全局帧/局部帧、类型、过程表）和 Interpreter 共用，
+    # 没有专门编译器的节点退回到树遍历的处理方法。
+    COMPILERS = {
+        Program: "_compile_program",
+        Var: "_compile_var",
+        Number: "_compile_number",
+        Boolean: "_compile_number",
+        String: "_compile_string",
+        BinaryOp: "_compile_binary_op",
+        UnaryOp: "_compile_unary_op",
+        Assign: "_compile_assign",
+        ArrayAccess: "_compile_array_access",
+        Output: "_compile_output",
+        While: "_compile_while",
+        If: "_compile_if",
+        For: "_compile_for",
+        RepeatUntil: "_compile_repeat_until",
+        CaseOf: "_compile_case_of",
+        CallStmt: "_compile_call_stmt",
+        Call: "_compile_call",
+        Return: "_compile_return",
+    }
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._compiled = {}  # id(node) -> (node, closure)
+        # 循环优化用到的编译期信息，见 _prepare_loop
+        self._pinned = None  # 取过地址的变量名；没编译过 Program 时为 None，不做循环优化
+        self._hoisted = {}   # id(表达式) -> (node, 所属循环的缓存, 下标)
+        self._checked = {}   # id(ArrayAccess) -> (node, 所属循环的 bound, 下标, 循环变量槽位)
+
+    def eval(self, node):
+        entry = self._compiled.get(id(node))
+        if entry is None or entry[0] is not node:
+            return self.compile(node)()
+        return entry[1]()
+
+    def compile(self, node):
+        entry = self._compiled.get(id(node))
+        if entry is not None and entry[0] is node:
+            return entry[1]
+        name = None
+        for klass in node.__class__.__mro__:
+            name = self.COMPILERS.get(klass)
+            if name is not None:
+                break
+        if name is not None:
+            fn = getattr(self, name)(node)
+        else:
+            fn = self._compile_fallback(node)
+        hoisted = self._hoisted.get(id(node))
+        if hoisted is not None and hoisted[0] is node:
+            fn = self._cached(fn, hoisted[1], hoisted[2])
+        self._compiled[id(node)] = (node, fn)
+        return fn
+
+    def _cached(self, fn, cache, index):
+        # 循环不变量：每次进循环后第一次用到时才求值（出错的时机不变），之后直接取缓存
+        def cached():
+            value = cache[index]
+            if value is UNSET:
+                value = cache[index] = fn()
+            return value
+        return cached
+
+    def _prepare_loop(self, node):
+        # 编译循环体之前分析循环，把不变量登记到 _hoisted、可以提前查边界的下标登记到 _checked。
+        # 返回 (缓存, 边界检查)：缓存在每次进循环时清空，边界检查见 _bind_checks
+        cache = []
+        checks = []
+        if self._pinned is None:
+            return cache, checks
+        info = analyze_loop(node, self._pinned)
+        if info is None:
+            return cache, checks
+        for expr in info.invariants:
+            if id(expr) not in self._hoisted:  # 外层循环已经缓存了的不用再管
+                self._hoisted[id(expr)] = (expr, cache, len(cache))
+                cache.append(UNSET)
+        bound = [None] * len(info.checks)
+        for k, (access, position, other) in enumerate(info.checks):
+            if id(access) not in self._checked:
+                self._checked[id(access)] = (access, bound, k, node.slot)
+                other_fn = self.compile(other) if other is not None else None
+                checks.append((access, position, other_fn, bound, k))
+        return cache, checks
+
+    def compile_block(self, stmts):
+        return tuple(self.compile(stmt) for stmt in stmts or ())
+
+    def _run_body(self, body):
+        # 过程/函数体按 list 对象缓存编译结果
+        entry = self._compiled.get(id(body))
+        if entry is None or entry[0] is not body:
+            entry = (body, self.compile_block(body))
+            self._compiled[id(body)] = entry
+        for stmt in entry[1]:
+            if stmt() is RETURN:
+                return RETURN
+        return None
+
+    def _compile_fallback(self, node):
+        # 声明、输入、字段、指针、类型定义等走原来的处理方法
+        handler = self._handlers.get(node.__class__) or self._resolve_handler(node.__class__)
+        return lambda: handler(node)
+
+    def _compile_program(self, node):
+        # 先绑定好槽位，闭包里直接按槽位读写
+        resolve_program(node)
+        self._pinned = (self._pinned or set()) | address_taken(node)
+        block = self.compile_block(node.statements)
+
+        def program():
+            self._start(node)
+            try:
+                _run_block(block)
+            except RecursionError:
+                raise self._recursion_overflow() from None
+            finally:
+                self.output.flush()
+        return program
+
+    def _compile_var(self, node):
+        name = node.name
+        slot = node.slot
+        if node.scope == CONST:
+            return lambda: slot
+        if node.scope == GLOBAL:
+            globals_ = self.globals
+
+            def global_var():
+                value = globals_[slot]
+                if value is UNSET:
+                    raise Exception(f"Variable '{name}' was not declared.")
+                return value
+            return global_var
+        if node.scope == LOCAL:
+            def local_var():
+                value = self.frame[slot]
+                if value is UNSET:
+                    raise Exception(f"Variable '{name}' was not declared.")
+                return value
+            return local_var
+        return self._compile_fallback(node)
+
+    def _compile_number(self, node):
+        value = node.value
+        return lambda: value
+
+    def _compile_string(self, node):
+        value = node.value
+        return lambda: value
+
+    def _compile_binary_op(self, node):
+        # 左结合的长链 a + b + c ... 编译成一个循环，编译和运行都不按链长递归
+        spine = []
+        while node.__class__ is BinaryOp:
+            spine.append(node)
+            node = node.left
+        first = self.compile(node)
+        spine.reverse()
+        if len(spine) == 1 and spine[0].operator == "AND":
+            right = self.compile(spine[0].right)
+            return lambda: bool(first()) and bool(right())
+        if len(spine) == 1 and spine[0].operator == "OR":
+            right = self.compile(spine[0].right)
+            return lambda: bool(first()) or bool(right())
+        steps = tuple((self._operator(n.operator), self.compile(n.right)) for n in spine)
+        if len(steps) == 1:
+            ((op, right),) = steps
+            return lambda: op(first(), right())
+        if not any(n.operator in SHORT_CIRCUIT for n in spine):
+            def chain():
+                value = first()
+                for op, right in steps:
+                    value = op(value, right())
+                return value
+            return chain
+
+        # 链里有 AND / OR：左边已经定了结果就跳过右边
+        steps = tuple((op, right, SHORT_CIRCUIT.get(n.operator)) for (op, right), n in zip(steps, spine))
+
+        def logic_chain():
+            value = first()
+            for op, right, decided in steps:
+                if decided is not None and bool(value) is decided:
+                    value = decided
+                else:
+                    value = op(value, right())
+            return value
+        return logic_chain
+
+    def _operator(self, name):
+        op = OPERATORS.get(name)
+        if op is None:
+            return lambda left, right: self.apply_op(left, name, right)
+        return op
+
+    def _compile_unary_op(self, node):
+        operand = self.compile(node.operand)
+        return lambda: not bool(operand())
+
+    def _compile_array_access(self, node):
+        indices = tuple(self.compile(idx) for idx in node.indices)
+        array_of = self._array
+        if len(indices) == 1:
+            (i_fn,) = indices
+            read = lambda: array_of(node).get1(i_fn())
+        elif len(indices) == 2:
+            i_fn, j_fn = indices
+            read = lambda: array_of(node).get2(i_fn(), j_fn())
+        else:
+            read = lambda: array_of(node).get([fn() for fn in indices])
+
+        checked = self._checked.get(id(node))
+        if checked is None or checked[0] is not node:
+            return read
+        _, bound, k, slot = checked
+
+        def unchecked_read():
+            # 进循环时已经查过边界：偏移量 = 循环变量 * mult + base
+            entry = bound[k]
+            if entry is None:
+                return read()
+            array, frame, mult, base = entry
+            value = array.data[frame[slot] * mult + base]
+            return bool(value) if array.is_bool else value
+        return unchecked_read
+
+    def _compile_array_store(self, node):
+        store = self._compile_checked_array_store(node)
+        checked = self._checked.get(id(node.target))
+        if checked is None or checked[0] is not node.target:
+            return store
+        _, bound, k, slot = checked
+        value_fn = self.compile(node.value)
+        exact = node.exact
+
+        def unchecked_store():
+            entry = bound[k]
+            if entry is None:
+                return store()
+            value = value_fn()
+            array, frame, mult, base = entry
+            array[frame[slot] * mult + base] = value if exact else array.convert(value)
+        return unchecked_store
+
+    def _compile_checked_array_store(self, node):
+        target = node.target
+        value_fn = self.compile(node.value)
+        indices = tuple(self.compile(idx) for idx in node.target.indices)
+        array_of = self._array
+        exact = node.exact
+
+        if len(indices) == 1:
+            (i_fn,) = indices
+
+            def store():
+                value = value_fn()
+                array = array_of(target)
+                array.set1(i_fn(), value if exact else array.convert(value))
+            return store
+        if len(indices) == 2:
+            i_fn, j_fn = indices
+
+            def store():
+                value = value_fn()
+                array = array_of(target)
+                i = i_fn()
+                array.set2(i, j_fn(), value if exact else array.convert(value))
+            return store
+
+        def store():
+            value = value_fn()
+            array = array_of(target)
+            pos = array.offset([fn() for fn in indices])
+            array[pos] = value if exact else array.convert(value)
+        return store
+
+    def _compile_assign(self, node):
+        if isinstance(node.target, ArrayAccess):
+            return self._compile_array_store(node)
+        if not isinstance(node.target, Var):
+            return self._compile_fallback(node)
+        target = node.target
+        if target.scope not in (LOCAL, GLOBAL):
+            return self._compile_fallback(node)
+        name = target.name
+        slot = target.slot
+        value_fn = self.compile(node.value)
+        globals_ = self.globals
+
+        if node.exact:
+            # 右边已经是声明的类型，不用转换
+            def exact_assign():
+                value = value_fn()
+                frame = globals_ if target.scope == GLOBAL else self.frame
+                if frame[slot] is UNSET:
+                    raise Exception(f"Variable '{name}' used before declaration.")
+                frame[slot] = value
+            return exact_assign
+
+        if target.scope == GLOBAL:
+            global_converters = self.global_converters
+
+            def assign_global():
+                value = value_fn()
+                if globals_[slot] is UNSET:
+                    raise Exception(f"Variable '{name}' used before declaration.")
+                convert = global_converters.get(slot)
+                if convert is not None:
+                    value = convert(value)
+                globals_[slot] = value
+            return assign_global
+
+        def assign_local():
+            # 转换函数在当前帧的表里：同一个槽位在不同的过程里是不同的变量
+            value = value_fn()
+            frame = self.frame
+            if frame[slot] is UNSET:
+                raise Exception(f"Variable '{name}' used before declaration.")
+            convert = self.local_converters.get(slot)
+            if convert is not None:
+                value = convert(value)
+            frame[slot] = value
+        return assign_local
+
+    def _compile_output(self, node):
+        values = tuple(self.compile(v) for v in node.values)
+
+        output = self._output
+        return lambda: output([fn() for fn in values])
+
+    def _ticked(self, node, body):
+        # 有执行预算时循环体最后加一步计数（回边）；没有时循环体原样不变
+        tick = self._tick
+        if tick is None:
+            return body
+        line = node.line
+        return body + (lambda: tick(line),)
+
+    def _compile_while(self, node):
+        cache, _ = self._prepare_loop(node)
+        blank = tuple(cache)
+        cond = self.compile(node.condition)
+        body = self._ticked(node, self.compile_block(node.body))
+
+        def while_loop():
+            if blank:
+                cache[:] = blank
+            while cond():
+                for stmt in body:
+                    if stmt() is RETURN:
+                        return RETURN
+        return while_loop
+
+    def _compile_if(self, node):
+        cond = self.compile(node.condition)
+        then_body = self.compile_block(node.then_body)
+        else_body = self.compile_block(node.else_body)
+
+        def if_stmt():
+            if cond():
+                for stmt in then_body:
+                    if stmt() is RETURN:
+                        return RETURN
+            else:
+                for stmt in else_body:
+                    if stmt() is RETURN:
+                        return RETURN
+        return if_stmt
+
+    def _compile_for(self, node):
+        slot = node.slot
+        is_global = node.scope == GLOBAL
+        globals_ = self.globals
+        start_fn = self.compile(node.start)
+        end_fn = self.compile(node.end)
+        step_fn = self.compile(node.step) if node.step is not None else (lambda: 1)
+        cache, checks = self._prepare_loop(node)
+        blank = tuple(cache)
+        body = self._ticked(node, self.compile_block(node.body))
+        bind_checks = self._bind_checks
+
+        def for_loop():
+            start = start_fn()
+            end = end_fn()
+            values = for_range(start, end, step_fn())
+            frame = globals_ if is_global else self.frame
+            if blank:
+                cache[:] = blank
+            if checks:
+                bind_checks(checks, values, frame)
+            for i in values:
+                frame[slot] = i
+                for stmt in body:
+                    if stmt() is RETURN:
+                        return RETURN
+        return for_loop
+
+    def _compile_repeat_until(self, node):
+        cache, _ = self._prepare_loop(node)
+        blank = tuple(cache)
+        body = self.compile_block(node.body)
+        cond = self.compile(node.condition)
+        tick = self._tick
+        if tick is not None:
+            until, line = cond, node.line
+            cond = lambda: until() or tick(line)  # 条件为假、要跳回开头时算一步
+
+        def repeat_until():
+            if blank:
+                cache[:] = blank
+            while True:
+                for stmt in body:
+                    if stmt() is RETURN:
+                        return RETURN
+                if cond():
+                    break
+        return repeat_until
+
+    def _bind_checks(self, checks, values, frame):
+        # 进 FOR 循环时用整个取值范围查一遍每个登记过的数组下标，
+        # 通过的在循环里直接按偏移量读写；查不了或不通过的照常逐次检查
+        if type(values) is range and values:
+            low, high = min(values[0], values[-1]), max(values[0], values[-1])
+        else:
+            low = None
+        for access, position, other_fn, bound, k in checks:
+            bound[k] = None
+            if low is None:
+                continue
+            try:
+                array = self._load(access)
+                if not isinstance(array, PseudoArray) or array.ndim != len(access.indices):
+                    continue
+                if array.ndim == 1:
+                    if array.lo0 <= low and high <= array.hi0:
+                        bound[k] = (array, frame, 1, -array.lo0)
+                    continue
+                # 另一个下标在循环里不变，进循环时先算出来
+                x = other_fn()
+                if type(x) is not int:
+                    continue
+                if position == 1:  # A[x, i]
+                    if array.lo0 <= x <= array.hi0 and array.lo1 <= low and high <= array.hi1:
+                        bound[k] = (array, frame, 1, (x - array.lo0) * array.stride0 - array.lo1)
+                elif array.lo0 <= low and high <= array.hi0 and array.lo1 <= x <= array.hi1:  # A[i, x]
+                    bound[k] = (array, frame, array.stride0, x - array.lo1 - array.lo0 * array.stride0)
+            except Exception:
+                continue  # 留给循环里原来的路径在原来的时机报错
+
+    def _compile_case_of(self, node):
+        expr = self.compile(node.expr)
+        otherwise = self.compile_block(node.otherwise)
+        table = case_table(node)
+        if table is not None:
+            # 标签全是常量：查表直接找到分支
+            lookup = table.lookup
+            bodies = tuple(self.compile_block(stmts) for _, stmts in node.cases)
+
+            def case_table_jump():
+                index = lookup(expr())
+                for stmt in otherwise if index is None else bodies[index]:
+                    if stmt() is RETURN:
+                        return RETURN
+            return case_table_jump
+
+        cases = tuple((self._compile_case_label(val), self.compile_block(stmts)) for val, stmts in node.cases)
+
+        def case_of():
+            case_val = expr()
+            for matches, stmts in cases:
+                if matches(case_val):
+                    for stmt in stmts:
+                        if stmt() is RETURN:
+                            return RETURN
+                    return
+            for stmt in otherwise:
+                if stmt() is RETURN:
+                    return RETURN
+        return case_of
+
+    def _compile_case_label(self, label):
+        # 标签编译成 “值 -> 是否匹配” 的函数
+        if label.__class__ is CaseRange:
+            low = self.compile(label.low)
+            high = self.compile(label.high)
+            return lambda value: in_case_range(value, low(), high())
+        val_fn = self.compile(label)
+        return lambda value: val_fn() == value
+
+    def _compile_call_stmt(self, node):
+        call = node.call
+        return lambda: self._execute_call(call, expect_return=False)
+
+    def _compile_call(self, node):
+        builtin = lookup_builtin(node.name)
+        if builtin is not None:
+            return self._compile_builtin_call(builtin.name, node.args)
+        return lambda: self._execute_call(node, expect_return=True)
+
+    def _compile_builtin_call(self, name, arg_nodes):
+        # 编译时就取出这个解释器的实现函数，常见的参数个数不用拼参数 list
+        args = tuple(self.compile(arg) for arg in arg_nodes)
+        if len(args) != LIBRARY[name].arity:
+            def wrong_arity():
+                for fn in args:
+                    fn()
+                check_arity(name, len(args))
+            return wrong_arity
+        fn = self.builtins[name]
+        if len(args) == 0:
+            return fn
+        if len(args) == 1:
+            (a,) = args
+            return lambda: fn(a())
+        if len(args) == 2:
+            a, b = args
+            return lambda: fn(a(), b())
+        return lambda: fn(*[arg() for arg in args])
+
+    def _compile_return(self, node):
+        expr = self.compile(node.expr) if node.expr is not None else (lambda: None)
+
+        def ret():
+            if self.frame is None:
+                raise Exception("RETURN outside of a FUNCTION or PROCEDURE")
+            self._return_value = expr()
+            return RETURN
+        return ret
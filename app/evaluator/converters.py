@@ -0,0 +1,204 @@
+import datetime
+
+from app.evaluator.ast import *
+from app.evaluator.library import LIBRARY
+from app.evaluator.ropes import Rope, text
+
+# 赋值时按声明类型转换 / 检查值。
+# 运行时：DECLARE 时按类型取一次转换函数（CONVERTERS），之后每次赋值直接调用，不再按类型名逐个比较。
+# 加载时：mark_exact_stores 找出右边的类型在编译期就确定、和目标的声明类型一样的赋值，
+#         标上 exact，这些赋值完全不做转换。
+
+
+def to_string(value):
+    # & 拼出来的 Rope 本来就是字符串，存的时候不用拼成整串
+    return value if value.__class__ is Rope else str(value)
+
+
+def to_char(value):
+    if isinstance(value, str) and len(value) == 1:
+        return value
+    raise TypeError("CHAR must be a single character string")
+
+
+def to_boolean(value):
+    value = text(value)
+    if isinstance(value, str):
+        if value == "TRUE":
+            return True
+        if value == "FALSE":
+            return False
+        raise TypeError("Invalid BOOLEAN string")
+    if isinstance(value, bool):
+        return value
+    raise TypeError("Cannot convert to BOOLEAN")
+
+
+def to_date(value):
+    value = text(value)
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.strptime(value.strip(), "%Y-%m-%d").date()
+        except ValueError:
+            raise TypeError("DATE must be in format YYYY-MM-DD")
+    raise TypeError("Invalid DATE type")
+
+
+# 声明类型 -> 转换函数；不在表里的类型（数组、指针、自定义类型）赋值时原样存
+CONVERTERS = {
+    "INTEGER": int,
+    "REAL": float,
+    "STRING": to_string,
+    "CHAR": to_char,
+    "BOOLEAN": to_boolean,
+    "DATE": to_date,
+}
+
+
+def converter(type_):
+    # 不用转换时返回 None；type_ 也可能是 ArrayType / PointerType
+    return CONVERTERS.get(type_) if isinstance(type_, str) else None
+
+
+# ---- 编译期的值类型 ----
+
+# 这几种类型的变量里放的一定是对应的 Python 类型（int / float / str / bool）。
+# CHAR 和 DATE 的默认值（"" / None）本身就通不过转换，跳过转换会把该报的错吞掉，所以不算。
+VALUE_TYPES = ("INTEGER", "REAL", "STRING", "BOOLEAN")
+NUMERIC = ("INTEGER", "REAL")
+COMPARISONS = frozenset(("=", "<>", "<", ">", "<=", ">=", "AND", "OR"))
+BUILTIN_TYPES = {name: builtin.returns for name, builtin in LIBRARY.items() if builtin.returns in VALUE_TYPES}
+
+
+def _declared_key(type_):
+    if isinstance(type_, ArrayType):
+        return ("ARRAY", type_.base_type)
+    if isinstance(type_, str):
+        return type_
+    return "POINTER"
+
+
+class StoreTypes:
+    # 全程序扫一遍，按名字记下声明类型。变量的类型按名字查（和运行时的 var_types 一样），
+    # 所以同名变量的声明必须都一致才算数。以下名字的值不一定是声明的类型，读出来算类型未知：
+    #   - 形参（调用时不转换）、被取过地址的（经指针写入不转换）、INPUT 的目标
+    #   - 作为实参传给 BYREF 形参的（经 Reference 写回不转换）
+    #   - FOR 的循环变量，除非它声明为 INTEGER 且起止和步长都是 INTEGER
+    def __init__(self, program):
+        declared = {}
+        params = set()
+        unreliable = set()
+        byref = {}      # 过程 / 函数名 -> BYREF 形参的位置
+        calls = []
+        loops = []
+        for node in walk(program):
+            if isinstance(node, Declare):
+                declared.setdefault(node.name, set()).add(_declared_key(node.type))
+            elif isinstance(node, (ProcedureDef, FunctionDef)):
+                params.update(param.name for param in node.params)
+                positions = [k for k, param in enumerate(node.params) if param.byref]
+                if positions:
+                    byref[node.name] = positions
+            elif isinstance(node, AddressOf):
+                target = node.target
+                unreliable.add(target.var_name if isinstance(target, FieldAccess) else getattr(target, "name", None))
+            elif isinstance(node, Input):
+                unreliable.add(node.var_name)
+            elif isinstance(node, Call):
+                calls.append(node)
+            elif isinstance(node, For):
+                loops.append(node)
+        for call in calls:
+            for k in byref.get(call.name, ()):
+                if k < len(call.args) and isinstance(call.args[k], Var):
+                    unreliable.add(call.args[k].name)
+
+        # 赋值目标的声明类型：运行时按这个转换
+        self.declared = {name: next(iter(keys)) for name, keys in declared.items()
+                         if len(keys) == 1 and name not in params}
+        # 读出来的值的类型
+        self.values = {name: key for name, key in self.declared.items()
+                       if name not in unreliable and (key in VALUE_TYPES or
+                                                      isinstance(key, tuple) and key[1] in VALUE_TYPES)}
+        # 循环变量互相作为起止值时，一轮去掉一些可能让别的也不成立，直到不再变化
+        changed = True
+        while changed:
+            changed = False
+            for loop in loops:
+                name = loop.var_name
+                if name not in self.values:
+                    continue
+                bounds = (loop.start, loop.end) if loop.step is None else (loop.start, loop.end, loop.step)
+                if self.values[name] != "INTEGER" or any(self.type_of(b) != "INTEGER" for b in bounds):
+                    del self.values[name]
+                    changed = True
+
+    def type_of(self, node):
+        # 表达式的值在运行时一定是哪种类型（VALUE_TYPES 之一），看不准返回 None
+        if isinstance(node, BinaryOp):
+            # 沿左脊迭代，长运算链不递归
+            spine = []
+            while isinstance(node, BinaryOp):
+                spine.append(node)
+                node = node.left
+            result = self.type_of(node)
+            for node in reversed(spine):
+                result = self._binary_type(result, node.operator, node.right)
+            return result
+        if isinstance(node, Number):
+            return "INTEGER" if type(node.value) is int else "REAL"
+        if isinstance(node, String):
+            return "STRING"
+        if isinstance(node, (Boolean, UnaryOp)):
+            return "BOOLEAN"
+        if isinstance(node, Var):
+            if node.name.upper() in ("TRUE", "FALSE"):
+                return "BOOLEAN"
+            key = self.values.get(node.name)
+            return key if isinstance(key, str) else None
+        if isinstance(node, ArrayAccess):
+            key = self.values.get(node.name)
+            return key[1] if isinstance(key, tuple) else None
+        if isinstance(node, Call):
+            return BUILTIN_TYPES.get(node.name.upper())
+        return None
+
+    def _binary_type(self, left, op, right_node):
+        if op in COMPARISONS:
+            return "BOOLEAN"
+        if op == "&":
+            return "STRING"
+        if left not in NUMERIC:
+            return None
+        right = self.type_of(right_node)
+        if right not in NUMERIC:
+            return None
+        if op == "/":
+            return "REAL"
+        if op in ("+", "-", "*"):
+            return "INTEGER" if left == right == "INTEGER" else "REAL"
+        return None
+
+    def is_exact(self, node):
+        # 赋值的右边是不是已经是目标的声明类型，不用转换
+        target = node.target
+        if isinstance(target, Var):
+            expected = self.declared.get(target.name)
+        elif isinstance(target, ArrayAccess):
+            key = self.declared.get(target.name)
+            expected = key[1] if isinstance(key, tuple) else None
+        else:
+            return False
+        if expected == "CHAR":
+            # 单个字符的字面量不用再检查
+            return isinstance(node.value, String) and len(node.value.value) == 1
+        return expected in VALUE_TYPES and self.type_of(node.value) == expected
+
+
+def mark_exact_stores(program):
+    types = StoreTypes(program)
+    for node in walk(program):
+        if isinstance(node, Assign) and types.is_exact(node):
+            annotate(node, exact=True)
@@ -0,0 +1,113 @@
+import mmap
+import os
+
+# INPUT 从哪里读。每个解释器有自己的 feed（Interpreter(input=...)），批量运行不用替换 builtins.input：
+#   ConsoleFeed: 终端上用 input() 读，显示提示（默认）
+#   LinesFeed:   事先给好的若干行（list / 迭代器 / 一整段文本）
+#   FileFeed:    文本文件，一行一个值，边读边用
+#   MmapFeed:    内存映射的测试数据文件，同一份数据跑很多次时 rewind() 从头再读
+# 读完了还要 INPUT 时报 InputExhausted，说明是哪个变量、已经读了几行。
+# 非交互的 feed 默认不显示提示；要提示时解释器把 “提示 + 读到的值” 作为一行写进输出，和终端上看到的一样。
+
+
+class InputExhausted(Exception):
+    pass
+
+
+class Feed:
+    interactive = False
+
+    def __init__(self):
+        self.count = 0      # 已经读了几行
+
+    def read_line(self, var_name, prompt=None):
+        # 返回不带换行符的一行
+        line = self._next(prompt)
+        if line is None:
+            raise InputExhausted(f"No input left for '{var_name}' "
+                                 f"(after {self.count} line{'s' if self.count != 1 else ''})")
+        self.count += 1
+        return line
+
+    def _next(self, prompt):
+        # 下一行，没有了返回 None
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def _strip_newline(line):
+    if line.endswith("\n"):
+        line = line[:-1]
+    if line.endswith("\r"):
+        line = line[:-1]
+    return line
+
+
+class ConsoleFeed(Feed):
+    interactive = True
+
+    def _next(self, prompt):
+        try:
+            return input(prompt or "")
+        except EOFError:
+            return None
+
+
+class LinesFeed(Feed):
+    def __init__(self, lines):
+        super().__init__()
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        self.lines = iter(lines)
+
+    def _next(self, prompt):
+        line = next(self.lines, None)
+        return None if line is None else _strip_newline(line)
+
+
+class FileFeed(Feed):
+    # path 是文件名时由 feed 打开，close() 时关掉；也可以传已经打开的文本文件
+    def __init__(self, path, encoding="utf-8"):
+        super().__init__()
+        if hasattr(path, "readline"):
+            self.file, self.owned = path, False
+        else:
+            self.file, self.owned = open(path, encoding=encoding), True
+
+    def _next(self, prompt):
+        line = self.file.readline()
+        return _strip_newline(line) if line else None
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+
+
+class MmapFeed(Feed):
+    def __init__(self, path, encoding="utf-8"):
+        super().__init__()
+        self.encoding = encoding
+        with open(path, "rb") as f:
+            # 空文件不能映射，当作没有输入
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self.pos = 0
+
+    def _next(self, prompt):
+        data, pos = self.map, self.pos
+        if pos >= len(data):
+            return None
+        end = data.find(b"\n", pos)
+        if end < 0:
+            end = len(data)
+        self.pos = end + 1
+        return _strip_newline(data[pos:end].decode(self.encoding))
+
+    def rewind(self):
+        self.pos = 0
+        self.count = 0
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
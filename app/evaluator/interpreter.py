@@ -1,15 +1,60 @@
 from app.evaluator.ast import *
+from app.evaluator.arrays import PseudoArray
+from app.evaluator.cases import case_table, in_case_range
+from app.evaluator.converters import converter
+from app.evaluator.feeds import ConsoleFeed
+from app.evaluator.library import LIBRARY, bind as bind_builtins, check_arity, lookup as lookup_builtin
+from app.evaluator.limits import Limits
+from app.evaluator.resolver import LOCAL, GLOBAL, REF, CONST, UNSET, resolve_program
+from app.evaluator.ropes import concat
+from app.evaluator.sinks import StdoutSink
 import datetime
+import random
 
-class ReturnSignal(Exception):
-    def __init__(self, value):
-        self.value = value
+class _Return:
+    # 语句的完成值：正常结束返回 None，执行了 RETURN 返回 RETURN，
+    # 返回值放在 Interpreter._return_value。块/循环看到 RETURN 就原样往上传，
+    # 直到 _execute_call 收下，不再靠抛异常回退。
+    def __repr__(self):
+        return "<return>"
+
+
+RETURN = _Return()
+
+# 短路运算：左边的真假等于这个值时结果就是它，右边不再求值
+SHORT_CIRCUIT = {"AND": False, "OR": True}
+
+# 默认最多嵌套多少层过程/函数调用；vm 引擎用自己的帧栈，10^5 层递归也不受 Python 限制
+DEFAULT_MAX_DEPTH = 200_000
+
+
+class StackOverflow(Exception):
+    pass
+
+
+def for_range(start, end, step=1):
+    # FOR 循环变量依次取的值（包含 end），几个执行引擎共用。
+    # 全是整数就是 range：循环体里改循环变量不影响次数；有 REAL 时按 start + k * step 算，不累积误差
+    if step == 0:
+        raise Exception("FOR loop STEP cannot be 0")
+    if type(start) is int and type(end) is int and type(step) is int:
+        return range(start, end + 1 if step > 0 else end - 1, step)
+    return _real_range(start, end, step)
+
+
+def _real_range(start, end, step):
+    k = 0
+    value = start
+    while (value <= end) if step > 0 else (value >= end):
+        yield value
+        k += 1
+        value = start + k * step
 
 @dataclass
 class Reference:
-    # 用来包装 BYREF 参数：持有 container 和 key，读写反射回原处
-    container: dict
-    key: str
+    # BYREF 参数和指针：持有 container（帧、结构体或数组）和 key，读写反射回原处
+    container: object
+    key: object
 
     def get(self):
         return self.container[self.key]
@@ -17,49 +62,34 @@ class Reference:
     def set(self, value):
         self.container[self.key] = value
 
-class FrameWrapper:
-    def __init__(self, local: dict, outer: dict):
-        self.local = local  # 形参+局部
-        self.outer = outer  # 之前的 env（全局或上层 frame）
-
-    def __getitem__(self, key):
-        if key in self.local:
-            val = self.local[key]
-            if isinstance(val, Reference):
-                return val.get()
-            return val
-        if key in self.outer:
-            return self.outer[key]
-        raise KeyError(key)
-
-    def __setitem__(self, key, value):
-        # 赋值优先写入已有的 local（包含 Reference）
-        if key in self.local:
-            existing = self.local[key]
-            if isinstance(existing, Reference):
-                existing.set(value)
-                return
-            self.local[key] = value
-        elif key in self.outer:
-            # 修改外层（例如全局变量被遮蔽然后赋值）
-            self.outer[key] = value
-        else:
-            # 新变量默认放 local
-            self.local[key] = value
-
-    def __contains__(self, key):
-        return key in self.local or key in self.outer
-
-
-
 class Interpreter:
-    def __init__(self):
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, seed=None, output=None, input=None, prompts=None,
+                 max_steps=None, time_limit=None):
         # self.variables = {}  # 用来记录变量的值
-        self.env = {}
+        self.globals = []        # 全局帧：resolver 分配的槽位 -> 值
+        self.frame = None        # 当前过程/函数的局部帧
         self.var_types = {}  # 变量名 -> 类型字符串
+        # 赋值时用的转换函数，DECLARE 时按类型定好（None 表示不转换）。按绑定记，不按名字：
+        # 全局槽位 -> 函数；当前帧的局部槽位 -> 函数（每次调用一张，形参按声明的类型先填好）
+        self.global_converters = {}
+        self.local_converters = None
+        self.param_converters = {}   # 过程/函数名 -> 新帧转换表的模板
         self.user_types = {}  # key: type name, value: dict of field names and types
         self.procedures = {}     # name -> ProcedureDef
         self.functions = {}      # name -> FunctionDef
+        self._handlers = {}      # 节点类型 -> 绑定好的处理方法（见 DISPATCH）
+        self._return_value = None  # 最近一次 RETURN 的值
+        self.max_depth = max_depth   # 调用深度上限，超过报 StackOverflow
+        self.depth = 0
+        self.rng = random.Random(seed)   # RAND 用的随机数发生器，每个解释器一个；给了 seed 结果可以重现
+        self.builtins = bind_builtins(self)  # 内建函数名 -> 函数
+        self.output = output if output is not None else StdoutSink()  # OUTPUT 写到这里，见 sinks
+        self.input = input if input is not None else ConsoleFeed()   # INPUT 从这里读，见 feeds
+        # 显示 INPUT 的提示吗；默认只在终端上读的时候显示
+        self.prompts = self.input.interactive if prompts is None else prompts
+        # 步数 / 时间上限，见 limits；没有上限时 _tick 是 None，循环和调用里不计数
+        self.limits = Limits(max_steps, time_limit) if max_steps is not None or time_limit is not None else None
+        self._tick = self.limits.tick if self.limits is not None else None
 
 
     def _execute_call(self, call: Call, expect_return: bool):
@@ -70,92 +100,133 @@ class Interpreter:
         if name in self.procedures:
             # 处理 PROCEDURE 调用
             proc = self.procedures[name]
-            frame_env = {}
-            for param, arg_expr in zip(proc.params, args):
+            frame = [UNSET] * proc.nlocals
+            # 形参占前几个槽位；多余的实参丢弃，和 zip() 一致
+            for slot, (param, arg_expr) in enumerate(zip(proc.params, args)):
                 # always BYVAL for PROCEDURE per spec
-                val = self.eval(arg_expr)
-                frame_env[param.name] = val
-            old_env = self.env
-            self.env = FrameWrapper(frame_env, self.env)
+                frame[slot] = self.eval(arg_expr)
+            if self._tick is not None:  # 实参都算完、进入过程之前算一步
+                self._tick(proc.line)
+            if self.depth >= self.max_depth:
+                raise self._stack_overflow(name)
+            old_frame, old_converters = self.frame, self.local_converters
+            self.frame = frame
+            self.local_converters = self.param_converters[name].copy()
+            self.depth += 1
             try:
-                for stmt in proc.body:
-                    self.eval(stmt)
+                self._run_body(proc.body)
+            except RecursionError:
+                raise self._recursion_overflow(name) from None
             finally:
-                self.env = old_env
+                self.frame, self.local_converters = old_frame, old_converters
+                self.depth -= 1
 
             return None
 
         # 然后看 function
         if name in self.functions:
             func = self.functions[name]
-            frame_env = {}
-            for param, arg_expr in zip(func.params, args):
+            frame = [UNSET] * func.nlocals
+            for slot, (param, arg_expr) in enumerate(zip(func.params, args)):
                 if param.byref:
                     target = arg_expr
                     if isinstance(target, Var):
-                        if target.name not in self.env:
+                        if self._load(target) is UNSET:
                             raise Exception(f"Variable '{target.name}' not declared for BYREF")
-                        frame_env[param.name] = Reference(self.env, target.name)
+                        frame[slot] = self._reference(target)
                     elif isinstance(target, FieldAccess):
-                        struct = self.env.get(target.var_name)
+                        struct = self._load(target)
                         if not isinstance(struct, dict):
                             raise Exception(f"'{target.var_name}' is not structured for BYREF")
-                        frame_env[param.name] = Reference(struct, target.field_name)
+                        frame[slot] = Reference(struct, target.field_name)
                     else:
                         raise Exception("BYREF requires variable or field")
                 else:
-                    val = self.eval(arg_expr)
-                    frame_env[param.name] = val
-
-            old_env = self.env
-            self.env = FrameWrapper(frame_env, self.env)
+                    frame[slot] = self.eval(arg_expr)
+
+            if self._tick is not None:
+                self._tick(func.line)
+            if self.depth >= self.max_depth:
+                raise self._stack_overflow(name)
+            old_frame, old_converters = self.frame, self.local_converters
+            self.frame = frame
+            self.local_converters = self.param_converters[name].copy()
+            self.depth += 1
             try:
-                for stmt in func.body:
-                    try:
-                        self.eval(stmt)
-                    except ReturnSignal as rs:
-                        return rs.value
+                if self._run_body(func.body) is RETURN:
+                    return self._return_value
                 # 如果没有 return，可以返回 None 或抛错
                 return None
+            except RecursionError:
+                raise self._recursion_overflow(name) from None
             finally:
-                self.env = old_env
+                self.frame, self.local_converters = old_frame, old_converters
+                self.depth -= 1
 
         raise Exception(f"Unknown procedure/function: {name}")
 
+    def _stack_overflow(self, name):
+        return StackOverflow(f"Stack overflow: more than {self.max_depth} nested calls (in '{name}')")
+
+    def _recursion_overflow(self, name=None, depth=None):
+        # 树遍历每层调用要占好几个 Python 帧，还没到 max_depth 先撞上的是 Python 的递归上限；
+        # 在最里层的调用里报，带上已经嵌套的层数和过程名
+        if depth is None:
+            depth = self.depth
+        if name is None:
+            return StackOverflow("Stack overflow: nesting too deep for this engine "
+                                 "(the vm engine keeps calls on its own stack)")
+        return StackOverflow(f"Stack overflow: Python's recursion limit reached after {depth} nested calls "
+                             f"(in '{name}'), before max_depth {self.max_depth} "
+                             f"(the vm engine keeps calls on its own stack)")
+
+    # ---- 按 resolver 绑定的 (scope, slot) 读写变量 ----
+    def _load(self, node):
+        # 取变量当前的值；没声明过返回 UNSET
+        scope = node.scope
+        if scope == GLOBAL:
+            return self.globals[node.slot]
+        if scope == LOCAL:
+            return self.frame[node.slot]
+        if scope == REF:
+            return self.frame[node.slot].get()
+        return UNSET
+
+    def _store(self, node, value):
+        scope = node.scope
+        if scope == GLOBAL:
+            self.globals[node.slot] = value
+        elif scope == LOCAL:
+            self.frame[node.slot] = value
+        elif scope == REF:
+            self.frame[node.slot].set(value)
+        else:
+            raise Exception(f"Cannot assign to '{getattr(node, 'name', node)}'")
+
+    def _reference(self, node):
+        # 变量本身的地址；BYREF 形参直接转交它指向的位置
+        scope = node.scope
+        if scope == GLOBAL:
+            return Reference(self.globals, node.slot)
+        if scope == LOCAL:
+            return Reference(self.frame, node.slot)
+        if scope == REF:
+            return self.frame[node.slot]
+        raise Exception(f"Cannot take address of '{node.name}'")
+
+    def _run_body(self, body):
+        # 执行过程/函数体，返回完成值；其他执行引擎可以覆盖这里
+        for stmt in body:
+            if self.eval(stmt) is RETURN:
+                return RETURN
+        return None
+
 
     def convert(self, value, expected_type):
-        if expected_type == "INTEGER":
-            return int(value)
-        elif expected_type == "REAL":
-            return float(value)
-        elif expected_type == "STRING":
-            return str(value)
-        elif expected_type == "CHAR":
-            if isinstance(value, str) and len(value) == 1:
-                return value
-            raise TypeError("CHAR must be a single character string")
-        elif expected_type == "BOOLEAN":
-            if isinstance(value, str):
-                if value == "TRUE":
-                    return True
-                if value == "FALSE":
-                    return False
-                raise TypeError("Invalid BOOLEAN string")
-            if isinstance(value, bool):
-                return value
-            raise TypeError("Cannot convert to BOOLEAN")
-        elif expected_type == "DATE":
-            if isinstance(value, str):
-                try:
-                    return datetime.datetime.strptime(value.strip(), "%Y-%m-%d").date()
-                except ValueError:
-                    raise TypeError("DATE must be in format YYYY-MM-DD")
-            if isinstance(value, datetime.date):
-                return value
-            raise TypeError("Invalid DATE type")
-        else:
-            return value
-        
+        # 按类型名转换；变量赋值用 DECLARE 时定好的 global_converters / local_converters，不走这里
+        convert = converter(expected_type)
+        return value if convert is None else convert(value)
+
     def default_value(self, type_name):
         if type_name == "INTEGER":
             return 0
@@ -175,427 +246,494 @@ class Interpreter:
 
 
 
+    # 节点类型 -> 处理方法名。eval 按 type(node) 查表，每种类型只解析一次，
+    # 不再逐个 isinstance 往下试。
+    DISPATCH = {
+        Program: "_eval_program",
+        ArrayAccess: "_eval_array_access",
+        Declare: "_eval_declare",
+        Assign: "_eval_assign",
+        Var: "_eval_var",
+        Number: "_eval_number",
+        Boolean: "_eval_number",
+        Output: "_eval_output",
+        BinaryOp: "_eval_binary_op",
+        UnaryOp: "_eval_unary_op",
+        While: "_eval_while",
+        If: "_eval_if",
+        String: "_eval_string",
+        For: "_eval_for",
+        RepeatUntil: "_eval_repeat_until",
+        CaseOf: "_eval_case_of",
+        Input: "_eval_input",
+        FieldAccess: "_eval_field_access",
+        TypeDef: "_eval_type_def",
+        ProcedureDef: "_eval_procedure_def",
+        FunctionDef: "_eval_function_def",
+        CallStmt: "_eval_call_stmt",
+        Call: "_eval_call",
+        Return: "_eval_return",
+        AddressOf: "_eval_address_of",
+        Dereference: "_eval_dereference",
+        ClassDef: "_eval_class_def",
+    }
+
     def eval(self, node):
-        if isinstance(node, Program):
+        handler = self._handlers.get(node.__class__)
+        if handler is None:
+            handler = self._resolve_handler(node.__class__)
+        return handler(node)
+
+    def _resolve_handler(self, node_type):
+        # 沿 MRO 找，子类节点也能用父类的处理方法；找到后缓存
+        for klass in node_type.__mro__:
+            name = self.DISPATCH.get(klass)
+            if name is not None:
+                handler = getattr(self, name)
+                self._handlers[node_type] = handler
+                return handler
+        raise Exception(f"Unknown node type: {node_type}")
+
+    def _eval_program(self, node):
+        self._start(node)
+        try:
             for stmt in node.statements:
                 self.eval(stmt)
-
-        elif isinstance(node, ArrayAccess):
-            array_name = node.name
-            array_info = self.env.get(array_name)
-            if array_info is None or not isinstance(array_info, dict) or not array_info.get("is_array"):
-                raise Exception(f"'{array_name}' is not an array")
-            indices = [self.eval(idx) for idx in node.indices]
-            lowers = array_info["lowers"]
-            uppers = array_info["uppers"]
-            if len(indices) != len(lowers):
-                raise Exception(f"Incorrect number of indices for array '{array_name}'")
-            for i, ind in enumerate(indices):
-                if not (lowers[i] <= ind <= uppers[i]):
-                    raise Exception(f"Index {ind} out of bounds for dimension {i+1} of array '{array_name}'")
-            key = tuple(indices)
-            if key in array_info["data"]:
-                return array_info["data"][key]
-            else:
-                # 未赋值返回 base type 的默认值
-                base = array_info["base_type"]
-                return self.default_value(base)
-
-
-        elif isinstance(node, Declare):
-            # 指针
-            if isinstance(node.type, PointerType):
-                self.env[node.name] = None
-                self.var_types[node.name] = node.type
-                return None
-
-            # 内建标量类型
-            if isinstance(node.type, str) and node.type in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE"):
-                self.env[node.name] = self.default_value(node.type)
-                self.var_types[node.name] = node.type
-                return None
-
-            # 数组
-            if isinstance(node.type, ArrayType):
-                lowers = [(self.eval(b) if not isinstance(b, int) else b) for b in node.type.lowers]
-                uppers = [(self.eval(b) if not isinstance(b, int) else b) for b in node.type.uppers]
-                self.env[node.name] = {
-                    "is_array": True,
-                    "lowers": lowers,
-                    "uppers": uppers,
-                    "base_type": node.type.base_type,
-                    "data": {},
-                }
-                self.var_types[node.name] = node.type
-                return None
-
-            # 用户自定义类型（类）
-            if isinstance(node.type, str) and node.type in self.user_types:
-                typedef = self.user_types[node.type]
-
-                # ✅ 现在只支持 ClassDef，不再是 dict
-                if isinstance(typedef, ClassDef):
-                    # 初始化实例：把所有字段设成默认值
-                    instance = {}
-                    for access, field_name, field_type in typedef.fields:
-                        instance[field_name] = self.default_value(field_type)
-                    self.env[node.name] = instance
-                    # 记下这个变量的“类型”为 ClassDef，后续 FieldAccess 用得到
-                    self.var_types[node.name] = typedef.name
-                    return None
-
-                # 兼容指针别名
-                if isinstance(typedef, PointerType):
-                    self.env[node.name] = None
-                    self.var_types[node.name] = typedef
-                    return None
-
-                # （若你未来有 ArrayType 的 type alias，这里也可以加）
-                raise Exception(f"Unsupported user-defined type: {typedef}")
-
-            raise Exception(f"Unknown type '{node.type}'")
-
-
-        elif isinstance(node, Assign):
-            # print("DEBUG Assign:", node)
-            value = self.eval(node.value)
-
-            # 普通变量
-            if isinstance(node.target, Var):
-                var_name = node.target.name
-                if var_name not in self.env:
-                    raise Exception(f"Variable '{var_name}' used before declaration.")
-                else:
-                    expected_type = self.var_types.get(var_name)
-                    if expected_type:
-                        value = self.convert(value, expected_type)
-                    self.env[var_name] = value
-
-            # 字段访问（user-defined type）
-            elif isinstance(node.target, FieldAccess):
-                var_name = node.target.var_name
-                field_name = node.target.field_name
-
-                if var_name not in self.env:
-                    raise Exception(f"Variable '{var_name}' not declared")
-
-                type_name = self.var_types[var_name]
-                typedef = self.user_types[type_name]
-                if not isinstance(typedef, ClassDef):
-                    raise Exception(f"Type '{type_name}' is not a class/struct")
-
-                field_types = {fname: ftype for _, fname, ftype in typedef.fields}
-                if field_name not in field_types:
-                    raise Exception(f"'{field_name}' is not a field of type '{type_name}'")
-
-                value = self.eval(node.value)
-                self.env[var_name][field_name] = value
-
-            # 数组访问
-            elif isinstance(node.target, ArrayAccess):
-                array_name = node.target.name
-                array_info = self.env.get(array_name)
-                if array_info is None or not isinstance(array_info, dict) or not array_info.get("is_array"):
-                    raise Exception(f"'{array_name}' is not an array")
-                # 计算索引值
-                indices = [self.eval(idx) for idx in node.target.indices]
-                # bounds check
-                lowers = [self.eval(b) if not isinstance(b, int) else b for b in array_info["lowers"]]
-                uppers = [self.eval(b) if not isinstance(b, int) else b for b in array_info["uppers"]]
-                if len(indices) != len(lowers):
-                    raise Exception(f"Incorrect number of indices for array '{array_name}'")
-                for i, ind in enumerate(indices):
-                    if not (lowers[i] <= ind <= uppers[i]):
-                        raise Exception(f"Index {ind} out of bounds for dimension {i+1} of array '{array_name}'")
-                # 类型转换并赋值
-                base_type = array_info["base_type"]
-                converted = self.convert(value, base_type)
-                key = tuple(indices)
-                array_info["data"][key] = converted
-            
-            elif isinstance(node.target, Dereference):
-                # 类似解引用左值写回
-                ptr = self.eval(node.target.pointer)
-                if not isinstance(ptr, PointerRef):
-                    raise Exception("Left side is not a pointer dereference")
-                name = ptr.var_name
-                if isinstance(name, str):
-                    self.env[name] = value
-                elif isinstance(name, tuple):
-                    if len(name) == 2 and isinstance(name[1], str):
-                        struct = self.env.get(name[0])
-                        if struct is None or not isinstance(struct, dict):
-                            raise Exception(f"'{name[0]}' is not structured")
-                        struct[name[1]] = value
-                    elif len(name) == 2 and isinstance(name[1], tuple):
-                        array_name, idxs = name
-                        array_info = self.env.get(array_name)
-                        key = tuple(idxs)
-                        array_info["data"][key] = value
-                else:
-                    raise Exception(f"Cannot assign to dereferenced pointer: {name}")
-
-
-            else:
-                raise Exception("Unsupported assignment target")
-
-        elif isinstance(node, Var):
-            if node.name.upper() == "TRUE":
-                return True
-            elif node.name.upper() == "FALSE":
-                return False
-            else:
-                if node.name not in self.env:
-                    raise Exception(f"Variable '{node.name}' was not declared.")
-                return self.env[node.name]
-
-        elif isinstance(node, Number):
-            return int(node.value)
-        elif isinstance(node, Output):
-            output_strs = []
-            for v in node.values:
-                val = self.eval(v)
-                if isinstance(val, bool):
-                    output_strs.append("TRUE" if val else "FALSE")
-                else:
-                    output_strs.append(str(val))
-            print(" ".join(output_strs))
-
-
-
-        elif isinstance(node, BinaryOp):
-            left = self.eval(node.left)
-            right = self.eval(node.right)
-            return self.apply_op(left, node.operator, right)
-        elif isinstance(node, UnaryOp):
-            right = self.eval(node.operand)
-            return not bool(right)
-        elif isinstance(node, While):
-            while self.eval(node.condition):
-                for stmt in node.body:
-                    self.eval(stmt)
-        elif isinstance(node, If):
-            if self.eval(node.condition):
-                for stmt in node.then_body:
-                    self.eval(stmt)
-            elif node.else_body:
-                for stmt in node.else_body:
-                    self.eval(stmt)
-        elif isinstance(node, String):
-            return node.value
-        elif isinstance(node, For):
-            start = self.eval(node.start)
-            end = self.eval(node.end)
-            for i in range(start, end + 1):  # 包含 end
-                self.env[node.var_name] = i
-                for stmt in node.body:
-                    self.eval(stmt)
-        elif isinstance(node, RepeatUntil):
-            while True:
-                for stmt in node.body:
-                    self.eval(stmt)
-                if self.eval(node.condition):
-                    break
-
-        elif isinstance(node, CaseOf):
-            case_val = self.eval(node.expr)
-            matched = False
-            for val_node, stmts in node.cases:
-                if self.eval(val_node) == case_val:
-                    for stmt in stmts:
-                        self.eval(stmt)
-                    matched = True
-                    break
-            if not matched:
-                for stmt in node.otherwise:
-                    self.eval(stmt)
-
-        elif isinstance(node, Input):
-            user_input = input(f"Enter value for {node.var_name}: ")
-            expected_type = self.var_types.get(node.var_name)
-
-            try:
-                if expected_type == "INTEGER":
-                    value = int(user_input)
-                elif expected_type == "REAL":
-                    value = float(user_input)
-                elif expected_type == "STRING":
-                    value = str(user_input)
-                elif expected_type == "CHAR":
-                    if len(user_input) != 1:
-                        raise ValueError("CHAR must be a single character")
-                    value = user_input
-                elif expected_type == "BOOLEAN":
-                    val = user_input.strip()
-                    if val == "TRUE": #之前的写法是val in ("false", 0),但是考试不允许,只能是全大写
-                        value = True
-                    elif val == "FALSE": #之前的写法是val in ("false", 0),但是考试不允许,只能是全大写
-                        value = False
-                    else:
-                        raise ValueError("Invalid boolean input")
-                elif expected_type == "DATE":
-                    value = datetime.datetime.strptime(user_input.strip(), "%Y-%m-%d").date()
-                else:
-                    value = user_input
-            except Exception as e:
-                raise ValueError(f"Invalid input for {expected_type}: {e}")
-
-            self.env[node.var_name] = value
-
-        elif isinstance(node, FieldAccess):
-            var_name = node.var_name
-            field_name = node.field_name
-
-            if var_name not in self.env:
+        except RecursionError:
+            raise self._recursion_overflow() from None
+        finally:
+            self.output.flush()
+
+    def _start(self, program):
+        # 解析变量绑定，分配全局帧（原地重置，编译好的闭包里存的引用保持有效）
+        resolve_program(program)
+        self.globals[:] = [UNSET] * len(program.global_names)
+        self.frame = None
+        self.global_converters.clear()
+        self.local_converters = None
+        self.depth = 0
+        self._start_limits()
+
+    def _start_limits(self):
+        if self.limits is not None:
+            self.limits.start()
+
+    def _array(self, node):
+        array = self._load(node)
+        if not isinstance(array, PseudoArray):
+            raise Exception(f"'{node.name}' is not an array")
+        return array
+
+    def _eval_array_access(self, node):
+        array = self._array(node)
+        indices = node.indices
+        # 1D / 2D 走快速路径，不用先拼下标 list
+        if len(indices) == 1:
+            return array.get1(self.eval(indices[0]))
+        if len(indices) == 2:
+            return array.get2(self.eval(indices[0]), self.eval(indices[1]))
+        return array.get([self.eval(idx) for idx in indices])
+
+    def _eval_declare(self, node):
+        value, var_type = self._declare_value(node.type, node.name)
+        self._store(node, value)
+        self._set_type(node.name, var_type)
+        converters = self.global_converters if node.scope == GLOBAL else self.local_converters
+        converters[node.slot] = converter(var_type)
+
+    def _set_type(self, name, var_type):
+        self.var_types[name] = var_type
+
+    def _declare_value(self, type_, name=None):
+        # 返回 (初始值, 记录到 var_types 里的类型)
+        # 指针
+        if isinstance(type_, PointerType):
+            return None, type_
+
+        # 内建标量类型
+        if isinstance(type_, str) and type_ in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE"):
+            return self.default_value(type_), type_
+
+        # 数组
+        if isinstance(type_, ArrayType):
+            lowers = [(self.eval(b) if not isinstance(b, int) else b) for b in type_.lowers]
+            uppers = [(self.eval(b) if not isinstance(b, int) else b) for b in type_.uppers]
+            # 未赋值的元素就是 base type 的默认值
+            default = self.default_value(type_.base_type)
+            return PseudoArray(name, lowers, uppers, type_.base_type, default), type_
+
+        # 用户自定义类型（类）
+        if isinstance(type_, str) and type_ in self.user_types:
+            typedef = self.user_types[type_]
+
+            # ✅ 现在只支持 ClassDef，不再是 dict
+            if isinstance(typedef, ClassDef):
+                # 初始化实例：把所有字段设成默认值
+                instance = {}
+                for access, field_name, field_type in typedef.fields:
+                    instance[field_name] = self.default_value(field_type)
+                # 记下这个变量的“类型”为 ClassDef，后续 FieldAccess 用得到
+                return instance, typedef.name
+
+            # 兼容指针别名
+            if isinstance(typedef, PointerType):
+                return None, typedef
+
+            # （若你未来有 ArrayType 的 type alias，这里也可以加）
+            raise Exception(f"Unsupported user-defined type: {typedef}")
+
+        raise Exception(f"Unknown type '{type_}'")
+
+    def _eval_assign(self, node):
+        # print("DEBUG Assign:", node)
+        value = self.eval(node.value)
+
+        # 普通变量
+        target = node.target
+        if isinstance(target, Var):
+            if target.scope == REF:
+                # BYREF 形参：写回实参所在的位置
+                self.frame[target.slot].set(value)
+                return
+            if self._load(target) is UNSET:
+                raise Exception(f"Variable '{target.name}' used before declaration.")
+            if not node.exact:
+                converters = self.global_converters if target.scope == GLOBAL else self.local_converters
+                convert = converters.get(target.slot)
+                if convert is not None:
+                    value = convert(value)
+            self._store(target, value)
+
+        # 字段访问（user-defined type）
+        elif isinstance(target, FieldAccess):
+            var_name = target.var_name
+            field_name = target.field_name
+
+            struct = self._load(target)
+            if struct is UNSET:
                 raise Exception(f"Variable '{var_name}' not declared")
 
-            # 取变量的类型名
-            type_name = self.var_types[var_name]  # e.g. "Student"
-            if type_name not in self.user_types:
-                raise Exception(f"Unknown type '{type_name}'")
-
+            type_name = self.var_types[var_name]
             typedef = self.user_types[type_name]
             if not isinstance(typedef, ClassDef):
                 raise Exception(f"Type '{type_name}' is not a class/struct")
 
-            # 检查字段是否存在
             field_types = {fname: ftype for _, fname, ftype in typedef.fields}
             if field_name not in field_types:
                 raise Exception(f"'{field_name}' is not a field of type '{type_name}'")
 
-            # 返回当前实例的字段值
-            return self.env[var_name][field_name]
-
-        
-        elif isinstance(node, TypeDef):
-            # 记录结构体定义：把字段列表变成名字->类型的 dict
-            # 假设 node.fields 是 [(field_name, field_type), ...]
-            self.user_types[node.name] = {fname: ftype for fname, ftype in node.fields}
-
-        elif isinstance(node, ProcedureDef):
-            self.procedures[node.name] = node
-
-        elif isinstance(node, FunctionDef):
-            self.functions[node.name] = node
-
-        elif isinstance(node, CallStmt):
-            return self._execute_call(node.call, expect_return=False)
-
-        elif isinstance(node, Call):
-            name = node.name.upper()  # 统一大小写判断内建
-            # ---- 内建 string / numeric functions ----
-            if name == "RIGHT":
-                s = self.eval(node.args[0])
-                x = self.eval(node.args[1])
-                if not isinstance(s, str):
-                    raise TypeError("RIGHT expects a string as first argument")
-                x = int(x)
-                return s[-x:] if x <= len(s) else s
-            elif name == "LENGTH":
-                s = self.eval(node.args[0])
-                if not isinstance(s, str):
-                    raise TypeError("LENGTH expects a string")
-                return len(s)
-            elif name == "MID":
-                s = self.eval(node.args[0])
-                start = self.eval(node.args[1])
-                length = self.eval(node.args[2])
-                if not isinstance(s, str):
-                    raise TypeError("MID expects a string as first argument")
-                start = int(start)
-                length = int(length)
-                if start < 1:
-                    raise ValueError("MID start must be >= 1")
-                return s[start - 1 : start - 1 + length]
-            elif name == "LCASE":
-                c = self.eval(node.args[0])
-                if not (isinstance(c, str) and len(c) == 1):
-                    raise TypeError("LCASE expects a single character")
-                return c.lower()
-            elif name == "UCASE":
-                c = self.eval(node.args[0])
-                if not (isinstance(c, str) and len(c) == 1):
-                    raise TypeError("UCASE expects a single character")
-                return c.upper()
-            elif name == "INT":
-                x = self.eval(node.args[0])
-                try:
-                    return int(float(x))
-                except Exception:
-                    raise TypeError("INT expects a numeric argument")
-            elif name == "RAND":
-                x = self.eval(node.args[0])
-                try:
-                    upper = float(x)
-                except Exception:
-                    raise TypeError("RAND expects a numeric argument")
-                import random
-                return random.random() * upper
-
-            # ---- 不是内建的就走用户定义的 function/procedure ----
-            return self._execute_call(node, expect_return=True)
-
-
-        elif isinstance(node, Return):
-            value = self.eval(node.expr) if node.expr is not None else None
-            raise ReturnSignal(value)
-        
-        elif isinstance(node, AddressOf):
-            # 取地址：返回指向变量名的轻量引用
-            # 只允许对 Var / FieldAccess / ArrayAccess 取地址，根据你定义可以只支持 Var
-            if isinstance(node.target, Var):
-                return PointerRef(var_name=node.target.name)
-            elif isinstance(node.target, FieldAccess):
-                # 可以取结构体字段的地址：表示“结构体.field”
-                return PointerRef(var_name=(node.target.var_name, node.target.field_name))
-            elif isinstance(node.target, ArrayAccess):
-                # 数组元素地址
-                indices = [self.eval(idx) for idx in node.target.indices]
-                return PointerRef(var_name=(node.target.name, tuple(indices)))
+            struct[field_name] = value
+
+        # 数组访问
+        elif isinstance(target, ArrayAccess):
+            array = self._array(target)
+            # 计算索引值（边界在 PseudoArray 里检查）
+            indices = target.indices
+            convert = array.convert
+            if len(indices) == 1:
+                i = self.eval(indices[0])
+                array.set1(i, value if node.exact else convert(value))
+            elif len(indices) == 2:
+                i = self.eval(indices[0])
+                j = self.eval(indices[1])
+                array.set2(i, j, value if node.exact else convert(value))
             else:
-                raise Exception(f"Cannot take address of {type(node.target)}")
-            
-        elif isinstance(node, Dereference):
-            ptr = self.eval(node.pointer)
-            if not isinstance(ptr, PointerRef):
-                raise Exception("Attempt to dereference a non-pointer")
-            name = ptr.var_name
-            # 支持三种地址形式：变量 / struct.field / array element
-            if isinstance(name, str):
-                return self.env.get(name)
-            elif isinstance(name, tuple):
-                if len(name) == 2 and isinstance(name[1], str):
-                    # struct field
-                    struct = self.env.get(name[0])
-                    if struct is None or not isinstance(struct, dict):
-                        raise Exception(f"'{name[0]}' is not structured")
-                    return struct.get(name[1])
-                elif len(name) == 2 and isinstance(name[1], tuple):
-                    # array element
-                    array_name, idxs = name
-                    array_info = self.env.get(array_name)
-                    if not array_info or not array_info.get("is_array"):
-                        raise Exception(f"'{array_name}' is not an array")
-                    key = tuple(idxs)
-                    if key in array_info["data"]:
-                        return array_info["data"][key]
-                    else:
-                        return self.default_value(array_info["base_type"])
-            raise Exception(f"Invalid pointer reference: {ptr}")
-        
-        elif isinstance(node, ClassDef):
-            # 注册类定义
-            # self.user_types[node.name] = {
-            #     "fields": node.fields,     # [(access, name, type)]
-            #     "methods": node.methods,   # [ProcedureDef / FunctionDef]
-            # }
-            # field_map = {fname: ftype for (access, fname, ftype) in node.fields}
-            # self.user_types[node.name] = field_map
-            self.user_types[node.name] = node
+                pos = array.offset([self.eval(idx) for idx in indices])
+                # 类型转换并赋值
+                array[pos] = value if node.exact else convert(value)
+
+        elif isinstance(target, Dereference):
+            # 类似解引用左值写回
+            ptr = self.eval(target.pointer)
+            if not isinstance(ptr, Reference):
+                raise Exception("Left side is not a pointer dereference")
+            ptr.set(value)
+
+        else:
+            raise Exception("Unsupported assignment target")
+
+    def _eval_var(self, node):
+        # resolver 已经把名字绑定到槽位，这里只剩一次下标和“是否已声明”的比较
+        scope = node.scope
+        if scope == GLOBAL:
+            value = self.globals[node.slot]
+        elif scope == LOCAL:
+            value = self.frame[node.slot]
+        elif scope == REF:
+            return self.frame[node.slot].get()
+        elif scope == CONST:
+            return node.slot
+        else:
+            value = UNSET
+        if value is UNSET:
+            raise Exception(f"Variable '{node.name}' was not declared.")
+        return value
+
+    def _eval_number(self, node):
+        # Number / Boolean：字面量在解析（或优化）时已经是值了
+        return node.value
+
+    def _eval_output(self, node):
+        self._output([self.eval(v) for v in node.values])
+
+    def _output(self, values):
+        output_strs = []
+        for val in values:
+            if isinstance(val, bool):
+                output_strs.append("TRUE" if val else "FALSE")
+            else:
+                output_strs.append(str(val))
+        self.output.write_line(" ".join(output_strs))
+
+    def _eval_binary_op(self, node):
+        if node.left.__class__ is BinaryOp:
+            return self._eval_chain(node)
+        left = self.eval(node.left)
+        decided = SHORT_CIRCUIT.get(node.operator)
+        if decided is not None and bool(left) is decided:
+            return decided
+        right = self.eval(node.right)
+        return self.apply_op(left, node.operator, right)
+
+    def _eval_chain(self, node):
+        # 左结合的长链 a + b + c ...：沿左脊收集，再从最左边往上算，不按链长递归
+        spine = []
+        while node.__class__ is BinaryOp:
+            spine.append(node)
+            node = node.left
+        value = self.eval(node)
+        for node in reversed(spine):
+            decided = SHORT_CIRCUIT.get(node.operator)
+            if decided is not None and bool(value) is decided:
+                value = decided
+            else:
+                value = self.apply_op(value, node.operator, self.eval(node.right))
+        return value
+
+    def _eval_unary_op(self, node):
+        right = self.eval(node.operand)
+        return not bool(right)
+
+    def _eval_while(self, node):
+        tick = self._tick
+        while self.eval(node.condition):
+            for stmt in node.body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+            if tick is not None:  # 回边：跳回去再判断条件之前算一步
+                tick(node.line)
+
+    def _eval_if(self, node):
+        if self.eval(node.condition):
+            for stmt in node.then_body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+        elif node.else_body:
+            for stmt in node.else_body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+
+    def _eval_string(self, node):
+        return node.value
+
+    def _eval_for(self, node):
+        start = self.eval(node.start)
+        end = self.eval(node.end)
+        step = 1 if node.step is None else self.eval(node.step)
+        store = self._store
+        tick = self._tick
+        for i in for_range(start, end, step):
+            store(node, i)
+            for stmt in node.body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+            if tick is not None:
+                tick(node.line)
+
+    def _eval_repeat_until(self, node):
+        tick = self._tick
+        while True:
+            for stmt in node.body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+            if self.eval(node.condition):
+                break
+            if tick is not None:
+                tick(node.line)
+
+    def _eval_case_of(self, node):
+        case_val = self.eval(node.expr)
+        table = case_table(node)
+        if table is not None:
+            # 标签全是常量：查表直接找到分支
+            index = table.lookup(case_val)
+            stmts = node.otherwise if index is None else node.cases[index][1]
+            for stmt in stmts or ():
+                if self.eval(stmt) is RETURN:
+                    return RETURN
             return None
+        matched = False
+        for val_node, stmts in node.cases:
+            if self._case_matches(val_node, case_val):
+                for stmt in stmts:
+                    if self.eval(stmt) is RETURN:
+                        return RETURN
+                matched = True
+                break
+        if not matched and node.otherwise:
+            for stmt in node.otherwise:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+
+    def _case_matches(self, label, value):
+        if label.__class__ is CaseRange:
+            return in_case_range(value, self.eval(label.low), self.eval(label.high))
+        return self.eval(label) == value
+
+    def _eval_input(self, node):
+        self._store(node, self._read_input(node.var_name, self.var_types.get(node.var_name)))
+
+    def _read_input(self, var_name, expected_type):
+        self.output.flush()  # 提示之前先把攒着的输出写出去
+        prompt = f"Enter value for {var_name}: " if self.prompts else None
+        user_input = self.input.read_line(var_name, prompt)
+        if prompt is not None and not self.input.interactive:
+            # 没有终端回显，把提示和读到的值记进输出
+            self.output.write_line(prompt + user_input)
+
+        try:
+            if expected_type == "INTEGER":
+                value = int(user_input)
+            elif expected_type == "REAL":
+                value = float(user_input)
+            elif expected_type == "STRING":
+                value = str(user_input)
+            elif expected_type == "CHAR":
+                if len(user_input) != 1:
+                    raise ValueError("CHAR must be a single character")
+                value = user_input
+            elif expected_type == "BOOLEAN":
+                val = user_input.strip()
+                if val == "TRUE": #之前的写法是val in ("false", 0),但是考试不允许,只能是全大写
+                    value = True
+                elif val == "FALSE": #之前的写法是val in ("false", 0),但是考试不允许,只能是全大写
+                    value = False
+                else:
+                    raise ValueError("Invalid boolean input")
+            elif expected_type == "DATE":
+                value = datetime.datetime.strptime(user_input.strip(), "%Y-%m-%d").date()
+            else:
+                value = user_input
+        except Exception as e:
+            raise ValueError(f"Invalid input for {expected_type}: {e}")
+
+        return value
+
+    def _eval_field_access(self, node):
+        var_name = node.var_name
+        field_name = node.field_name
+
+        struct = self._load(node)
+        if struct is UNSET:
+            raise Exception(f"Variable '{var_name}' not declared")
+
+        # 取变量的类型名
+        type_name = self.var_types[var_name]  # e.g. "Student"
+        if type_name not in self.user_types:
+            raise Exception(f"Unknown type '{type_name}'")
+
+        typedef = self.user_types[type_name]
+        if not isinstance(typedef, ClassDef):
+            raise Exception(f"Type '{type_name}' is not a class/struct")
+
+        # 检查字段是否存在
+        field_types = {fname: ftype for _, fname, ftype in typedef.fields}
+        if field_name not in field_types:
+            raise Exception(f"'{field_name}' is not a field of type '{type_name}'")
+
+        # 返回当前实例的字段值
+        return struct[field_name]
+
+    def _eval_type_def(self, node):
+        # 记录结构体定义：把字段列表变成名字->类型的 dict
+        # 假设 node.fields 是 [(field_name, field_type), ...]
+        self.user_types[node.name] = {fname: ftype for fname, ftype in node.fields}
+
+    def _eval_procedure_def(self, node):
+        self.procedures[node.name] = node
+        self._set_param_converters(node)
+
+    def _eval_function_def(self, node):
+        self.functions[node.name] = node
+        self._set_param_converters(node)
+
+    def _set_param_converters(self, node):
+        # 形参占前几个槽位；BYREF 形参的槽位里是 Reference，赋值不走转换
+        self.param_converters[node.name] = {slot: converter(param.type) for slot, param in enumerate(node.params)}
+
+    def _eval_call_stmt(self, node):
+        return self._execute_call(node.call, expect_return=False)
+
+    BUILTINS = tuple(LIBRARY)
+
+    def _eval_call(self, node):
+        name = node.builtin  # resolver 已经查过是不是内建函数
+        if name is None:
+            builtin = lookup_builtin(node.name)
+            name = builtin is not None and builtin.name
+        if name:
+            return self._call_builtin(name, [self.eval(arg) for arg in node.args])
+
+        # ---- 不是内建的就走用户定义的 function/procedure ----
+        return self._execute_call(node, expect_return=True)
+
+    def _call_builtin(self, name, args):
+        # name 是大写的内建函数名；实现见 library
+        if len(args) != LIBRARY[name].arity:
+            check_arity(name, len(args))
+        return self.builtins[name](*args)
+
+    def _eval_return(self, node):
+        if self.frame is None:
+            raise Exception("RETURN outside of a FUNCTION or PROCEDURE")
+        self._return_value = self.eval(node.expr) if node.expr is not None else None
+        return RETURN
+
+    def _eval_address_of(self, node):
+        # 取地址：返回指向变量 / 结构体字段 / 数组元素所在位置的 Reference
+        if isinstance(node.target, Var):
+            return self._reference(node.target)
+        elif isinstance(node.target, FieldAccess):
+            struct = self._load(node.target)
+            if not isinstance(struct, dict):
+                raise Exception(f"'{node.target.var_name}' is not structured")
+            return Reference(struct, node.target.field_name)
+        elif isinstance(node.target, ArrayAccess):
+            # 数组元素地址：数组对象 + 展平后的偏移量
+            indices = [self.eval(idx) for idx in node.target.indices]
+            array = self._array(node.target)
+            return Reference(array, array.offset(indices))
         else:
-            raise Exception(f"Unknown node type: {type(node)}")
-        
+            raise Exception(f"Cannot take address of {type(node.target)}")
+
+    def _eval_dereference(self, node):
+        ptr = self.eval(node.pointer)
+        if not isinstance(ptr, Reference):
+            raise Exception("Attempt to dereference a non-pointer")
+        value = ptr.get()
+        return None if value is UNSET else value
+
+    def _eval_class_def(self, node):
+        # 注册类定义
+        # self.user_types[node.name] = {
+        #     "fields": node.fields,     # [(access, name, type)]
+        #     "methods": node.methods,   # [ProcedureDef / FunctionDef]
+        # }
+        # field_map = {fname: ftype for (access, fname, ftype) in node.fields}
+        # self.user_types[node.name] = field_map
+        self.user_types[node.name] = node
+        return None
+
     def apply_op(self, left, op, right):
         if op == 'AND':
             return bool(left) and bool(right)
@@ -610,7 +748,7 @@ class Interpreter:
         elif op == '/':
             return left / right
         elif op == '&':
-            return str(left) + str(right)
+            return concat(left, right)
         elif op == '<':
             return left < right
         elif op == '>':
@@ -0,0 +1,256 @@
+import datetime
+import decimal
+import functools
+
+from app.evaluator.ropes import Rope
+
+# 内建函数库。每个内建函数登记一次：名字、实现、参数个数、结果类型。
+# resolver 加载时把调用点标成内建函数的名字，执行时不再大写化、不再逐个比较名字；
+# 各引擎在创建时用 bind() 拿到自己的一张 名字 -> 函数 表，
+# 用到解释器状态的函数（RAND 用解释器自己的随机数发生器）在这时绑定。
+
+
+class Builtin:
+    # returns:  结果的类型，按 Python 值算（字符也是 STRING），不固定时为 None
+    # pure:     参数相同结果就相同、没有副作用
+    # stateful: 实现的第一个参数是解释器
+    __slots__ = ("name", "fn", "arity", "returns", "pure", "stateful")
+
+    def __init__(self, name, fn, arity, returns, pure, stateful):
+        self.name = name
+        self.fn = fn
+        self.arity = arity
+        self.returns = returns
+        self.pure = pure
+        self.stateful = stateful
+
+    def __repr__(self):
+        return f"<builtin {self.name}/{self.arity}>"
+
+
+LIBRARY = {}   # 名字（大写） -> Builtin
+
+
+def builtin(name, arity, returns=None, pure=True, stateful=False):
+    def register(fn):
+        LIBRARY[name] = Builtin(name, fn, arity, returns, pure, stateful)
+        return fn
+    return register
+
+
+def lookup(name):
+    return LIBRARY.get(name.upper())
+
+
+def bind(runtime):
+    # 一个解释器用的 名字 -> 可直接调用的函数
+    return {name: functools.partial(entry.fn, runtime) if entry.stateful else entry.fn
+            for name, entry in LIBRARY.items()}
+
+
+def check_arity(name, argc):
+    arity = LIBRARY[name].arity
+    if argc != arity:
+        raise TypeError(f"{name} expects {arity} argument{'s' if arity != 1 else ''}, got {argc}")
+
+
+def _str_arg(s, message):
+    # & 拼出来的长字符串（Rope）在这里拼成整串
+    if type(s) is str:
+        return s
+    if type(s) is Rope:
+        return str(s)
+    raise TypeError(message)
+
+
+def _int_arg(x):
+    return x if type(x) is int else int(x)
+
+
+# ---- 字符串 ----
+@builtin("LEFT", 2, "STRING")
+def left(s, x):
+    s = _str_arg(s, "LEFT expects a string as first argument")
+    x = _int_arg(x)
+    return s[:x] if x > 0 else ""
+
+
+@builtin("RIGHT", 2, "STRING")
+def right(s, x):
+    s = _str_arg(s, "RIGHT expects a string as first argument")
+    x = _int_arg(x)
+    return s[-x:] if x <= len(s) else s
+
+
+@builtin("MID", 3, "STRING")
+def mid(s, start, length):
+    s = _str_arg(s, "MID expects a string as first argument")
+    start = _int_arg(start)
+    length = _int_arg(length)
+    if start < 1:
+        raise ValueError("MID start must be >= 1")
+    return s[start - 1:start - 1 + length]
+
+
+@builtin("LENGTH", 1, "INTEGER")
+def length(s):
+    if type(s) is not str and type(s) is not Rope:
+        raise TypeError("LENGTH expects a string")
+    return len(s)   # Rope 不用拼成整串
+
+
+@builtin("LCASE", 1, "STRING")
+def lcase(c):
+    if not (type(c) is str and len(c) == 1):
+        raise TypeError("LCASE expects a single character")
+    return c.lower()
+
+
+@builtin("UCASE", 1, "STRING")
+def ucase(c):
+    if not (type(c) is str and len(c) == 1):
+        raise TypeError("UCASE expects a single character")
+    return c.upper()
+
+
+@builtin("TO_UPPER", 1, "STRING")
+def to_upper(s):
+    return _str_arg(s, "TO_UPPER expects a string or a character").upper()
+
+
+@builtin("TO_LOWER", 1, "STRING")
+def to_lower(s):
+    return _str_arg(s, "TO_LOWER expects a string or a character").lower()
+
+
+@builtin("ASC", 1, "INTEGER")
+def asc(c):
+    if not (type(c) is str and len(c) == 1):
+        raise TypeError("ASC expects a single character")
+    return ord(c)
+
+
+@builtin("CHR", 1, "STRING")
+def chr_(x):
+    x = _int_arg(x)
+    if not 0 <= x <= 0x10FFFF:
+        raise ValueError(f"CHR code {x} out of range")
+    return chr(x)
+
+
+# ---- 数字和字符串互转 ----
+@builtin("NUM_TO_STR", 1, "STRING")
+def num_to_str(x):
+    if type(x) is int or type(x) is float:
+        return str(x)
+    raise TypeError("NUM_TO_STR expects a number")
+
+
+def _parse_number(s):
+    # 整数写法得到 INTEGER，其余得到 REAL；不是数字返回 None
+    s = s.strip()
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        value = float(s)
+    except ValueError:
+        return None
+    # inf / nan 这样的写法不算数字
+    return value if value - value == 0 else None
+
+
+@builtin("STR_TO_NUM", 1)
+def str_to_num(s):
+    s = _str_arg(s, "STR_TO_NUM expects a string")
+    value = _parse_number(s)
+    if value is None:
+        raise ValueError(f"STR_TO_NUM: '{s}' is not a number")
+    return value
+
+
+@builtin("IS_NUM", 1, "BOOLEAN")
+def is_num(s):
+    return _parse_number(_str_arg(s, "IS_NUM expects a string")) is not None
+
+
+# ---- 数值 ----
+@builtin("INT", 1, "INTEGER")
+def int_(x):
+    if type(x) is int:
+        return x
+    if type(x) is float:
+        return int(x)
+    try:
+        return int(float(x))
+    except Exception:
+        raise TypeError("INT expects a numeric argument")
+
+
+@builtin("DIV", 2, "INTEGER")
+def div(x, y):
+    if type(x) is int and type(y) is int:
+        return x // y
+    return int(x // y)
+
+
+@builtin("MOD", 2)
+def mod(x, y):
+    return x % y
+
+
+_ROUNDING = decimal.Context(rounding=decimal.ROUND_HALF_UP)
+
+
+@builtin("ROUND", 2, "REAL")
+def round_(x, places):
+    # 四舍五入（不是 Python round 的银行家舍入），按十进制写法算：ROUND(2.675, 2) = 2.68
+    places = _int_arg(places)
+    if type(x) is int and places >= 0:
+        return float(x)
+    try:
+        exact = decimal.Decimal(repr(float(x)))
+    except (TypeError, ValueError):
+        raise TypeError("ROUND expects a numeric argument") from None
+    try:
+        return float(exact.quantize(decimal.Decimal(1).scaleb(-places), context=_ROUNDING))
+    except decimal.InvalidOperation:
+        return float(x)  # 位数超出精度：这么大的数本来就没有小数部分
+
+
+@builtin("RAND", 1, "REAL", pure=False, stateful=True)
+def rand(runtime, x):
+    # 0 <= 结果 < x，用解释器自己的随机数发生器（可以指定种子）
+    try:
+        upper = float(x)
+    except Exception:
+        raise TypeError("RAND expects a numeric argument")
+    return runtime.rng.random() * upper
+
+
+# ---- 日期 ----
+def _date_arg(d, name):
+    if not isinstance(d, datetime.date):
+        raise TypeError(f"{name} expects a DATE")
+    return d
+
+
+@builtin("DAY", 1, "INTEGER")
+def day(d):
+    return _date_arg(d, "DAY").day
+
+
+@builtin("MONTH", 1, "INTEGER")
+def month(d):
+    return _date_arg(d, "MONTH").month
+
+
+@builtin("YEAR", 1, "INTEGER")
+def year(d):
+    return _date_arg(d, "YEAR").year
+
+
+@builtin("NOW", 0, "DATE", pure=False)
+def now():
+    return datetime.date.today()
@@ -0,0 +1,47 @@
+import math
+import time
+
+# 执行预算（可选）：步数上限 max_steps 和运行时间上限 time_limit（秒）。
+# 一步是循环的一轮（WHILE / REPEAT / FOR）或一次过程 / 函数调用，不按节点计。
+# 没有设上限时各引擎的 _tick 是 None，循环和调用里不做任何计数。
+# 看时钟比数数贵，只每 CLOCK_INTERVAL 步看一次。
+
+CLOCK_INTERVAL = 1024
+
+
+class ExecutionLimitExceeded(Exception):
+    def __init__(self, message, line=0):
+        super().__init__(f"{message} at line {line}" if line else message)
+        self.line = line    # 超出时正在执行的循环 / 被调用的过程所在行，不知道时为 0
+
+
+class Limits:
+    def __init__(self, max_steps=None, time_limit=None):
+        self.max_steps = max_steps
+        self.time_limit = time_limit
+        self.start()
+
+    def start(self):
+        # 每次运行程序时重新计数、重新计时
+        self.steps = 0
+        self.deadline = None if self.time_limit is None else time.monotonic() + self.time_limit
+        self._schedule()
+
+    def tick(self, line):
+        self.steps += 1
+        if self.steps >= self.next_check:
+            self.check(line)
+
+    def check(self, line):
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise ExecutionLimitExceeded(f"Step limit of {self.max_steps} exceeded", line)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ExecutionLimitExceeded(f"Time limit of {self.time_limit:g}s exceeded", line)
+        self._schedule()
+
+    def _schedule(self):
+        # 下一次要检查的步数
+        next_check = math.inf if self.max_steps is None else self.max_steps + 1
+        if self.deadline is not None:
+            next_check = min(next_check, self.steps + CLOCK_INTERVAL)
+        self.next_check = next_check
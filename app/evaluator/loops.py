@@ -0,0 +1,207 @@
+from app.evaluator.ast import *
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.library import LIBRARY
+from app.evaluator.resolver import LOCAL, GLOBAL, REF, CONST
+
+# 循环分析：找出循环里不变的表达式，和 FOR 循环里可以在进循环时一次检查完边界的数组下标。
+# 只分析不调用用户过程/函数的循环——调用可能改任何全局变量，那样的循环原样执行。
+# 结论都偏保守：看不准的就当作会变。
+
+# 参数不变结果就不变的内建函数
+PURE_BUILTINS = frozenset(name for name, builtin in LIBRARY.items() if builtin.pure)
+
+CONSTANTS = (Number, String, Boolean)
+# 值得缓存的不变量：叶子节点本来就很便宜
+WORTH_HOISTING = (BinaryOp, UnaryOp, Call, ArrayAccess, FieldAccess)
+DEFINITIONS = (ProcedureDef, FunctionDef, ClassDef, TypeDef)
+
+
+def address_taken(program):
+    # 被取过地址的变量：经指针写入时看不出写的是谁，这些名字永远不算不变
+    names = set()
+    for node in walk(program):
+        if isinstance(node, AddressOf):
+            target = node.target
+            names.add(target.var_name if isinstance(target, FieldAccess) else target.name)
+    return names
+
+
+class LoopEffects:
+    # 循环（条件 + 循环体）里会被改写的东西
+    __slots__ = ("written", "rebound", "stores_elements", "stores_fields", "ref_writes", "calls")
+
+    def __init__(self, loop):
+        # 只看循环的各个部分，FOR 自己对循环变量的写入由调用方决定算不算
+        self.written = set()          # 被写过的名字（整个变量或元素 / 字段）
+        self.rebound = set()          # 整个变量被换掉的名字（赋值、DECLARE、INPUT、FOR）
+        self.stores_elements = False  # 有数组元素赋值：数组可能互为别名，元素读取都不算不变
+        self.stores_fields = False
+        self.ref_writes = False       # 写了 BYREF 形参：可能就是某个全局变量
+        self.calls = False            # 调用了用户过程 / 函数，或者在循环里定义东西
+        for node in (node for child in children(loop) for node in walk(child)):
+            if isinstance(node, Assign):
+                self._write_target(node.target)
+            elif isinstance(node, (For, Input, Declare)):
+                name = node.name if isinstance(node, Declare) else node.var_name
+                self.written.add(name)
+                self.rebound.add(name)
+            elif isinstance(node, Call):
+                if node.name.upper() not in Interpreter.BUILTINS:
+                    self.calls = True
+            elif isinstance(node, DEFINITIONS):
+                self.calls = True
+
+    def _write_target(self, target):
+        if isinstance(target, Var):
+            self.written.add(target.name)
+            self.rebound.add(target.name)
+            if target.scope == REF:
+                self.ref_writes = True
+        elif isinstance(target, ArrayAccess):
+            self.written.add(target.name)
+            self.stores_elements = True
+        elif isinstance(target, FieldAccess):
+            self.written.add(target.var_name)
+            self.stores_fields = True
+        else:
+            # 经指针写入：只会写到取过地址的变量，那些本来就不算不变
+            self.stores_elements = self.stores_fields = True
+
+
+class LoopInfo:
+    # invariants: 循环里值不变、值得只算一次的表达式（互不包含）
+    # checks:     FOR 循环里可以进循环时统一查边界的数组下标，
+    #             (ArrayAccess, 循环变量是第几个下标, 另一个不变下标或 None)
+    __slots__ = ("invariants", "checks")
+
+    def __init__(self, invariants, checks):
+        self.invariants = invariants
+        self.checks = checks
+
+
+def _is_variable_stable(node, name, effects, pinned):
+    return (node.scope in (LOCAL, GLOBAL) and name not in effects.written and name not in pinned
+            and not (node.scope == GLOBAL and effects.ref_writes))
+
+
+def invariance(roots, effects, pinned):
+    # 后序遍历，算出每个表达式节点是否不变：id(node) -> bool
+    result = {}
+    stack = [(root, False) for root in roots]
+    while stack:
+        node, done = stack.pop()
+        if not done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children(node))
+            continue
+        if isinstance(node, CONSTANTS):
+            ok = True
+        elif isinstance(node, Var):
+            ok = node.scope == CONST or _is_variable_stable(node, node.name, effects, pinned)
+        elif isinstance(node, (BinaryOp, UnaryOp)):
+            ok = True
+        elif isinstance(node, Call):
+            ok = node.name.upper() in PURE_BUILTINS
+        elif isinstance(node, ArrayAccess):
+            ok = not effects.stores_elements and _is_variable_stable(node, node.name, effects, pinned)
+        elif isinstance(node, FieldAccess):
+            ok = not effects.stores_fields and _is_variable_stable(node, node.var_name, effects, pinned)
+        else:
+            ok = False
+        result[id(node)] = ok and all(result[id(child)] for child in children(node))
+    return result
+
+
+def expression_roots(stmts):
+    # 一段语句里（包括嵌套块）所有表达式的根
+    stack = list(stmts or ())
+    while stack:
+        stmt = stack.pop()
+        if isinstance(stmt, Assign):
+            yield stmt.value
+            target = stmt.target
+            if isinstance(target, ArrayAccess):
+                yield from target.indices
+            elif isinstance(target, Dereference):
+                yield target.pointer
+        elif isinstance(stmt, Output):
+            yield from stmt.values
+        elif isinstance(stmt, If):
+            yield stmt.condition
+            stack.extend(stmt.then_body or ())
+            stack.extend(stmt.else_body or ())
+        elif isinstance(stmt, (While, RepeatUntil)):
+            yield stmt.condition
+            stack.extend(stmt.body)
+        elif isinstance(stmt, For):
+            yield stmt.start
+            yield stmt.end
+            if stmt.step is not None:
+                yield stmt.step
+            stack.extend(stmt.body)
+        elif isinstance(stmt, CaseOf):
+            yield stmt.expr
+            for label, body in stmt.cases:
+                yield label
+                stack.extend(body)
+            stack.extend(stmt.otherwise or ())
+        elif isinstance(stmt, Return) and stmt.expr is not None:
+            yield stmt.expr
+
+
+def analyze_loop(loop, pinned):
+    # 返回 LoopInfo；循环里有调用等看不透的东西时返回 None
+    effects = LoopEffects(loop)
+    if effects.calls:
+        return None
+    # 循环体里改了循环变量（包括嵌套的同名 FOR），下标就可能超出进循环时查过的范围
+    var_written = isinstance(loop, For) and loop.var_name in effects.written
+    if isinstance(loop, For):
+        effects.written.add(loop.var_name)
+        effects.rebound.add(loop.var_name)
+
+    roots = list(expression_roots(loop.body))
+    if isinstance(loop, (While, RepeatUntil)):
+        roots.append(loop.condition)
+    stable = invariance(roots, effects, pinned)
+
+    # 从根往下找，最大的不变子表达式整个缓存，不再往里找
+    invariants = []
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, WORTH_HOISTING) and stable[id(node)]:
+            invariants.append(node)
+        else:
+            stack.extend(children(node))
+
+    checks = []
+    if isinstance(loop, For) and not var_written and loop.scope in (LOCAL, GLOBAL):
+        for stmt in loop.body:
+            for node in walk(stmt):
+                if isinstance(node, ArrayAccess):
+                    check = _bounds_check(node, loop, effects, stable, pinned)
+                    if check is not None:
+                        checks.append(check)
+    return LoopInfo(invariants, checks)
+
+
+def _bounds_check(node, loop, effects, stable, pinned):
+    if len(node.indices) not in (1, 2) or node.scope not in (LOCAL, GLOBAL):
+        return None
+    if node.name in effects.rebound or node.name in pinned or (node.scope == GLOBAL and effects.ref_writes):
+        return None
+    position = None
+    other = None
+    for k, index in enumerate(node.indices):
+        if isinstance(index, Var) and index.name == loop.var_name and (index.scope, index.slot) == (loop.scope, loop.slot):
+            if position is not None:
+                return None  # A[i, i]
+            position = k
+        elif stable.get(id(index)):
+            other = index
+        else:
+            return None
+    if position is None:
+        return None
+    return node, position, other
@@ -0,0 +1,195 @@
+import dataclasses
+import math
+import pprint
+
+from app.evaluator.ast import *
+from app.evaluator.interpreter import Interpreter, SHORT_CIRCUIT
+from app.evaluator.resolver import collect_declares
+
+# 折叠结果太大就不折叠：死代码里的 "x" * 10^9 不该在优化时就把内存吃光
+MAX_FOLDED_STR = 4096
+MAX_FOLDED_INT_BITS = 4096
+
+CONSTANTS = (Number, String, Boolean)
+TRUE = Boolean(True)
+FALSE = Boolean(False)
+
+
+def constant(value):
+    # Python 值 -> 常量节点；放不进常量节点的返回 None
+    if isinstance(value, bool):
+        return TRUE if value else FALSE
+    if isinstance(value, int):
+        return Number(value) if value.bit_length() <= MAX_FOLDED_INT_BITS else None
+    if isinstance(value, float):
+        return Number(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        return String(value) if len(value) <= MAX_FOLDED_STR else None
+    return None
+
+
+def copy(node):
+    # 没有优化规则的节点也复制一份：resolver 把槽位标注写在节点上，新旧两棵树共用节点会互相覆盖
+    if isinstance(node, (list, tuple)):
+        return type(node)(copy(item) for item in node)
+    if not dataclasses.is_dataclass(node):
+        return node
+    return type(node)(**{f.name: copy(getattr(node, f.name)) for f in dataclasses.fields(node) if f.init})
+
+
+class Optimizer:
+    # 解析之后、执行之前的 AST -> AST 变换，不改变程序的输出：
+    #   - TRUE / FALSE 变成 Boolean 常量
+    #   - 两边都是常量的 BinaryOp / UnaryOp 直接算好，用的就是运行时的 apply_op；
+    #     左边是常量就能定结果的 AND / OR（FALSE AND x、TRUE OR x）右边本来就不求值，整个折掉
+    #   - 条件是常量的 IF 只留下会执行的分支，分支里的语句摊平进外层语句列表
+    # 运行时会出错的运算（除以零、类型不对）不折叠，留到运行时照常报错。
+    # 结果是一棵全新的树，不和原程序共用节点，原程序之后照样能跑。
+    def __init__(self):
+        self.apply_op = Interpreter().apply_op
+
+    def optimize(self, program):
+        return Program(self.block(program.statements))
+
+    def block(self, stmts):
+        if stmts is None:
+            return None
+        out = []
+        for stmt in stmts:
+            result = self.statement(stmt)
+            if type(result) is list:
+                out.extend(result)  # 消掉的 IF 留下的分支
+            else:
+                out.append(result)
+        return out
+
+    def statement(self, node):
+        method = getattr(self, "stmt_" + type(node).__name__, None)
+        if method is None:
+            return copy(node)
+        result = method(node)
+        if type(result) is not list:
+            annotate(result, line=node.line)  # 新建的语句保留原来的行号
+        return result
+
+    def expr(self, node):
+        method = getattr(self, "expr_" + type(node).__name__, None)
+        return copy(node) if method is None else method(node)
+
+    def target(self, node):
+        # 赋值 / 取地址的左值：名字不动，只优化下标和指针表达式
+        if isinstance(node, ArrayAccess):
+            return self.expr_ArrayAccess(node)
+        if isinstance(node, Dereference):
+            return self.expr_Dereference(node)
+        return copy(node)
+
+    # ---- 语句 ----
+    def stmt_If(self, node):
+        condition = self.expr(node.condition)
+        then_body = self.block(node.then_body)
+        else_body = self.block(node.else_body)
+        if isinstance(condition, CONSTANTS):
+            taken, dropped = (then_body, else_body) if condition.value else (else_body, then_body)
+            # 丢掉的分支里有 DECLARE 就保留整个 IF：在过程里它决定了这个名字是局部变量
+            if not collect_declares(dropped, {}):
+                return taken or []
+        return If(condition, then_body, else_body or None)
+
+    def stmt_Assign(self, node):
+        return Assign(self.target(node.target), self.expr(node.value))
+
+    def stmt_Output(self, node):
+        return Output([self.expr(value) for value in node.values])
+
+    def stmt_While(self, node):
+        return While(self.expr(node.condition), self.block(node.body))
+
+    def stmt_For(self, node):
+        step = None if node.step is None else self.expr(node.step)
+        return For(node.var_name, self.expr(node.start), self.expr(node.end), self.block(node.body), step)
+
+    def stmt_RepeatUntil(self, node):
+        return RepeatUntil(self.block(node.body), self.expr(node.condition))
+
+    def stmt_CaseOf(self, node):
+        cases = [(self.expr(label), self.block(body)) for label, body in node.cases]
+        return CaseOf(self.expr(node.expr), cases, self.block(node.otherwise))
+
+    def stmt_CallStmt(self, node):
+        return CallStmt(self.expr(node.call))
+
+    def stmt_Return(self, node):
+        return Return(None if node.expr is None else self.expr(node.expr))
+
+    def stmt_ProcedureDef(self, node):
+        return dataclasses.replace(node, params=copy(node.params), body=self.block(node.body))
+
+    stmt_FunctionDef = stmt_ProcedureDef
+
+    def stmt_ClassDef(self, node):
+        return dataclasses.replace(node, fields=copy(node.fields),
+                                   methods=[self.statement(method) for method in node.methods])
+
+    # ---- 表达式 ----
+    def expr_Var(self, node):
+        name = node.name.upper()
+        if name == "TRUE":
+            return TRUE
+        if name == "FALSE":
+            return FALSE
+        return Var(node.name)
+
+    def expr_BinaryOp(self, node):
+        # 沿左脊迭代，很长的运算链也不递归
+        spine = []
+        while type(node) is BinaryOp:
+            spine.append(node)
+            node = node.left
+        left = self.expr(node)
+        for node in reversed(spine):
+            decided = SHORT_CIRCUIT.get(node.operator)
+            if decided is not None and isinstance(left, CONSTANTS) and bool(left.value) is decided:
+                left = constant(decided)
+                continue
+            right = self.expr(node.right)
+            folded = self.fold(left, node.operator, right)
+            left = folded if folded is not None else BinaryOp(left, node.operator, right)
+        return left
+
+    def fold(self, left, op, right):
+        if not (isinstance(left, CONSTANTS) and isinstance(right, CONSTANTS)):
+            return None
+        try:
+            value = self.apply_op(left.value, op, right.value)
+        except Exception:
+            return None
+        return constant(value)
+
+    def expr_UnaryOp(self, node):
+        operand = self.expr(node.operand)
+        if isinstance(operand, CONSTANTS):
+            return FALSE if operand.value else TRUE
+        return UnaryOp(node.operator, operand)
+
+    def expr_Call(self, node):
+        args = [self.expr(arg) for arg in node.args]
+        return Call(node.name, args)
+
+    def expr_ArrayAccess(self, node):
+        return ArrayAccess(node.name, [self.expr(index) for index in node.indices])
+
+    def expr_AddressOf(self, node):
+        return AddressOf(self.target(node.target))
+
+    def expr_Dereference(self, node):
+        return Dereference(self.expr(node.pointer))
+
+
+def optimize(program):
+    return Optimizer().optimize(program)
+
+
+def dump(program):
+    # --dump-ast 用：每个节点一行，按层缩进
+    return pprint.pformat(program, width=100)
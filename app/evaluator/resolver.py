@@ -0,0 +1,236 @@
+from app.evaluator.ast import *
+from app.evaluator.cases import case_table
+from app.evaluator.converters import mark_exact_stores
+from app.evaluator.library import lookup as lookup_builtin
+
+# Var 等节点解析后的 scope：
+#   LOCAL  - 当前过程/函数帧的槽位
+#   GLOBAL - 全局帧的槽位
+#   REF    - BYREF 形参，槽位里放的是 Reference，读写都要再转一次
+#   CONST  - TRUE / FALSE，slot 就是值本身
+# 过程不能嵌套定义成闭包，所以“深度”只有当前帧和全局两层。
+LOCAL = 0
+GLOBAL = 1
+REF = 2
+CONST = 3
+
+
+class _Unset:
+    # 已分配槽位但还没 DECLARE 的变量
+    def __repr__(self):
+        return "<unset>"
+
+
+UNSET = _Unset()
+
+
+def collect_declares(stmts, out):
+    # 找出一段语句里（包括嵌套块）所有 DECLARE 的名字和类型，不进入过程定义
+    for stmt in stmts or ():
+        if isinstance(stmt, Declare):
+            out.setdefault(stmt.name, stmt.type)
+        elif isinstance(stmt, If):
+            collect_declares(stmt.then_body, out)
+            collect_declares(stmt.else_body, out)
+        elif isinstance(stmt, (While, For, RepeatUntil)):
+            collect_declares(stmt.body, out)
+        elif isinstance(stmt, CaseOf):
+            for _, body in stmt.cases:
+                collect_declares(body, out)
+            collect_declares(stmt.otherwise, out)
+    return out
+
+
+class _RoutineScope:
+    def __init__(self):
+        self.slots = {}             # 名字 -> 局部槽位
+        self.byref = set()          # BYREF 形参名
+
+    def add(self, name):
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+
+class Resolver:
+    # 加载时走一遍 AST，把每个变量引用绑定成 (scope, slot)，
+    # 运行时直接按下标读写扁平的帧，不再按名字查 dict。
+    # 规则和 BytecodeCompiler 一致：过程里形参和 DECLARE 过的名字是局部的，其余是全局的。
+    def __init__(self):
+        self.global_names = []
+        self.global_slots = {}
+        self.global_types = {}
+        self.scope = None           # None 表示在顶层
+
+    def resolve_program(self, program):
+        self.global_types = collect_declares(program.statements, {})
+        self.resolve_block(program.statements)
+        annotate(program, global_names=self.global_names)
+        return program
+
+    def global_slot(self, name):
+        if name not in self.global_slots:
+            self.global_slots[name] = len(self.global_names)
+            self.global_names.append(name)
+        return self.global_slots[name]
+
+    def lookup(self, name):
+        scope = self.scope
+        if scope is not None and name in scope.slots:
+            return (REF if name in scope.byref else LOCAL), scope.slots[name]
+        return GLOBAL, self.global_slot(name)
+
+    def lookup_for_write(self, name):
+        # FOR / INPUT 在过程里写一个没声明过的名字：已有全局就写全局，否则新建局部
+        scope = self.scope
+        if scope is None or name in self.global_types:
+            return self.lookup(name)
+        return LOCAL, scope.add(name)
+
+    def bind(self, node, name):
+        scope, slot = self.lookup(name)
+        annotate(node, scope=scope, slot=slot)
+
+    def bind_write(self, node, name):
+        # FOR / INPUT 直接覆盖槽位，BYREF 形参也不例外
+        scope, slot = self.lookup_for_write(name)
+        annotate(node, scope=LOCAL if scope == REF else scope, slot=slot)
+
+    def resolve_block(self, stmts):
+        for stmt in stmts or ():
+            self.resolve(stmt)
+
+    def resolve(self, node):
+        method = getattr(self, "visit_" + type(node).__name__, None)
+        if method is not None:
+            method(node)
+
+    # ---- 语句 ----
+    def visit_Declare(self, node):
+        scope, slot = self.lookup(node.name)
+        if scope == REF:
+            # 重新声明 BYREF 形参：覆盖槽位本身
+            scope = LOCAL
+        annotate(node, scope=scope, slot=slot)
+        if isinstance(node.type, ArrayType):
+            for bound in node.type.lowers + node.type.uppers:
+                if not isinstance(bound, int):
+                    self.resolve(bound)
+
+    def visit_Assign(self, node):
+        self.resolve(node.value)
+        self.resolve(node.target)
+
+    def visit_Output(self, node):
+        for value in node.values:
+            self.resolve(value)
+
+    def visit_Input(self, node):
+        self.bind_write(node, node.var_name)
+
+    def visit_If(self, node):
+        self.resolve(node.condition)
+        self.resolve_block(node.then_body)
+        self.resolve_block(node.else_body)
+
+    def visit_While(self, node):
+        self.resolve(node.condition)
+        self.resolve_block(node.body)
+
+    def visit_RepeatUntil(self, node):
+        self.resolve_block(node.body)
+        self.resolve(node.condition)
+
+    def visit_For(self, node):
+        self.resolve(node.start)
+        self.resolve(node.end)
+        if node.step is not None:
+            self.resolve(node.step)
+        self.bind_write(node, node.var_name)
+        self.resolve_block(node.body)
+
+    def visit_CaseOf(self, node):
+        self.resolve(node.expr)
+        for label, body in node.cases:
+            self.resolve(label)
+            self.resolve_block(body)
+        self.resolve_block(node.otherwise)
+        case_table(node)  # 标签全是常量的，加载时就建好跳转表
+
+    def visit_CaseRange(self, node):
+        self.resolve(node.low)
+        self.resolve(node.high)
+
+    def visit_CallStmt(self, node):
+        self.resolve(node.call)
+
+    def visit_Return(self, node):
+        if node.expr is not None:
+            self.resolve(node.expr)
+
+    def visit_ProcedureDef(self, node):
+        self.resolve_routine(node, byref=False)  # PROCEDURE 的参数一律 BYVAL
+
+    def visit_FunctionDef(self, node):
+        self.resolve_routine(node, byref=True)
+
+    def resolve_routine(self, node, byref):
+        outer = self.scope
+        self.scope = scope = _RoutineScope()
+        # 形参占前几个槽位
+        for param in node.params:
+            scope.add(param.name)
+            if byref and param.byref:
+                scope.byref.add(param.name)
+        for name in collect_declares(node.body, {}):
+            scope.add(name)
+        self.resolve_block(node.body)
+        annotate(node, nlocals=len(scope.slots))
+        self.scope = outer
+
+    # ---- 表达式 ----
+    def visit_Var(self, node):
+        if node.name.upper() == "TRUE":
+            annotate(node, scope=CONST, slot=True)
+        elif node.name.upper() == "FALSE":
+            annotate(node, scope=CONST, slot=False)
+        else:
+            self.bind(node, node.name)
+
+    def visit_BinaryOp(self, node):
+        # 沿左脊迭代，长运算链不占递归
+        while isinstance(node, BinaryOp):
+            self.resolve(node.right)
+            node = node.left
+        self.resolve(node)
+
+    def visit_UnaryOp(self, node):
+        self.resolve(node.operand)
+
+    def visit_ArrayAccess(self, node):
+        for idx in node.indices:
+            self.resolve(idx)
+        self.bind(node, node.name)
+
+    def visit_FieldAccess(self, node):
+        self.bind(node, node.var_name)
+
+    def visit_Call(self, node):
+        builtin = lookup_builtin(node.name)
+        annotate(node, builtin=builtin.name if builtin is not None else False)
+        for arg in node.args:
+            self.resolve(arg)
+
+    def visit_AddressOf(self, node):
+        self.resolve(node.target)
+
+    def visit_Dereference(self, node):
+        self.resolve(node.pointer)
+
+
+def resolve_program(program):
+    # 同一个 Program 只解析一次
+    if program.global_names is None:
+        Resolver().resolve_program(program)
+        mark_exact_stores(program)
+    return program
@@ -0,0 +1,110 @@
+# & 拼出来的长字符串先不真正拼接，存成 Rope（二叉树，叶子是 str），
+# 要用到整串（输出、比较、MID 之类）时才拼一次并缓存，LENGTH 直接用记下的长度。
+# 循环里 Result <- Result & c（或 Result <- c & Result）不再每次复制整串，总开销是线性的。
+# 结果不超过 LEAF 个字符时还是普通 str，短字符串的程序完全看不到 Rope。
+
+LEAF = 256
+
+
+class Rope:
+    # 只读：left / right 是 str 或 Rope；拼好之后 flat 是整串，子节点丢掉
+    __slots__ = ("left", "right", "length", "flat")
+
+    def __init__(self, left, right, length):
+        self.left = left
+        self.right = right
+        self.length = length
+        self.flat = None
+
+    def __str__(self):
+        flat = self.flat
+        if flat is None:
+            # 树可能很深（一直往一边拼），用栈不用递归
+            parts = []
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                if node.__class__ is str:
+                    parts.append(node)
+                elif node.flat is not None:
+                    parts.append(node.flat)
+                else:
+                    stack.append(node.right)
+                    stack.append(node.left)
+            flat = self.flat = "".join(parts)
+            self.left = self.right = None
+        return flat
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    # 其余的运算都和整串 str 一样
+    def __eq__(self, other):
+        return str(self) == text(other)
+
+    def __ne__(self, other):
+        return str(self) != text(other)
+
+    def __lt__(self, other):
+        return str(self) < text(other)
+
+    def __le__(self, other):
+        return str(self) <= text(other)
+
+    def __gt__(self, other):
+        return str(self) > text(other)
+
+    def __ge__(self, other):
+        return str(self) >= text(other)
+
+    def __add__(self, other):
+        return str(self) + text(other)
+
+    def __radd__(self, other):
+        return other + str(self)
+
+    def __mul__(self, other):
+        return str(self) * other
+
+    __rmul__ = __mul__
+
+    def __int__(self):
+        return int(str(self))
+
+    def __float__(self):
+        return float(str(self))
+
+
+def text(value):
+    # Rope 拼成 str，别的值原样返回
+    return str(value) if value.__class__ is Rope else value
+
+
+def concat(left, right):
+    # & 运算：结果和 str(left) + str(right) 相同
+    if left.__class__ is not str and left.__class__ is not Rope:
+        left = str(left)
+    if right.__class__ is not str and right.__class__ is not Rope:
+        right = str(right)
+    length = len(left) + len(right)
+    if length <= LEAF:
+        return left + right     # Rope 至少 LEAF + 1 个字符，走到这里两边都是 str
+    # 往短的叶子上接短串时合并成一个叶子，一个字符一个字符拼也不会长出一堆小节点
+    if right.__class__ is str and left.__class__ is Rope and left.flat is None:
+        tail = left.right
+        if tail.__class__ is str and len(tail) + len(right) <= LEAF:
+            return Rope(left.left, tail + right, length)
+    elif left.__class__ is str and right.__class__ is Rope and right.flat is None:
+        head = right.left
+        if head.__class__ is str and len(left) + len(head) <= LEAF:
+            return Rope(left + head, right.right, length)
+    return Rope(left, right, length)
@@ -0,0 +1,131 @@
+from app.evaluator.ast import *
+from app.evaluator.interpreter import SHORT_CIRCUIT
+from app.evaluator.loops import PURE_BUILTINS
+from app.parser.parser import BINARY_PRECEDENCE
+
+# AND / OR 是短路的：左边已经定了结果，右边就不求值。
+# 右边调用了用户函数（可能输出、改全局变量、改 BYREF 参数）或 RAND（用掉一个随机数）的地方，
+# 这些副作用只在左边没定结果时才发生。这里把它们找出来，方便检查程序是不是依赖“两边都求值”。
+
+MAX_TEXT = 100  # 报告里的表达式太长就截断
+
+
+class Hazard:
+    # line:     所在语句的行号，不知道时为 0
+    # routine:  所在过程 / 函数名，顶层为 None
+    # operator: "AND" / "OR"
+    # calls:    右边里会被跳过的调用名，按出现顺序
+    # text:     整个 AND / OR 表达式
+    __slots__ = ("line", "routine", "operator", "calls", "text")
+
+    def __init__(self, line, routine, operator, calls, text):
+        self.line = line
+        self.routine = routine
+        self.operator = operator
+        self.calls = calls
+        self.text = text
+
+    def __str__(self):
+        where = f"line {self.line}" if self.line else "unknown line"
+        if self.routine:
+            where += f", in {self.routine}"
+        runs_when = "TRUE" if not SHORT_CIRCUIT[self.operator] else "FALSE"
+        names = ", ".join(self.calls)
+        return f"{where}: {self.text}\n    calls {names} only when the left side of {self.operator} is {runs_when}"
+
+    def __repr__(self):
+        return f"<Hazard line {self.line} {self.operator} {self.calls}>"
+
+
+def _has_side_effects(node):
+    return isinstance(node, Call) and node.name.upper() not in PURE_BUILTINS
+
+
+def find_hazards(program):
+    # 先序遍历整个程序，记着当前语句的行号和所在的过程；
+    # 同一个调用只算在最外层能跳过它的 AND / OR 上
+    hazards = []
+    claimed = set()
+    stack = [(program, None, 0)]
+    while stack:
+        node, routine, line = stack.pop()
+        line = getattr(node, "line", 0) or line
+        if isinstance(node, (ProcedureDef, FunctionDef)):
+            routine = node.name
+        elif isinstance(node, BinaryOp) and node.operator in SHORT_CIRCUIT:
+            calls = []
+            inner = [node.right]
+            while inner:
+                child = inner.pop()
+                if _has_side_effects(child) and id(child) not in claimed:
+                    claimed.add(id(child))
+                    if child.name not in calls:
+                        calls.append(child.name)
+                inner.extend(reversed(list(children(child))))
+            if calls:
+                hazards.append(Hazard(line, routine, node.operator, calls, source(node)))
+        stack.extend((child, routine, line) for child in reversed(list(children(node))))
+    return hazards
+
+
+def report(program):
+    hazards = find_hazards(program)
+    if not hazards:
+        return "No AND / OR skips a call on its right side."
+    return "\n".join(str(hazard) for hazard in hazards)
+
+
+def _precedence(node):
+    if isinstance(node, BinaryOp):
+        return BINARY_PRECEDENCE.get(node.operator, 0)
+    return None  # 操作数本身，不用加括号
+
+
+def source(node):
+    text = _source(node)
+    return text if len(text) <= MAX_TEXT else text[:MAX_TEXT - 3] + "..."
+
+
+def _source(node):
+    # 表达式还原成伪代码文本，只在需要时加括号
+    if isinstance(node, BinaryOp):
+        # 沿左脊展开，长链不递归
+        spine = []
+        while isinstance(node, BinaryOp):
+            spine.append(node)
+            node = node.left
+        text = _source(node)
+        level = None
+        for node in reversed(spine):
+            prec = BINARY_PRECEDENCE.get(node.operator, 0)
+            if level is not None and level < prec:
+                text = f"({text})"
+            right = _source(node.right)
+            right_prec = _precedence(node.right)
+            if right_prec is not None and right_prec <= prec:
+                right = f"({right})"
+            text = f"{text} {node.operator} {right}"
+            level = prec
+        return text
+    if isinstance(node, UnaryOp):
+        operand = _source(node.operand)
+        return f"NOT ({operand})" if isinstance(node.operand, BinaryOp) else f"NOT {operand}"
+    if isinstance(node, String):
+        return f'"{node.value}"'
+    if isinstance(node, Boolean):
+        return "TRUE" if node.value else "FALSE"
+    if isinstance(node, Number):
+        return repr(node.value)
+    if isinstance(node, Var):
+        return node.name
+    if isinstance(node, Call):
+        return f"{node.name}({', '.join(_source(arg) for arg in node.args)})"
+    if isinstance(node, ArrayAccess):
+        return f"{node.name}[{', '.join(_source(index) for index in node.indices)}]"
+    if isinstance(node, FieldAccess):
+        return f"{node.var_name}.{node.field_name}"
+    if isinstance(node, AddressOf):
+        return f"^{_source(node.target)}"
+    if isinstance(node, Dereference):
+        return f"{_source(node.pointer)}^"
+    return f"<{type(node).__name__}>"
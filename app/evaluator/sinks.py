@@ -0,0 +1,114 @@
+import math
+import sys
+
+# OUTPUT 的去处。每个解释器有自己的 sink（Interpreter(output=...)），不用改全局的 sys.stdout，
+# 同一进程里多个线程各跑各的程序也不会串。
+# OUTPUT 一行先攒在 sink 里，按 flush 策略成块写出去：
+#   "line":  每行都写出去（StdoutSink 的默认）
+#   "block": 攒够 buffer_size 个字符写一次（FileSink 等的默认；CLI 的输出不是终端时也用它）
+#   "end":   程序结束（或 INPUT 之前）才写（BufferSink 的默认）
+# 程序结束、出错退出、INPUT 提示之前解释器都会调用 flush()，不会丢输出；
+# 直接 eval 单个语句（不是 Program）时没有“程序结束”，所以标准输出默认按行写。
+# limit 是总字节数上限（按 UTF-8 算），超过时报 OutputLimitExceeded，超出的那一行不写。
+
+DEFAULT_BUFFER_SIZE = 8192
+FLUSH_POLICIES = ("line", "block", "end")
+
+
+class OutputLimitExceeded(Exception):
+    pass
+
+
+class Sink:
+    def __init__(self, flush="block", buffer_size=DEFAULT_BUFFER_SIZE, limit=None):
+        if flush not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy '{flush}', expected one of {', '.join(FLUSH_POLICIES)}")
+        self.flush_policy = flush
+        # 攒到这么多字符就写出去
+        self.threshold = {"line": 0, "block": buffer_size, "end": math.inf}[flush]
+        self.limit = limit
+        self.written = 0        # 已经接受的字节数（只在有 limit 时统计）
+        self.lines = []
+        self.pending = 0
+
+    def write_line(self, line):
+        if self.limit is not None:
+            size = (len(line) if line.isascii() else len(line.encode("utf-8"))) + 1
+            if self.written + size > self.limit:
+                raise OutputLimitExceeded(f"Output limit of {self.limit} bytes exceeded")
+            self.written += size
+        self.lines.append(line)
+        self.pending += len(line) + 1
+        if self.pending > self.threshold:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            text = "\n".join(self.lines) + "\n"
+            self.lines.clear()
+            self.pending = 0
+            self._emit(text)
+
+    def close(self):
+        self.flush()
+
+    def _emit(self, text):
+        raise NotImplementedError
+
+
+class StdoutSink(Sink):
+    # 写到 sys.stdout（每次写时再取，contextlib.redirect_stdout 照样有效）或指定的文本流
+    def __init__(self, stream=None, **options):
+        options.setdefault("flush", "line")
+        super().__init__(**options)
+        self.stream = stream
+
+    def _emit(self, text):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+class BufferSink(Sink):
+    # 收集在内存里，getvalue() 取全部输出
+    def __init__(self, **options):
+        options.setdefault("flush", "end")
+        super().__init__(**options)
+        self.chunks = []
+
+    def _emit(self, text):
+        self.chunks.append(text)
+
+    def getvalue(self):
+        self.flush()
+        return "".join(self.chunks)
+
+
+class FileSink(Sink):
+    # path 是文件名时由 sink 打开，close() 时关掉；也可以传已经打开的文本文件
+    def __init__(self, path, encoding="utf-8", **options):
+        super().__init__(**options)
+        if hasattr(path, "write"):
+            self.file, self.owned = path, False
+        else:
+            self.file, self.owned = open(path, "w", encoding=encoding), True
+
+    def _emit(self, text):
+        self.file.write(text)
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class CallbackSink(Sink):
+    # 每次写出时调用 callback(text)，text 是若干完整的行（都以换行结尾）
+    def __init__(self, callback, **options):
+        super().__init__(**options)
+        self.callback = callback
+
+    def _emit(self, text):
+        self.callback(text)
@@ -1,58 +1,162 @@
 import re
-from dataclasses import dataclass
+import sys
+
+# ---- token 种类 ----
+# 和 TOKEN_SPECIFICATION 的顺序一一对应，parser 里直接比较整数
+COMMENT = 0
+COLON = 1
+ASSIGN = 2
+LPAREN = 3
+RPAREN = 4
+LBRACKET = 5
+RBRACKET = 6
+COMMA = 7
+CARET = 8
+STRCOMB = 9
+NEQ = 10
+GTE = 11
+LTE = 12
+LOGICOP = 13
+OPERATOR = 14
+NUMBER = 15
+STRING = 16
+KEYWORD = 17
+DOT = 18
+IDENTIFIER = 19
+NEWLINE = 20
+SKIP = 21
+MISMATCH = 22
+
+# 关键字（以及 AND / OR / NOT）在这里统一编号，Token.kw 就是下标，其余 token 的 kw 为 -1
+KEYWORDS = (
+    "OUTPUT", "IF", "THEN", "ELSE", "ENDIF", "WHILE", "ENDWHILE", "DECLARE",
+    "INTEGER", "REAL", "STRING", "INPUT", "FOR", "TO", "NEXT", "REPEAT", "UNTIL",
+    "OTHERWISE", "ENDCASE", "CHAR", "DATE", "BOOLEAN", "TYPE", "ENDTYPE",
+    "PROCEDURE", "ENDPROCEDURE", "FUNCTION", "ENDFUNCTION", "RETURN", "RETURNS",
+    "CALL", "ARRAY", "OF", "CASE OF", "PUBLIC", "PRIVATE", "CLASS", "ENDCLASS",
+    "INHERITS", "STEP", "AND", "OR", "NOT",
+)
+KEYWORD_IDS = {word: i for i, word in enumerate(KEYWORDS)}
+NO_KW = -1
+
+(KW_OUTPUT, KW_IF, KW_THEN, KW_ELSE, KW_ENDIF, KW_WHILE, KW_ENDWHILE, KW_DECLARE,
+ KW_INTEGER, KW_REAL, KW_STRING, KW_INPUT, KW_FOR, KW_TO, KW_NEXT, KW_REPEAT, KW_UNTIL,
+ KW_OTHERWISE, KW_ENDCASE, KW_CHAR, KW_DATE, KW_BOOLEAN, KW_TYPE, KW_ENDTYPE,
+ KW_PROCEDURE, KW_ENDPROCEDURE, KW_FUNCTION, KW_ENDFUNCTION, KW_RETURN, KW_RETURNS,
+ KW_CALL, KW_ARRAY, KW_OF, KW_CASE_OF, KW_PUBLIC, KW_PRIVATE, KW_CLASS, KW_ENDCLASS,
+ KW_INHERITS, KW_STEP, KW_AND, KW_OR, KW_NOT) = range(len(KEYWORDS))
+
+# 整个词法规则拼成一个正则，模块导入时编译一次。
+# 注释和字符串在同一遍扫描里处理：字符串里的 // 会被 STRING 整个吃掉，不会当成注释。
+# 所有 token 都不跨行，所以可以整段扫，也可以逐行扫。
+TOKEN_SPECIFICATION = [
+    ("COMMENT", r"//[^\n]*"),  # 行尾注释
+    ("COLON", r":"),
+    ("ASSIGN", r"<-"),
+    ("LPAREN", r"\("),
+    ("RPAREN", r"\)"),
+    ("LBRACKET", r"\["),
+    ("RBRACKET", r"\]"),
+    ("COMMA", r","),
+    ("CARET", r"\^"),
+    ("STRCOMB", r"&"),
+    ("NEQ", r"<>"),
+    ("GTE", r">="),
+    ("LTE", r"<="),
+    ("LOGICOP", r"\b(AND|OR|NOT)\b"),
+    ("OPERATOR", r"[+\-*/><=]"),
+    ("NUMBER", r"\d+(\.\d+)?"),  # 支持实数
+    ("STRING", r'"[^"\n]*"'),
+    ("KEYWORD", r"\b(" + "|".join(KEYWORDS[:KW_AND]) + r")\b"),
+    ("DOT", r"\."),
+    ("IDENTIFIER", r"[A-Za-z_][A-Za-z0-9_]*"),
+    ("NEWLINE", r"\n"),
+    ("SKIP", r"[ \t\r]+"),
+    ("MISMATCH", r"."),
+]
+
+TOKEN_KINDS = tuple(name for name, _ in TOKEN_SPECIFICATION)
+KIND_IDS = {name: i for i, name in enumerate(TOKEN_KINDS)}
+
+TOKEN_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPECIFICATION))
+
+# match.lastindex（外层命名组的编号）-> token 种类，省掉按组名查表
+GROUP_KINDS = [None] * (TOKEN_RE.groups + 1)
+for _name, _index in TOKEN_RE.groupindex.items():
+    GROUP_KINDS[_index] = KIND_IDS[_name]
+
 
-@dataclass
 class Token:
-    type: str
-    value: str
+    # 每个 token 一个带 __slots__ 的小对象：没有 __dict__，种类和关键字都是整数。
+    # line / col 从 1 开始；手工构造的 token 没有位置，为 0。
+    # type 保留成属性，兼容按名字比较的旧代码：Token("KEYWORD", "DECLARE").type == "KEYWORD"
+    __slots__ = ("kind", "value", "kw", "line", "col")
+
+    def __init__(self, kind, value, line=0, col=0):
+        if isinstance(kind, str):
+            kind = KIND_IDS[kind]
+        self.kind = kind
+        self.value = value
+        self.kw = KEYWORD_IDS.get(value, NO_KW) if kind == KEYWORD or kind == LOGICOP else NO_KW
+        self.line = line
+        self.col = col
+
+    @property
+    def type(self):
+        return TOKEN_KINDS[self.kind]
+
+    # 相等只看种类和值，不看位置
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return NotImplemented
+        return self.kind == other.kind and self.value == other.value
+
+    def __repr__(self):
+        return f"Token(type={self.type!r}, value={self.value!r}, line={self.line}, col={self.col})"
+
+
+def tokenize_iter(source):
+    # 逐个产出 Token。source 可以是整段源码字符串，
+    # 也可以是按行产出字符串的可迭代对象（比如打开的文件），这样大文件不用整个读进内存。
+    lines = (source,) if isinstance(source, str) else source
+    finditer = TOKEN_RE.finditer
+    intern = sys.intern
+    keywords = KEYWORDS
+    keyword_ids = KEYWORD_IDS
+    group_kinds = GROUP_KINDS
+    new = Token.__new__
+    line = 1
+    for chunk in lines:
+        line_start = 0  # 当前行在 chunk 里的起始偏移
+        for match in finditer(chunk):
+            kind = group_kinds[match.lastindex]
+            if kind >= NEWLINE:
+                if kind == NEWLINE:
+                    line += 1
+                    line_start = match.end()
+                    continue
+                if kind == SKIP:
+                    continue
+                raise RuntimeError(f"Unexpected token: {match.group()} at line {line}, column {match.start() - line_start + 1}")
+            if kind == COMMENT:
+                continue
+            value = match.group()
+            token = new(Token)
+            token.kind = kind
+            if kind == KEYWORD or kind == LOGICOP:
+                # 关键字共用 KEYWORDS 里的字符串
+                kw = keyword_ids[value]
+                value = keywords[kw]
+            else:
+                kw = NO_KW
+                if kind != STRING:
+                    value = intern(value)
+            token.value = value
+            token.kw = kw
+            token.line = line
+            token.col = match.start() - line_start + 1
+            yield token
+
 
 def tokenize(code: str) -> list[Token]:
-    token_specification = [
-        ("COMMENT", r"//[^\n]*"),  # 整行注释
-        ("COLON", r":"),
-        ("ASSIGN", r"<-"),
-        ("LPAREN", r"\("),
-        ("RPAREN", r"\)"),
-        ("LBRACKET", r"\["),
-        ("RBRACKET", r"\]"),
-        ("COMMA", r","),
-        ("CARET", r"\^"),
-        ("STRCOMB", r"&"),
-        ("NEQ", r"<>"),
-        ("GTE", r">="),
-        ("LTE", r"<="),
-        ("LOGICOP", r"\b(AND|OR|NOT)\b"),
-        ("OPERATOR", r"[+\-*/><=]"),
-        ("NUMBER", r"\d+(\.\d+)?"),  # 支持实数
-        ("STRING", r'"[^"\n]*"'),
-        ("KEYWORD", r"\b(OUTPUT|IF|THEN|ELSE|ENDIF|WHILE|ENDWHILE|DECLARE|INTEGER|REAL|STRING|INPUT|FOR|TO|NEXT|REPEAT|UNTIL|OTHERWISE|ENDCASE|CHAR|DATE|BOOLEAN|TYPE|ENDTYPE|PROCEDURE|ENDPROCEDURE|FUNCTION|ENDFUNCTION|RETURN|RETURNS|CALL|ARRAY|OF|CASE OF|PUBLIC|PRIVATE|CLASS|ENDCLASS|INHERITS)\b"),
-        ("DOT", r"\."),
-        ("IDENTIFIER", r"[A-Za-z_][A-Za-z0-9_]*"),
-        ("NEWLINE", r"\n"),
-        ("SKIP", r"[ \t]+"),
-        ("MISMATCH", r"."),
-    ]
-
-    tok_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in token_specification)
-    token_re = re.compile(tok_regex)
-
-    code_no_comments = []
-    for line in code.splitlines():
-        if '//' in line:
-            line = line.split('//', 1)[0]  # 去掉注释
-        code_no_comments.append(line)
-    code = '\n'.join(code_no_comments)
-
-
-    tokens = []
-
-    for match in token_re.finditer(code):
-        kind = match.lastgroup
-        value = match.group()
-        if kind in ("SKIP", "NEWLINE", "COMMENT"):
-            continue
-        elif kind == "MISMATCH":
-            raise RuntimeError(f"Unexpected token: {value}")
-        else:
-            tokens.append(Token(kind, value))
-    return tokens
+    return list(tokenize_iter(code))
@@ -0,0 +1,536 @@
+import builtins
+import functools
+import keyword
+
+from app.evaluator.arrays import whole_index
+from app.evaluator.ast import *
+from app.evaluator.converters import StoreTypes
+from app.evaluator.resolver import collect_declares, resolve_program
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.library import lookup as lookup_builtin
+
+SCALAR_DEFAULTS = {
+    "INTEGER": "0",
+    "REAL": "0.0",
+    "STRING": '""',
+    "CHAR": '""',
+    "BOOLEAN": "False",
+    "DATE": "None",
+}
+
+# 这几种类型的 Interpreter.convert 就是直接调用一个函数（STRING 的会保留 & 拼出来的 Rope）
+DIRECT_CONVERTERS = {"INTEGER": "int", "REAL": "float", "STRING": "_to_string"}
+
+COMPARE_OPS = {"=": "==", "<>": "!=", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+ARITH_OPS = {"+": "+", "-": "-", "*": "*", "/": "/"}
+# 能在生成的 Python 里不加括号连写的运算分组（同组的左结合链直接连写）
+CHAIN_LEVELS = {"OR": 1, "AND": 2, "+": 5, "-": 5, "*": 6, "/": 6}
+COMPARE_LEVEL = 3
+# CPython 编译很深的 BinOp 也会递归，长链每这么多个运算存进一个临时变量
+CHAIN_CHUNK = 100
+
+# 生成的代码里用到的辅助名字，用户标识符撞上了要改名
+HELPER_NAMES = {"rt", "main", "_output", "_convert", "_input", "_builtin", "_index", "_index_error", "_for_range", "_in_range",
+                "_concat", "_to_string", "_tick", "_undeclared", "_depth", "_max_depth", "_stack_overflow",
+                "_recursion_overflow"}
+# 用到的内建函数在 main() 开头绑定成局部变量 _fn_名字
+BUILTIN_PREFIX = "_fn_"
+
+HEADER = '''\
+# Generated by ciecs transpile, do not edit.
+from app.evaluator.cases import in_case_range as _in_range
+from app.evaluator.converters import to_string as _to_string
+from app.evaluator.interpreter import for_range as _for_range
+from app.evaluator.ropes import concat as _concat
+from app.evaluator.transpiler import index as _index, index_error as _index_error, undeclared as _undeclared
+
+
+def main(rt):
+    _output = rt._output
+    _convert = rt.convert
+    _input = rt._read_input
+    _builtin = rt._call_builtin
+    _tick = rt._tick
+    _stack_overflow = rt._stack_overflow
+    _recursion_overflow = rt._recursion_overflow
+    _max_depth = rt.max_depth
+    _depth = 0
+'''
+
+FOOTER = '''
+
+if __name__ == "__main__":
+    from app.evaluator.interpreter import Interpreter
+    rt = Interpreter()
+    try:
+        main(rt)
+    finally:
+        rt.output.flush()
+'''
+
+
+class TranspileError(Exception):
+    pass
+
+
+def index_error(index, dim, name):
+    raise Exception(f"Index {index} out of bounds for dimension {dim} of array '{name}'")
+
+
+def index(ind, lo, hi, dim, name):
+    # 看不准类型的下标：整数值的 REAL 当整数用，返回从 0 起的位置
+    if ind.__class__ is not int:
+        ind = whole_index(ind, dim, name)
+    if not lo <= ind <= hi:
+        index_error(ind, dim, name)
+    return ind - lo
+
+
+def undeclared(name):
+    raise Exception(f"Variable '{name}' used before declaration.")
+
+
+def _collect_writes(stmts, out, assigns_only=False):
+    # 一段语句里会被写入的变量名（赋值 / FOR / INPUT）；assigns_only 时只收赋值
+    for stmt in stmts or ():
+        if isinstance(stmt, Assign) and isinstance(stmt.target, Var):
+            out.add(stmt.target.name)
+        elif isinstance(stmt, For):
+            if not assigns_only:
+                out.add(stmt.var_name)
+            _collect_writes(stmt.body, out, assigns_only)
+        elif isinstance(stmt, Input):
+            if not assigns_only:
+                out.add(stmt.var_name)
+        elif isinstance(stmt, If):
+            _collect_writes(stmt.then_body, out, assigns_only)
+            _collect_writes(stmt.else_body, out, assigns_only)
+        elif isinstance(stmt, (While, RepeatUntil)):
+            _collect_writes(stmt.body, out, assigns_only)
+        elif isinstance(stmt, CaseOf):
+            for _, body in stmt.cases:
+                _collect_writes(body, out, assigns_only)
+            _collect_writes(stmt.otherwise, out, assigns_only)
+    return out
+
+
+class Transpiler:
+    # 把 Program 翻译成可读的 Python 源码：声明的变量是 main() 的局部变量，
+    # FOR 是 range 循环，PROCEDURE/FUNCTION 是嵌套函数，数组是预先填好默认值的 list
+    def __init__(self, ticks=False):
+        self.ticks = ticks          # 有执行预算：循环回边和过程/函数入口调用 _tick(行号)
+        self.lines = []
+        self.indent = 1
+        self.user_types = {}
+        self.global_types = {}
+        self.global_names = set()
+        self.local_types = None     # 在过程/函数体里时：局部名字 -> 类型
+        self.temp_count = 0
+        self.builtins_used = set()
+        self.types = None
+        self.declared = set()       # 当前作用域里执行到这儿一定已经 DECLARE / INPUT 过的名字，赋值不用再检查
+
+    def transpile(self, program):
+        self.types = StoreTypes(program)  # 表达式的静态类型：下标一定是 INTEGER 的不用查类型
+        self.global_types = collect_declares(program.statements, {})
+        self.global_names = set(self.global_types) | _collect_writes(program.statements, set())
+        self.lines = [HEADER]
+        self.indent = 1
+        self.builtins_used = set()
+        self.declared = set()
+        self.emit_block(program.statements)
+        self.line("return None")
+        self.lines[1:1] = [f"    {BUILTIN_PREFIX}{name} = rt.builtins[{name!r}]" for name in sorted(self.builtins_used)]
+        return "\n".join(self.lines) + "\n" + FOOTER
+
+    # ---- 工具 ----
+    def line(self, text):
+        self.lines.append("    " * self.indent + text if text else "")
+
+    def name(self, name):
+        if (keyword.iskeyword(name) or hasattr(builtins, name) or name in HELPER_NAMES
+                or name.startswith(BUILTIN_PREFIX)):
+            return name + "_"
+        return name
+
+    def temp(self, prefix):
+        self.temp_count += 1
+        return f"_{prefix}{self.temp_count}"
+
+    def type_of(self, name):
+        if self.local_types is not None and name in self.local_types:
+            return self.local_types[name]
+        return self.global_types.get(name)
+
+    def emit_block(self, stmts):
+        start = len(self.lines)
+        declared = set(self.declared)  # 块里的 DECLARE 出了块就不一定执行过
+        for stmt in stmts or ():
+            self.emit_stmt(stmt)
+        if len(self.lines) == start:
+            self.line("pass")
+        self.declared = declared
+
+    # ---- 语句 ----
+    def emit_stmt(self, node):
+        method = getattr(self, "stmt_" + type(node).__name__, None)
+        if method is None:
+            raise TranspileError(f"Cannot transpile {type(node).__name__}")
+        method(node)
+
+    def stmt_Declare(self, node):
+        self.line(f"{self.name(node.name)} = {self.initial_value(node.type)}")
+        self.declared.add(node.name)
+
+    def initial_value(self, type_):
+        if isinstance(type_, PointerType):
+            raise TranspileError("Pointers are not supported by the transpiler")
+        if isinstance(type_, ArrayType):
+            if not all(isinstance(b, int) for b in type_.lowers + type_.uppers):
+                raise TranspileError("Array bounds must be constants")
+            default = SCALAR_DEFAULTS.get(type_.base_type, "None")
+            sizes = [hi - lo + 1 for lo, hi in zip(type_.lowers, type_.uppers)]
+            value = f"[{default}] * {sizes[-1]}"
+            for size in reversed(sizes[:-1]):
+                value = f"[{value} for _ in range({size})]"
+            return value
+        if type_ in SCALAR_DEFAULTS:
+            return SCALAR_DEFAULTS[type_]
+        typedef = self.user_types.get(type_)
+        if isinstance(typedef, ClassDef):
+            fields = ", ".join(f"{fname!r}: {SCALAR_DEFAULTS.get(ftype, 'None')}"
+                               for _, fname, ftype in typedef.fields)
+            return "{" + fields + "}"
+        if isinstance(typedef, PointerType):
+            raise TranspileError("Pointers are not supported by the transpiler")
+        raise TranspileError(f"Unknown type '{type_}'")
+
+    def converted(self, expr, type_):
+        # 和 Interpreter.convert 同样的类型检查
+        if type_ in DIRECT_CONVERTERS:
+            return f"{DIRECT_CONVERTERS[type_]}({expr})"
+        if type_ in ("CHAR", "BOOLEAN", "DATE"):
+            return f"_convert({expr}, {type_!r})"
+        return expr
+
+    def stmt_Assign(self, node):
+        target = node.target
+        value = self.bare(node.value)
+        if isinstance(target, Var):
+            if not node.exact:  # exact：右边已经是声明的类型
+                value = self.converted(value, self.type_of(target.name))
+            if target.name not in self.declared:
+                self.check_declared(target.name)
+            self.line(f"{self.name(target.name)} = {value}")
+        elif isinstance(target, FieldAccess):
+            self.line(f"{self.name(target.var_name)}[{target.field_name!r}] = {value}")
+        elif isinstance(target, ArrayAccess):
+            base_type = self.array_type(target.name).base_type
+            if not node.exact:
+                value = self.converted(value, base_type)
+            self.line(f"{self.element(target)} = {value}")
+        else:
+            raise TranspileError("Pointers are not supported by the transpiler")
+
+    def check_declared(self, name):
+        # 和其他引擎一样，给没声明过的变量赋值要报错：还没绑定的 Python 变量一读就是 NameError
+        self.line("try:")
+        self.line(f"    {self.name(name)}")
+        self.line("except NameError:")
+        self.line(f"    _undeclared({name!r})")
+
+    def stmt_Output(self, node):
+        self.line(f"_output([{', '.join(self.bare(v) for v in node.values)}])")
+
+    def stmt_Input(self, node):
+        self.line(f"{self.name(node.var_name)} = _input({node.var_name!r}, {self.type_of(node.var_name)!r})")
+        self.declared.add(node.var_name)
+
+    def stmt_If(self, node):
+        self.line(f"if {self.bare(node.condition)}:")
+        self.indent += 1
+        self.emit_block(node.then_body)
+        self.indent -= 1
+        if node.else_body:
+            self.line("else:")
+            self.indent += 1
+            self.emit_block(node.else_body)
+            self.indent -= 1
+
+    def tick(self, node):
+        if self.ticks:
+            self.line(f"_tick({node.line})")
+
+    def stmt_While(self, node):
+        self.line(f"while {self.bare(node.condition)}:")
+        self.indent += 1
+        self.emit_block(node.body)
+        self.tick(node)
+        self.indent -= 1
+
+    def stmt_RepeatUntil(self, node):
+        self.line("while True:")
+        self.indent += 1
+        self.emit_block(node.body)
+        self.line(f"if {self.bare(node.condition)}:")
+        self.line("    break")
+        self.tick(node)
+        self.indent -= 1
+
+    def stmt_For(self, node):
+        step = "" if node.step is None else f", {self.bare(node.step)}"
+        self.line(f"for {self.name(node.var_name)} in _for_range({self.bare(node.start)}, {self.bare(node.end)}{step}):")
+        self.indent += 1
+        self.emit_block(node.body)
+        self.tick(node)
+        self.indent -= 1
+
+    def stmt_CaseOf(self, node):
+        value = self.temp("case")
+        self.line(f"{value} = {self.bare(node.expr)}")
+        keyword_ = "if"
+        for label, body in node.cases:
+            if isinstance(label, CaseRange):
+                test = f"_in_range({value}, {self.bare(label.low)}, {self.bare(label.high)})"
+            else:
+                test = f"{self.expr(label)} == {value}"
+            self.line(f"{keyword_} {test}:")
+            self.indent += 1
+            self.emit_block(body)
+            self.indent -= 1
+            keyword_ = "elif"
+        if node.otherwise:
+            if node.cases:
+                self.line("else:")
+                self.indent += 1
+            self.emit_block(node.otherwise)
+            if node.cases:
+                self.indent -= 1
+
+    def stmt_CallStmt(self, node):
+        self.line(self.call(node.call))
+
+    def stmt_Return(self, node):
+        if self.local_types is None:
+            raise TranspileError("RETURN outside of a FUNCTION or PROCEDURE")
+        self.line("return None" if node.expr is None else f"return {self.bare(node.expr)}")
+
+    def stmt_TypeDef(self, node):
+        self.line(f"# TYPE {node.name}")
+
+    def stmt_ClassDef(self, node):
+        self.user_types[node.name] = node
+        self.line(f"# TYPE {node.name}")
+
+    def stmt_ProcedureDef(self, node):
+        self.emit_routine(node)
+
+    def stmt_FunctionDef(self, node):
+        self.emit_routine(node)
+
+    def emit_routine(self, node):
+        if self.local_types is not None:
+            raise TranspileError("Nested procedures are not supported")
+        if any(p.byref for p in node.params):
+            raise TranspileError("BYREF parameters are not supported by the transpiler")
+        params = [self.name(p.name) for p in node.params]
+        self.line("")
+        self.line(f"def {self.name(node.name)}({', '.join(params)}):")
+        self.indent += 1
+        self.local_types = {p.name: p.type for p in node.params}
+        self.local_types.update(collect_declares(node.body, {}))
+        # 写到的非局部名字按 resolver 的规则分：赋值写主程序里有的变量，
+        # FOR / INPUT 只有主程序 DECLARE 过才写全局，否则是这个函数自己的局部变量
+        assigned = _collect_writes(node.body, set(), assigns_only=True)
+        shared = sorted(name for name in _collect_writes(node.body, set())
+                        if name not in self.local_types
+                        and (name in self.global_types or name in assigned and name in self.global_names))
+        self.line(f"nonlocal {', '.join(['_depth'] + [self.name(n) for n in shared])}")
+        self.tick(node)
+        # 调用深度和其他引擎一样受 max_depth 限制
+        self.line("if _depth >= _max_depth:")
+        self.line(f"    raise _stack_overflow({node.name!r})")
+        self.line("_depth += 1")
+        self.line("try:")
+        self.indent += 1
+        outer, self.declared = self.declared, {p.name for p in node.params}
+        try:
+            self.emit_block(node.body)
+        finally:
+            self.local_types = None
+            self.declared = outer
+            self.indent -= 1
+        self.line("except RecursionError:")
+        self.line(f"    raise _recursion_overflow({node.name!r}, _depth) from None")
+        self.line("finally:")
+        self.line("    _depth -= 1")
+        self.indent -= 1
+        self.line("")
+
+    # ---- 表达式 ----
+    def bare(self, node):
+        # 语句级的表达式去掉最外层括号
+        text = self.expr(node)
+        if isinstance(node, BinaryOp) and text.startswith("(") and text.endswith(")"):
+            return text[1:-1]
+        return text
+
+    def expr(self, node):
+        method = getattr(self, "expr_" + type(node).__name__, None)
+        if method is None:
+            raise TranspileError(f"Cannot transpile {type(node).__name__}")
+        return method(node)
+
+    def expr_Number(self, node):
+        # 优化器折叠出来的负数加括号，免得和前面的运算符连在一起
+        return repr(node.value) if node.value >= 0 else f"({node.value!r})"
+
+    def expr_String(self, node):
+        return repr(node.value)
+
+    def expr_Boolean(self, node):
+        return repr(node.value)
+
+    def expr_Var(self, node):
+        if node.name.upper() == "TRUE":
+            return "True"
+        if node.name.upper() == "FALSE":
+            return "False"
+        return self.name(node.name)
+
+    def expr_BinaryOp(self, node):
+        # 左结合的长链沿左脊展开：同一优先级的运算连着写，不层层加括号，也不按链长递归
+        spine = []
+        while isinstance(node, BinaryOp):
+            spine.append(node)
+            node = node.left
+        text = self.expr(node)
+        level = None  # text 是没加括号的运算链时，记下这条链的优先级
+        chunks = []   # 已经存进临时变量的前缀：(_c1 := ...), (_c2 := _c1 + ...), ...
+        length = 0
+        for node in reversed(spine):
+            if length == CHAIN_CHUNK:
+                ref = self.temp("c")
+                chunks.append(f"({ref} := {text})")
+                text, level, length = ref, None, 0
+            length += 1
+            op = node.operator
+            if op in COMPARE_OPS:
+                # Python 会把 a < b < c 连成链式比较，左边总要加括号
+                if level is not None:
+                    text = f"({text})"
+                text = f"{text} {COMPARE_OPS[op]} {self.expr(node.right)}"
+                level = COMPARE_LEVEL
+                continue
+            if op == "&":
+                # 长字符串先不拼（见 ropes），逐个字符拼接的循环不会变成平方复杂度
+                text = f"_concat({text}, {self.bare(node.right)})"
+                level = None
+                continue
+            if op in ARITH_OPS:
+                py_op, wrap = ARITH_OPS[op], "{}"
+            # 和各个引擎一样短路；两边都转成 bool，结果还是 TRUE / FALSE
+            elif op == "AND":
+                py_op, wrap = "and", "bool({})"
+            elif op == "OR":
+                py_op, wrap = "or", "bool({})"
+            else:
+                raise TranspileError(f"Unsupported operator: {op}")
+            if wrap == "{}":
+                right = self.expr(node.right)
+                if level is not None and level != CHAIN_LEVELS[op]:
+                    text = f"({text})"
+            else:
+                # bool(...) 自带括号
+                right = wrap.format(self.bare(node.right))
+                if level != CHAIN_LEVELS[op]:
+                    text = wrap.format(text)
+            text = f"{text} {py_op} {right}"
+            level = CHAIN_LEVELS[op]
+        if chunks:
+            return f"({', '.join(chunks)}, {text})[-1]"
+        return f"({text})" if level is not None else text
+
+    def expr_UnaryOp(self, node):
+        return f"(not {self.expr(node.operand)})"
+
+    def expr_FieldAccess(self, node):
+        return f"{self.name(node.var_name)}[{node.field_name!r}]"
+
+    def expr_ArrayAccess(self, node):
+        return self.element(node)
+
+    def expr_Call(self, node):
+        return self.call(node)
+
+    def call(self, node):
+        args = [self.bare(arg) for arg in node.args]
+        builtin = lookup_builtin(node.name)
+        if builtin is not None:
+            if len(args) != builtin.arity:
+                # 参数个数不对：走 _call_builtin，运行到这里时报错
+                return f"_builtin({builtin.name!r}, [{', '.join(args)}])"
+            self.builtins_used.add(builtin.name)
+            return f"{BUILTIN_PREFIX}{builtin.name}({', '.join(args)})"
+        return f"{self.name(node.name)}({', '.join(args)})"
+
+    def array_type(self, name):
+        type_ = self.type_of(name)
+        if not isinstance(type_, ArrayType):
+            raise TranspileError(f"'{name}' is not an array")
+        return type_
+
+    def element(self, node):
+        # A[i] -> A[i - lo]，越界检查写在下标表达式里，和 ArrayAccess 的报错一致
+        type_ = self.array_type(node.name)
+        if len(node.indices) != len(type_.lowers):
+            raise TranspileError(f"Incorrect number of indices for array '{node.name}'")
+        text = self.name(node.name)
+        for dim, (index, lo, hi) in enumerate(zip(node.indices, type_.lowers, type_.uppers), start=1):
+            expr = self.expr(index)
+            if isinstance(index, Number) and expr.isdigit() and lo <= int(expr) <= hi:
+                # 常量下标在翻译时就检查完
+                text += f"[{int(expr) - lo}]"
+                continue
+            if isinstance(index, (Var, Number)):
+                ref = check = expr
+            else:
+                # 复杂下标只求值一次
+                ref = self.temp("i")
+                check = f"({ref} := {expr})"
+            offset = ref if lo == 0 else f"{ref} - {lo}"
+            if self.types.type_of(index) == "INTEGER":
+                text += f"[{offset} if {lo} <= {check} <= {hi} else _index_error({ref}, {dim}, {node.name!r})]"
+            else:
+                # 可能是 REAL（比如 / 的结果）：先看是不是 int
+                text += (f"[{offset} if {check}.__class__ is int and {lo} <= {ref} <= {hi} "
+                         f"else _index({ref}, {lo}, {hi}, {dim}, {node.name!r})]")
+        return text
+
+
+def transpile(program, ticks=False):
+    resolve_program(program)  # 标出不用转换的赋值
+    return Transpiler(ticks).transpile(program)
+
+
+@functools.lru_cache(maxsize=64)
+def compile_python(source, filename="<transpiled>"):
+    # 同一份生成代码只编译一次
+    namespace = {}
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace["main"]
+
+
+class PythonInterpreter(Interpreter):
+    # 先翻译成 Python 再执行；运行时的转换、输出、输入、内建函数仍由 Interpreter 提供
+    def eval(self, node):
+        if isinstance(node, Program):
+            program = compile_python(transpile(node, ticks=self._tick is not None))
+            self._start_limits()
+            try:
+                return program(self)
+            except RecursionError:
+                raise self._recursion_overflow() from None
+            finally:
+                self.output.flush()
+        return super().eval(node)
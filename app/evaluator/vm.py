@@ -0,0 +1,316 @@
+from app.evaluator.ast import *
+from app.evaluator.arrays import PseudoArray
+from app.evaluator.bytecode import *
+from app.evaluator.cases import in_case_range
+from app.evaluator.interpreter import Interpreter, Reference, StackOverflow, for_range
+from app.evaluator.resolver import UNSET
+from app.evaluator.ropes import concat
+
+
+class Frame:
+    __slots__ = ("code", "pc", "locals", "stack")
+
+    def __init__(self, code, locals_):
+        self.code = code
+        self.pc = 0
+        self.locals = locals_
+        self.stack = []
+
+
+class VM(Interpreter):
+    # 栈式字节码虚拟机：调用用显式的 Frame 栈，不占用 Python 递归，
+    # RETURN 就是一条指令，不再靠异常回退。帧栈深度受 max_depth 限制。
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.globals = []
+        self.frames = []
+
+    def eval(self, node):
+        if isinstance(node, Program):
+            return self.run(compile_program(node))
+        # 单个表达式等零散节点仍然交给树遍历
+        return super().eval(node)
+
+    def run(self, code):
+        self.globals = [UNSET] * len(code.global_names)
+        self._start_limits()
+        try:
+            return self._execute(Frame(code, [UNSET] * code.nlocals))
+        finally:
+            self.output.flush()
+
+    def _name(self, scope, slot, frame):
+        return frame.code.varnames[slot] if scope == LOCAL else frame.code.global_names[slot]
+
+    def _array_in(self, container, slot, name):
+        array = container[slot]
+        if not isinstance(array, PseudoArray):
+            raise Exception(f"'{name}' is not an array")
+        return array
+
+    def _struct(self, container, slot, var_name, field_name):
+        if container[slot] is UNSET:
+            raise Exception(f"Variable '{var_name}' not declared")
+        type_name = self.var_types.get(var_name)
+        typedef = self.user_types.get(type_name) if isinstance(type_name, str) else None
+        if not isinstance(typedef, ClassDef):
+            raise Exception(f"Type '{type_name}' is not a class/struct")
+        if not any(fname == field_name for _, fname, _ in typedef.fields):
+            raise Exception(f"'{field_name}' is not a field of type '{type_name}'")
+        return container[slot]
+
+    def _execute(self, frame):
+        frames = self.frames
+        max_depth = self.max_depth
+        globals_ = self.globals
+        code = frame.code
+        instructions = code.instructions
+        locals_ = frame.locals
+        stack = frame.stack
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        tick = self._tick
+
+        try:
+            while True:
+                op, arg = instructions[pc]
+                pc += 1
+
+                if op == LOAD_GLOBAL:
+                    value = globals_[arg]
+                    if value is UNSET:
+                        raise Exception(f"Variable '{code.global_names[arg]}' was not declared.")
+                    push(value)
+                elif op == LOAD_LOCAL:
+                    value = locals_[arg]
+                    if value is UNSET:
+                        raise Exception(f"Variable '{code.varnames[arg]}' was not declared.")
+                    push(value)
+                elif op == LOAD_CONST:
+                    push(arg)
+                elif op == STORE_GLOBAL:
+                    if globals_[arg] is UNSET:
+                        raise Exception(f"Variable '{code.global_names[arg]}' used before declaration.")
+                    globals_[arg] = pop()
+                elif op == STORE_LOCAL:
+                    if locals_[arg] is UNSET:
+                        raise Exception(f"Variable '{code.varnames[arg]}' used before declaration.")
+                    locals_[arg] = pop()
+                elif op == SET_LOCAL:
+                    locals_[arg] = pop()
+                elif op == SET_GLOBAL:
+                    globals_[arg] = pop()
+                elif op == ADD:
+                    right = pop()
+                    stack[-1] = stack[-1] + right
+                elif op == SUB:
+                    right = pop()
+                    stack[-1] = stack[-1] - right
+                elif op == MUL:
+                    right = pop()
+                    stack[-1] = stack[-1] * right
+                elif op == DIV:
+                    right = pop()
+                    stack[-1] = stack[-1] / right
+                elif op == LT:
+                    right = pop()
+                    stack[-1] = stack[-1] < right
+                elif op == GT:
+                    right = pop()
+                    stack[-1] = stack[-1] > right
+                elif op == EQ:
+                    right = pop()
+                    stack[-1] = stack[-1] == right
+                elif op == NE:
+                    right = pop()
+                    stack[-1] = stack[-1] != right
+                elif op == GE:
+                    right = pop()
+                    stack[-1] = stack[-1] >= right
+                elif op == LE:
+                    right = pop()
+                    stack[-1] = stack[-1] <= right
+                elif op == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == LOOP_IF_FALSE:
+                    if not pop():
+                        pc = arg[0]
+                        if tick is not None:
+                            tick(arg[1])
+                elif op == JUMP:
+                    pc = arg
+                elif op == LOOP:
+                    pc = arg[0]
+                    if tick is not None:
+                        tick(arg[1])
+                elif op == FOR_ITER:
+                    value = next(locals_[arg[0]], UNSET)
+                    if value is UNSET:
+                        pc = arg[1]
+                    else:
+                        push(value)
+                elif op == CONVERT:
+                    stack[-1] = arg(stack[-1])
+                elif op == INDEX_LOAD:
+                    scope, slot, n, name = arg
+                    array = (locals_ if scope == LOCAL else globals_)[slot]
+                    if not isinstance(array, PseudoArray):
+                        raise Exception(f"'{name}' is not an array")
+                    if n == 1:
+                        stack[-1] = array.get1(stack[-1])
+                    elif n == 2:
+                        j = pop()
+                        stack[-1] = array.get2(stack[-1], j)
+                    else:
+                        indices = stack[-n:]
+                        del stack[-n:]
+                        push(array.get(indices))
+                elif op == INDEX_STORE:
+                    scope, slot, n, name, exact = arg
+                    array = self._array_in(locals_ if scope == LOCAL else globals_, slot, name)
+                    indices = stack[-n:]
+                    del stack[-n:]
+                    pos = array.offset(indices)
+                    array[pos] = pop() if exact else array.convert(pop())
+                elif op == AND_JUMP:
+                    if stack[-1]:
+                        pop()
+                    else:
+                        stack[-1] = False
+                        pc = arg
+                elif op == OR_JUMP:
+                    if stack[-1]:
+                        stack[-1] = True
+                        pc = arg
+                    else:
+                        pop()
+                elif op == TO_BOOL:
+                    stack[-1] = bool(stack[-1])
+                elif op == NOT:
+                    stack[-1] = not bool(stack[-1])
+                elif op == CONCAT:
+                    right = pop()
+                    stack[-1] = concat(stack[-1], right)
+                elif op == CALL:
+                    name, argc = arg
+                    routine = self.procedures.get(name) or self.functions.get(name)
+                    if routine is None:
+                        raise Exception(f"Unknown procedure/function: {name}")
+                    if tick is not None:
+                        tick(routine.line)
+                    if len(frames) >= max_depth:
+                        raise self._stack_overflow(name)
+                    args = stack[len(stack) - argc:]
+                    del stack[len(stack) - argc:]
+                    # 形参占前几个槽位；多余的实参丢弃，和 zip() 一致
+                    new_locals = [UNSET] * routine.nlocals
+                    bound = min(argc, routine.nparams)
+                    new_locals[:bound] = args[:bound]
+                    # 保存当前帧，切换到被调用者
+                    frame.pc = pc
+                    frames.append(frame)
+                    frame = Frame(routine, new_locals)
+                    code = routine
+                    instructions = code.instructions
+                    locals_ = frame.locals
+                    stack = frame.stack
+                    push = stack.append
+                    pop = stack.pop
+                    pc = 0
+                elif op == RETURN_VALUE:
+                    value = pop()
+                    if not frames:
+                        return value
+                    frame = frames.pop()
+                    code = frame.code
+                    instructions = code.instructions
+                    locals_ = frame.locals
+                    stack = frame.stack
+                    push = stack.append
+                    pop = stack.pop
+                    pc = frame.pc
+                    push(value)
+                elif op == POP:
+                    pop()
+                elif op == CALL_BUILTIN:
+                    name, argc = arg
+                    args = stack[len(stack) - argc:]
+                    del stack[len(stack) - argc:]
+                    push(self._call_builtin(name, args))
+                elif op == OUTPUT:
+                    values = stack[len(stack) - arg:]
+                    del stack[len(stack) - arg:]
+                    self._output(values)
+                elif op == FOR_PREP:
+                    step = pop()
+                    end = pop()
+                    start = pop()
+                    push(iter(for_range(start, end, step)))
+                elif op == FIELD_LOAD:
+                    scope, slot, var_name, field_name = arg
+                    struct = self._struct(locals_ if scope == LOCAL else globals_, slot, var_name, field_name)
+                    push(struct[field_name])
+                elif op == FIELD_STORE:
+                    scope, slot, var_name, field_name = arg
+                    struct = self._struct(locals_ if scope == LOCAL else globals_, slot, var_name, field_name)
+                    struct[field_name] = pop()
+                elif op == DECLARE:
+                    scope, slot, type_ = arg
+                    value, var_type = self._declare_value(type_, self._name(scope, slot, frame))
+                    (locals_ if scope == LOCAL else globals_)[slot] = value
+                    self._set_type(self._name(scope, slot, frame), var_type)
+                elif op == INPUT:
+                    scope, slot, var_name, type_ = arg
+                    (locals_ if scope == LOCAL else globals_)[slot] = self._read_input(var_name, type_)
+                elif op == ADDRESS_OF:
+                    scope, slot = arg
+                    push(Reference(locals_ if scope == LOCAL else globals_, slot))
+                elif op == ADDRESS_OF_FIELD:
+                    scope, slot, var_name, field_name = arg
+                    container = locals_ if scope == LOCAL else globals_
+                    struct = container[slot]
+                    if not isinstance(struct, dict):
+                        raise Exception(f"'{var_name}' is not structured")
+                    push(Reference(struct, field_name))
+                elif op == ADDRESS_OF_INDEX:
+                    scope, slot, n, name = arg
+                    indices = stack[-n:]
+                    del stack[-n:]
+                    array = self._array_in(locals_ if scope == LOCAL else globals_, slot, name)
+                    push(Reference(array, array.offset(indices)))
+                elif op == DEREF:
+                    ptr = pop()
+                    if not isinstance(ptr, Reference):
+                        raise Exception("Attempt to dereference a non-pointer")
+                    value = ptr.get()
+                    push(None if value is UNSET else value)
+                elif op == STORE_DEREF:
+                    ptr = pop()
+                    if not isinstance(ptr, Reference):
+                        raise Exception("Left side is not a pointer dereference")
+                    ptr.set(pop())
+                elif op == DEFINE:
+                    kind, name, routine = arg
+                    if kind == "PROCEDURE":
+                        self.procedures[name] = routine
+                    else:
+                        self.functions[name] = routine
+                elif op == EXEC:
+                    push(super().eval(arg))
+                elif op == JUMP_IF_TRUE:
+                    if pop():
+                        pc = arg
+                elif op == CASE_JUMP:
+                    table, targets, otherwise = arg
+                    index = table.lookup(pop())
+                    pc = otherwise if index is None else targets[index]
+                elif op == IN_RANGE:
+                    high = pop()
+                    low = pop()
+                    stack[-1] = in_case_range(stack[-1], low, high)
+                else:
+                    raise Exception(f"Unknown opcode: {op}")
+        finally:
+            frames.clear()
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import sys
+import tempfile
+
+from app.evaluator import ast, astcodec, tokenizer
+from app.parser import parser as parser_module
+from app.parser.parser import Parser
+
+# 类似 __pycache__：按“源码 + 解释器版本”的哈希把解析好的 Program 存盘（astcodec 格式），下次直接读回来。
+# 多个进程可以共用一个缓存目录：写入先写临时文件再 os.replace，读到的要么是完整文件要么没有。
+CACHE_DIR_NAME = "__pseudocache__"
+SUFFIX = ".ast"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_version_tag = None
+
+
+def version_tag():
+    # 没有单独的版本号，就用 tokenizer / parser / ast / astcodec 的源码摘要加 Python 版本：
+    # 语法、节点定义或存储格式一改，旧缓存自然失效
+    global _version_tag
+    if _version_tag is None:
+        digest = hashlib.sha256(sys.version.encode())
+        for module in (tokenizer, parser_module, ast, astcodec):
+            with open(module.__file__, "rb") as f:
+                digest.update(f.read())
+        _version_tag = digest.digest()
+    return _version_tag
+
+
+class ASTCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, source: bytes):
+        return hashlib.sha256(version_tag() + source).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            program = self.decode(data)
+        except Exception:
+            # 坏文件（比如别的版本写的）当作没命中，顺手删掉
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # 最近使用时间，LRU 按 mtime 淘汰
+        except OSError:
+            pass
+        return program
+
+    def put(self, key, program):
+        try:
+            data = self.encode(program)
+        except astcodec.ASTFormatError:
+            return False  # 存不了的节点就不缓存，下次照常解析
+        if len(data) > self.max_bytes:
+            return False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return False  # 目录建不了 / 不可写（比如同名的是个文件）：不缓存，和读失败一样不影响运行
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)  # mkstemp 默认只有自己可读，共享目录里别的用户也要能读
+            os.replace(tmp, self.path(key))
+        except OSError:
+            self._remove(tmp)
+            return False  # 磁盘满之类
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self.evict()
+        return True
+
+    def encode(self, program):
+        return astcodec.dumps(program)
+
+    def decode(self, data):
+        return astcodec.loads(data)
+
+    def evict(self):
+        # 总大小超过 max_bytes 时，从最久没用的开始删
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # 别的进程刚删掉
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            return
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            self._remove(path)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def load(self, filename):
+        # 先整文件算哈希（分块读，不占内存），命中就直接返回；
+        # 没命中再边读边解析，存盘用同一个哈希
+        digest = hashlib.sha256(version_tag())
+        with open(filename, "rb") as f:
+            before = os.fstat(f.fileno())
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        key = digest.hexdigest()
+        program = self.get(key)
+        if program is not None:
+            return program
+
+        # utf-8-sig 去掉 BOM，否则词法分析会把它当成非法字符
+        with open(filename, "r", encoding="utf-8-sig") as f:
+            program = Parser(tokenizer.tokenize_iter(f)).parse()
+            after = os.fstat(f.fileno())
+        # 算完哈希后文件又被改过，解析结果和 key 对不上，不存
+        if (before.st_mtime_ns, before.st_size) == (after.st_mtime_ns, after.st_size):
+            self.put(key, program)
+        return program
+
+def default_cache_dir(filename):
+    # 和 __pycache__ 一样放在源文件旁边
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR_NAME)
+
+
+def load_program(filename, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    return ASTCache(cache_dir or default_cache_dir(filename), max_bytes).load(filename)
@@ -1,150 +1,182 @@
 # app/parser/parser.py
 
-from app.evaluator.tokenizer import Token
+from app.evaluator.tokenizer import *
 from app.evaluator.ast import *
-from typing import List
+from typing import Iterable
+
+# 二元运算符优先级，数字越大越先结合（NOT 是一元的，比这些都高）
+BINARY_PRECEDENCE = {
+    "OR": 1,
+    "AND": 2,
+    "=": 3, "<>": 3, "<": 3, ">": 3, "<=": 3, ">=": 3,
+    "&": 4,
+    "+": 5, "-": 5,
+    "*": 6, "/": 6,
+}
+
+# 单独成类的运算符 token -> 运算符
+OPERATOR_TOKENS = {NEQ: "<>", GTE: ">=", LTE: "<=", STRCOMB: "&"}
+
+# 内置基本类型的关键字 id
+BASE_TYPES = frozenset((KW_INTEGER, KW_REAL, KW_STRING, KW_CHAR, KW_BOOLEAN, KW_DATE))
+
+
+def where(token):
+    # 报错用的位置后缀；手工构造的 token 没有位置
+    return f" at line {token.line}, column {token.col}" if token.line else ""
 
 class Parser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
-        self.pos = 0
+    def __init__(self, tokens: Iterable[Token]):
+        # tokens 可以是 list，也可以是 tokenize_iter 的生成器：只往前看一个 token，按需读取
+        self.tokens = iter(tokens)
+        self.token = next(self.tokens, None)
+        self.pending = []  # peek() 多读出来的 token
+        self.pos = 0  # 已经消耗的 token 数
         self.user_types = {}
+        self.literals = {}  # 字面量原文 -> 节点：字面量节点没有标注，相同的数字 / 字符串共用一个
 
     def current(self):
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return None
+        return self.token
+
+    def advance(self):
+        self.token = self.pending.pop() if self.pending else next(self.tokens, None)
+        self.pos += 1
+
+    def peek(self):
+        # 当前 token 之后的那个；只有 CASE 标签（x: 和 x <- 1 开头一样）需要多看一个
+        if not self.pending:
+            self.pending.append(next(self.tokens, None))
+        return self.pending[-1]
+
+    def literal(self, token):
+        node = self.literals.get(token.value)
+        if node is None:
+            if token.kind == NUMBER:
+                node = Number(number_value(token.value))
+            else:
+                node = String(token.value.strip('"'))
+            self.literals[token.value] = node
+        return node
+
+    def at(self, kind):
+        token = self.token
+        return token is not None and token.kind == kind
 
-    def eat(self, expected_type=None, expected_value=None):
-        token = self.current()
+    def at_keyword(self, *kws):
+        token = self.token
+        return token is not None and token.kw in kws
+
+    def eat(self, kind=None, kw=None, value=None):
+        # kind 是 token 种类，kw 是关键字 id，都按整数比较；value 只用于少数按原文匹配的地方
+        token = self.token
         if token is None:
             raise SyntaxError("Unexpected end of input")
 
-        if expected_type and token.type != expected_type:
-            raise SyntaxError(f"Expected token type {expected_type}, got {token.type}")
-        if expected_value and token.value != expected_value:
-            raise SyntaxError(f"Expected token value {expected_value}, got {token.value}")
+        if kind is not None and token.kind != kind:
+            raise SyntaxError(f"Expected token type {TOKEN_KINDS[kind]}, got {token.type}{where(token)}")
+        if kw is not None and token.kw != kw:
+            raise SyntaxError(f"Expected token value {KEYWORDS[kw]}, got {token.value}{where(token)}")
+        if value is not None and token.value != value:
+            raise SyntaxError(f"Expected token value {value}, got {token.value}{where(token)}")
 
-        self.pos += 1
+        self.advance()
         return token
 
     def parse(self) -> Program:
         statements = []
-        while self.current():
-            # print("PARSE LOOP TOKEN:", self.current())
-            # print("REMAINING TOKENS:", self.tokens[self.pos:self.pos+3])
+        while self.token:
+            # print("PARSE LOOP TOKEN:", self.token)
             stmt = self.parse_statement()
             if stmt:
                 statements.append(stmt)
         return Program(statements=statements)
 
+    # 语句开头的关键字 -> 解析方法名；其余情况只看第一个 token 决定，不回溯
+    STATEMENT_PARSERS = {
+        KW_DECLARE: "parse_declare",
+        KW_OUTPUT: "parse_output",
+        KW_WHILE: "parse_while",
+        KW_INPUT: "parse_input",
+        KW_IF: "parse_if",
+        KW_FOR: "parse_for",
+        KW_REPEAT: "parse_repeat",
+        KW_CASE_OF: "parse_case",
+        KW_TYPE: "parse_type_definition",
+        KW_PROCEDURE: "parse_procedure_definition",
+        KW_FUNCTION: "parse_function_definition",
+        KW_CALL: "parse_call",  # 会返回 CallStmt
+        KW_RETURN: "parse_return",
+    }
+
     def parse_statement(self):
-        token = self.current()
+        token = self.token
         # print("Current token:", token)
 
-        if token.type == "KEYWORD":
-            if token.value == "DECLARE":
-                return self.parse_declare()
-            elif token.value == "OUTPUT":
-                return self.parse_output()
-            elif token.value == "WHILE":
-                return self.parse_while()
-            elif token.value == "INPUT":
-                return self.parse_input()
-            elif token.value == "IF":
-                return self.parse_if()
-            elif token.value == "FOR":
-                return self.parse_for()
-            elif token.value == "REPEAT":
-                return self.parse_repeat()
-            elif token.value == "CASE OF":
-                return self.parse_case()
-            elif token.value == "INPUT":
-                return self.parse_input()
-            elif token.value == "TYPE":
-                return self.parse_type_definition()
-            if token.value == "PROCEDURE":
-                return self.parse_procedure_definition()
-            elif token.value == "FUNCTION":
-                return self.parse_function_definition()
-            elif token.value == "CALL":
-                return self.parse_call()  # 会返回 CallStmt
-            elif token.value == "RETURN":
-                return self.parse_return()
-            else:
-                raise SyntaxError(f"Unknown keyword: {token.value}")
-        elif token.type in ("IDENTIFIER", "CARET"):
-            saved_pos = self.pos
-
-            try:
-                # 尝试解析完整的左值表达式
-                lval = self.parse_expression()
-
-                # 如果后面是 <- ，说明是赋值语句
-                if self.current() and self.current().type == "ASSIGN":
-                    # 回滚到最初位置，由 parse_assign 正常解析
-                    self.pos = saved_pos
-                    return self.parse_assign()
-                else:
-                    raise SyntaxError(f"Unexpected expression start: {token}")
-            except Exception as e:
-                self.pos = saved_pos
-                raise SyntaxError(f"Unexpected expression start: {token}")
-
-
+        kind = token.kind
+        if kind == KEYWORD:
+            name = self.STATEMENT_PARSERS.get(token.kw)
+            if name is None:
+                raise SyntaxError(f"Unknown keyword: {token.value}{where(token)}")
+            stmt = getattr(self, name)()
+        elif kind == IDENTIFIER or kind == CARET:
+            # 没有表达式语句，标识符开头的只能是赋值：左值 <- 表达式，只解析一遍
+            stmt = self.parse_assign()
         else:
             raise SyntaxError(f"Unknown start of statement: {token}")
+        if stmt is not None and token.line:
+            annotate(stmt, line=token.line)  # 记下语句开头所在的行
+        return stmt
 
 
     def parse_declare(self):
-        self.eat("KEYWORD", "DECLARE")
-        var_name = self.eat("IDENTIFIER").value
-        self.eat("COLON")
+        self.eat(KEYWORD, KW_DECLARE)
+        var_name = self.eat(IDENTIFIER).value
+        self.eat(COLON)
 
         # inline pointer: ^INTEGER etc.
-        if self.current() and self.current().type == "CARET":
-            self.eat("CARET")
-            base_token = self.eat("KEYWORD")
-            if base_token.value not in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE"):
+        if self.at(CARET):
+            self.eat(CARET)
+            base_token = self.eat(KEYWORD)
+            if base_token.kw not in BASE_TYPES:
                 raise SyntaxError(f"Unknown base type for pointer: {base_token.value}")
             ptr_type = PointerType(base_type=base_token.value)
             return Declare(name=var_name, type=ptr_type)
 
         # array type: ARRAY[1:3] OF INTEGER
-        if self.current() and self.current().type == "KEYWORD" and self.current().value == "ARRAY":
-            self.eat("KEYWORD", "ARRAY")
-            self.eat("LBRACKET")
+        if self.at_keyword(KW_ARRAY):
+            self.eat(KEYWORD, KW_ARRAY)
+            self.eat(LBRACKET)
             lowers = []
             uppers = []
             while True:
-                low = int(self.eat("NUMBER").value)
-                self.eat("COLON")
-                high = int(self.eat("NUMBER").value)
+                low = int(self.eat(NUMBER).value)
+                self.eat(COLON)
+                high = int(self.eat(NUMBER).value)
                 lowers.append(low)
                 uppers.append(high)
-                if self.current() and self.current().type == "COMMA":
-                    self.eat("COMMA")
+                if self.at(COMMA):
+                    self.eat(COMMA)
                 else:
                     break
-            self.eat("RBRACKET")
-            self.eat("KEYWORD", "OF")
-            base_token = self.eat(self.current().type)
+            self.eat(RBRACKET)
+            self.eat(KEYWORD, KW_OF)
+            base_token = self.eat()
             base_type = base_token.value
-            if base_type not in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE") and base_type not in self.user_types:
+            if base_token.kw not in BASE_TYPES and base_type not in self.user_types:
                 raise SyntaxError(f"Unknown base type for array: {base_type}")
             return Declare(name=var_name, type=ArrayType(lowers=lowers, uppers=uppers, base_type=base_type))
 
         # 普通 / user-defined type
-        if self.current() and self.current().type in ("KEYWORD", "IDENTIFIER"):
-            var_type_token = self.eat(self.current().type)
-            if var_type_token.value in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE"):
+        if self.at(KEYWORD) or self.at(IDENTIFIER):
+            var_type_token = self.eat()
+            if var_type_token.kw in BASE_TYPES:
                 return Declare(name=var_name, type=var_type_token.value)
             elif var_type_token.value in self.user_types:
                 return Declare(name=var_name, type=var_type_token.value)
             else:
                 raise SyntaxError(f"Unknown type: {var_type_token.value}")
 
-        raise SyntaxError(f"Unexpected type in declaration: {self.current()}")
+        raise SyntaxError(f"Unexpected type in declaration: {self.token}")
 
 
 
@@ -153,48 +185,45 @@ class Parser:
 
     def parse_assign(self):
         target = self.parse_lvalue()  # 可以是 Var / FieldAccess / ArrayAccess
-        self.eat("ASSIGN")
+        token = self.token
+        if token is None or token.kind != ASSIGN:
+            raise SyntaxError(f"Expected '<-' after assignment target {target}, got {token}")
+        self.eat(ASSIGN)
         value = self.parse_expression()
         return Assign(target=target, value=value)
 
 
     
     def parse_if(self):
-        self.eat("KEYWORD", "IF")
+        self.eat(KEYWORD, KW_IF)
         condition = self.parse_expression()  # 解析 IF 的条件
-        self.eat("KEYWORD", "THEN")
+        self.eat(KEYWORD, KW_THEN)
 
         body = []
-        while self.current() and not (
-            self.current().type == "KEYWORD" and 
-            self.current().value in ("ELSE", "ENDIF")
-        ):
+        while self.token and not self.at_keyword(KW_ELSE, KW_ENDIF):
             body.append(self.parse_statement())
 
         else_body = None
-        if self.current() and self.current().type == "KEYWORD" and self.current().value == "ELSE":
-            self.eat("KEYWORD", "ELSE")
+        if self.at_keyword(KW_ELSE):
+            self.eat(KEYWORD, KW_ELSE)
             else_body = []
-            while self.current() and not (
-                self.current().type == "KEYWORD" and 
-                self.current().value == "ENDIF"
-            ):
+            while self.token and not self.at_keyword(KW_ENDIF):
                 else_body.append(self.parse_statement())
 
-        self.eat("KEYWORD", "ENDIF")
+        self.eat(KEYWORD, KW_ENDIF)
         return If(condition=condition, body=body, else_body=else_body)
     
     def parse_output(self):
-        self.eat("KEYWORD", "OUTPUT")
+        self.eat(KEYWORD, KW_OUTPUT)
         values = []
 
-        while self.current() and self.current().type != "KEYWORD":
+        while self.token is not None and self.token.kind != KEYWORD:
             expr = self.parse_expression()
             values.append(expr)
 
             # 支持逗号分隔多个输出项
-            if self.current() and self.current().type == "COMMA":
-                self.eat("COMMA")
+            if self.at(COMMA):
+                self.eat(COMMA)
                 continue
             else:
                 break
@@ -204,210 +233,226 @@ class Parser:
 
 
     def parse_while(self):
-        self.eat("KEYWORD", "WHILE")
+        self.eat(KEYWORD, KW_WHILE)
         condition = self.parse_expression()
 
         body = []
-        while self.current() and not (
-            self.current().type == "KEYWORD" and 
-            self.current().value == "ENDWHILE"
-        ):
+        while self.token and not self.at_keyword(KW_ENDWHILE):
             body.append(self.parse_statement())
 
-        self.eat("KEYWORD", "ENDWHILE")
+        self.eat(KEYWORD, KW_ENDWHILE)
         return While(condition=condition, body=body)
     
     def parse_if(self):
-        self.eat("KEYWORD", "IF")
+        self.eat(KEYWORD, KW_IF)
         condition = self.parse_expression()
-        self.eat("KEYWORD", "THEN")
+        self.eat(KEYWORD, KW_THEN)
 
         then_body = []
-        while self.current() and not (
-            self.current().type == "KEYWORD" and self.current().value in ("ELSE", "ENDIF")
-        ):
+        while self.token and not self.at_keyword(KW_ELSE, KW_ENDIF):
             then_body.append(self.parse_statement())
 
         else_body = []
-        if self.current().type == "KEYWORD" and self.current().value == "ELSE":
-            self.eat("KEYWORD", "ELSE")
-            while self.current() and not (
-                self.current().type == "KEYWORD" and self.current().value == "ENDIF"
-            ):
+        if self.at_keyword(KW_ELSE):
+            self.eat(KEYWORD, KW_ELSE)
+            while self.token and not self.at_keyword(KW_ENDIF):
                 else_body.append(self.parse_statement())
 
-        self.eat("KEYWORD", "ENDIF")
+        self.eat(KEYWORD, KW_ENDIF)
         return If(condition=condition, then_body=then_body, else_body=else_body or None)
 
     def parse_for(self):
-        self.eat("KEYWORD", "FOR")
+        self.eat(KEYWORD, KW_FOR)
 
-        var_token = self.eat("IDENTIFIER")
+        var_token = self.eat(IDENTIFIER)
         var_name = var_token.value
 
-        assign_token = self.eat("ASSIGN")
+        assign_token = self.eat(ASSIGN)
         
         start_expr = self.parse_expression()
 
-        self.eat("KEYWORD", "TO")
+        self.eat(KEYWORD, KW_TO)
 
         end_expr = self.parse_expression()
 
+        step_expr = None
+        if self.at_keyword(KW_STEP):
+            self.eat(KEYWORD, KW_STEP)
+            # 语言里没有一元负号，STEP -1 这种写法单独支持：负号和减号一样结合
+            token = self.token
+            if token is not None and token.kind == OPERATOR and token.value == "-":
+                self.eat(OPERATOR)
+                operand = self.parse_expression(BINARY_PRECEDENCE["-"] + 1)
+                if isinstance(operand, Number):
+                    negated = Number(-operand.value)
+                else:
+                    negated = BinaryOp(Number(0), "-", operand)
+                step_expr = self.parse_expression(left=negated)
+            else:
+                step_expr = self.parse_expression()
+
         # body
         body = []
-        while self.current() and not (
-            self.current().type == "KEYWORD" and self.current().value == "NEXT"
-        ):
+        while self.token and not self.at_keyword(KW_NEXT):
 
             body.append(self.parse_statement())
 
-        self.eat("KEYWORD", "NEXT")
-        self.eat("IDENTIFIER", var_name)  # 可选：确保 NEXT 后面跟的是同一个变量名
+        self.eat(KEYWORD, KW_NEXT)
+        self.eat(IDENTIFIER, value=var_name)  # 可选：确保 NEXT 后面跟的是同一个变量名
 
-        return For(var_name, start_expr, end_expr, body)
+        return For(var_name, start_expr, end_expr, body, step_expr)
     
     def parse_repeat(self):
-        self.eat("KEYWORD", "REPEAT")
+        self.eat(KEYWORD, KW_REPEAT)
 
         body = []
-        while self.current() and not (
-            self.current().type == "KEYWORD" and self.current().value == "UNTIL"
-        ):
+        while self.token and not self.at_keyword(KW_UNTIL):
             body.append(self.parse_statement())
 
-        self.eat("KEYWORD", "UNTIL")
+        self.eat(KEYWORD, KW_UNTIL)
         condition = self.parse_expression()
 
         return RepeatUntil(body, condition)
 
     def parse_case(self):
-        self.eat("KEYWORD", "CASE OF")
+        self.eat(KEYWORD, KW_CASE_OF)
         case_expr = self.parse_expression()
 
         cases = []
         otherwise_body = None
 
-        while self.current() and not (
-            self.current().type == "KEYWORD" and self.current().value == "ENDCASE"
-        ):
-            token = self.current()
-
-            if token.type == "NUMBER":
-                # 匹配 1:
-                tok = self.eat()
-                if tok.type == "NUMBER":
-                    value = Number(tok.value)
-                elif tok.type == "STRING":
-                    value = String(tok.value.strip('"'))
-                elif tok.type == "IDENTIFIER":
-                    value = Var(tok.value)
-                else:
-                    raise SyntaxError(f"Unexpected case value: {tok}")
+        while self.token and not self.at_keyword(KW_ENDCASE):
+            token = self.token
+
+            if self.at_case_label():
+                # 匹配 1: / "a": / x: / 1 TO 10:
+                value = self.parse_case_value()
+                if self.at_keyword(KW_TO):
+                    self.eat(KEYWORD, KW_TO)
+                    value = CaseRange(value, self.parse_case_value())
 
-                self.eat("COLON")
+                self.eat(COLON)
 
                 # 读取当前 case 分支下的所有语句，直到遇到下一个 case/otherwise/endcase
                 case_body = []
-                while self.current() and not (
-                    (self.current().type == "NUMBER") or
-                    (self.current().type == "KEYWORD" and self.current().value in ("OTHERWISE", "ENDCASE"))
+                while self.token and not (
+                    self.at_case_label() or
+                    self.at_keyword(KW_OTHERWISE, KW_ENDCASE)
                 ):
                     case_body.append(self.parse_statement())
 
                 cases.append((value, case_body))
 
-            elif token.type == "KEYWORD" and token.value == "OTHERWISE":
-                self.eat("KEYWORD", "OTHERWISE")
+            elif token.kw == KW_OTHERWISE:
+                self.eat(KEYWORD, KW_OTHERWISE)
                 otherwise_body = []
-                while self.current() and not (
-                    self.current().type == "KEYWORD" and self.current().value == "ENDCASE"
-                ):
+                while self.token and not self.at_keyword(KW_ENDCASE):
                     otherwise_body.append(self.parse_statement())
 
             else:
                 raise SyntaxError(f"Unexpected token in CASE OF block: {token}")
 
-        self.eat("KEYWORD", "ENDCASE")
+        self.eat(KEYWORD, KW_ENDCASE)
         return CaseOf(expr=case_expr, cases=cases, otherwise=otherwise_body)
 
+    def at_case_label(self):
+        # 数字和字符串开头的一定是标签；标识符后面跟 : 或 TO 才是标签，否则是赋值语句
+        token = self.token
+        if token is None:
+            return False
+        if token.kind == NUMBER or token.kind == STRING:
+            return True
+        if token.kind == IDENTIFIER:
+            following = self.peek()
+            return following is not None and (following.kind == COLON or following.kw == KW_TO)
+        return False
+
+    def parse_case_value(self):
+        tok = self.eat()
+        if tok.kind == NUMBER or tok.kind == STRING:
+            return self.literal(tok)
+        if tok.kind == IDENTIFIER:
+            return Var(tok.value)
+        raise SyntaxError(f"Unexpected case value: {tok}{where(tok)}")
+
     def parse_input(self):
-        self.eat("KEYWORD", "INPUT")
-        var_token = self.eat("IDENTIFIER")
+        self.eat(KEYWORD, KW_INPUT)
+        var_token = self.eat(IDENTIFIER)
         return Input(var_token.value)
 
     def parse_type_definition(self):
-        self.eat("KEYWORD", "TYPE")
-        type_name = self.eat("IDENTIFIER").value
+        self.eat(KEYWORD, KW_TYPE)
+        type_name = self.eat(IDENTIFIER).value
 
         # 指针别名：TYPE T = ^INTEGER
-        if self.current() and self.current().type == "OPERATOR" and self.current().value == "=":
-            self.eat("OPERATOR", "=")
-            if self.current() and self.current().type == "CARET":
-                self.eat("CARET")
-                base_token = self.eat("KEYWORD")
-                if base_token.value not in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE"):
+        if self.at(OPERATOR) and self.token.value == "=":
+            self.eat(OPERATOR, value="=")
+            if self.at(CARET):
+                self.eat(CARET)
+                base_token = self.eat(KEYWORD)
+                if base_token.kw not in BASE_TYPES:
                     raise SyntaxError(f"Unknown base type for pointer alias: {base_token.value}")
                 ptr_type = PointerType(base_type=base_token.value)
                 self.user_types[type_name] = ptr_type  # 注册 alias
                 return TypeDef(name=type_name, fields=[])
             else:
-                raise SyntaxError(f"Expected '^' after '=', got {self.current()}")
+                raise SyntaxError(f"Expected '^' after '=', got {self.token}")
 
         # 类 / 结构体形式：TYPE Name ... ENDTYPE
         fields = []
         methods = []
 
-        while self.current() and not (self.current().type == "KEYWORD" and self.current().value == "ENDTYPE"):
+        while self.token and not self.at_keyword(KW_ENDTYPE):
             # 默认 PUBLIC
             access = "PUBLIC"
-            if self.current().type == "KEYWORD" and self.current().value in ("PUBLIC", "PRIVATE"):
-                access = self.eat("KEYWORD").value
+            if self.at_keyword(KW_PUBLIC, KW_PRIVATE):
+                access = self.eat(KEYWORD).value
 
             # 字段
-            if self.current().type == "KEYWORD" and self.current().value == "DECLARE":
-                self.eat("KEYWORD", "DECLARE")
-                field_name = self.eat("IDENTIFIER").value
-                self.eat("COLON")
+            if self.at_keyword(KW_DECLARE):
+                self.eat(KEYWORD, KW_DECLARE)
+                field_name = self.eat(IDENTIFIER).value
+                self.eat(COLON)
 
                 field_type = None
-                if self.current() and self.current().type == "CARET":
-                    self.eat("CARET")
-                    base_token = self.eat("KEYWORD")
-                    if base_token.value not in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE"):
+                if self.at(CARET):
+                    self.eat(CARET)
+                    base_token = self.eat(KEYWORD)
+                    if base_token.kw not in BASE_TYPES:
                         raise SyntaxError(f"Unknown base type for pointer field: {base_token.value}")
                     field_type = PointerType(base_type=base_token.value)
-                elif self.current() and self.current().type == "KEYWORD":
-                    tt = self.eat("KEYWORD").value
-                    if tt in ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN", "DATE"):
+                elif self.at(KEYWORD):
+                    tt_token = self.eat(KEYWORD)
+                    tt = tt_token.value
+                    if tt_token.kw in BASE_TYPES:
                         field_type = tt
                     elif tt in self.user_types:
                         field_type = tt
                     else:
                         raise SyntaxError(f"Unknown field type: {tt}")
-                elif self.current() and self.current().type == "IDENTIFIER":
-                    field_type = self.eat("IDENTIFIER").value
+                elif self.at(IDENTIFIER):
+                    field_type = self.eat(IDENTIFIER).value
                     if field_type not in self.user_types:
                         raise SyntaxError(f"Unknown field type: {field_type}")
                 else:
-                    raise SyntaxError(f"Expected type name for field '{field_name}', got {self.current()}")
+                    raise SyntaxError(f"Expected type name for field '{field_name}', got {self.token}")
 
                 fields.append((access, field_name, field_type))
 
             # 方法（过程 / 函数）
-            elif self.current().type == "KEYWORD" and self.current().value == "PROCEDURE":
-                proc = self.parse_procedure_definition()
-                proc.access = access
-                methods.append(proc)
-
-            elif self.current().type == "KEYWORD" and self.current().value == "FUNCTION":
-                func = self.parse_function_definition()
-                func.access = access
-                methods.append(func)
+            elif self.at_keyword(KW_PROCEDURE, KW_FUNCTION):
+                line = self.token.line
+                if self.at_keyword(KW_PROCEDURE):
+                    method = self.parse_procedure_definition(access)
+                else:
+                    method = self.parse_function_definition(access)
+                annotate(method, line=line)
+                methods.append(method)
 
             else:
-                raise SyntaxError(f"Unexpected token in TYPE {type_name}: {self.current()}")
+                raise SyntaxError(f"Unexpected token in TYPE {type_name}: {self.token}")
 
-        self.eat("KEYWORD", "ENDTYPE")
+        self.eat(KEYWORD, KW_ENDTYPE)
 
         # 始终注册为 ClassDef
         class_def = ClassDef(name=type_name, fields=fields, methods=methods)
@@ -419,12 +464,12 @@ class Parser:
 
     def parse_possible_field_access(self):
         # 先吃一个 IDENTIFIER（基础变量名）
-        base = self.eat("IDENTIFIER").value
+        base = self.eat(IDENTIFIER).value
         target = Var(base)
         # 支持 s.name 形式
-        while self.current() and self.current().type == "DOT":
-            self.eat("DOT")
-            field = self.eat("IDENTIFIER").value
+        while self.at(DOT):
+            self.eat(DOT)
+            field = self.eat(IDENTIFIER).value
             target = FieldAccess(var_name=base, field_name=field)
             # 如果要支持更深层嵌套可以 update base/target accordingly
         return target
@@ -435,101 +480,101 @@ class Parser:
         #     self.eat("KEYWORD", "BYREF")
         #     byref = True
 
-        name = self.eat("IDENTIFIER").value
+        name = self.eat(IDENTIFIER).value
 
-        if not (self.current() and self.current().type == "COLON"):
-            raise SyntaxError(f"Expected ':' after parameter name '{name}', got {self.current()}")
-        self.eat("COLON")
+        if not self.at(COLON):
+            raise SyntaxError(f"Expected ':' after parameter name '{name}', got {self.token}")
+        self.eat(COLON)
 
-        if self.current() and self.current().type in ("KEYWORD", "IDENTIFIER"):
-            type_name = self.eat(self.current().type).value
+        if self.at(KEYWORD) or self.at(IDENTIFIER):
+            type_name = self.eat().value
         else:
-            raise SyntaxError(f"Expected type name after colon for parameter '{name}', got {self.current()}")
+            raise SyntaxError(f"Expected type name after colon for parameter '{name}', got {self.token}")
 
         return Param(name=name, type=type_name, byref=byref)
 
 
     def parse_param_list(self):
         params = []
-        if self.current() and self.current().type == "LPAREN":
-            self.eat("LPAREN")
+        if self.at(LPAREN):
+            self.eat(LPAREN)
         else:
             return params  # 没有括号就认为没有参数
 
-        while self.current() and self.current().type != "RPAREN":
+        while self.token is not None and self.token.kind != RPAREN:
             params.append(self.parse_param())
-            if self.current() and self.current().type == "COMMA":
-                self.eat("COMMA")
+            if self.at(COMMA):
+                self.eat(COMMA)
             else:
                 break
 
-        if self.current() and self.current().type == "RPAREN":
-            self.eat("RPAREN")
+        if self.at(RPAREN):
+            self.eat(RPAREN)
         else:
-            raise SyntaxError(f"Expected ')' to close parameter list, got {self.current()}")
+            raise SyntaxError(f"Expected ')' to close parameter list, got {self.token}")
 
         return params
 
 
-    def parse_procedure_definition(self):
-        self.eat("KEYWORD", "PROCEDURE")
-        name = self.eat("IDENTIFIER").value
+    def parse_procedure_definition(self, access="PUBLIC"):
+        self.eat(KEYWORD, KW_PROCEDURE)
+        name = self.eat(IDENTIFIER).value
 
         # 解析可选的参数列表
         params = []
-        if self.current() and self.current().type == "LPAREN":
+        if self.at(LPAREN):
             params = self.parse_param_list()
 
         body = []
-        while not (self.current() and self.current().type == "KEYWORD" and self.current().value == "ENDPROCEDURE"):
+        while not self.at_keyword(KW_ENDPROCEDURE):
             stmt = self.parse_statement()
             if stmt:
                 body.append(stmt)
-        self.eat("KEYWORD", "ENDPROCEDURE")
-        return ProcedureDef(name=name, params=params, body=body)
+        self.eat(KEYWORD, KW_ENDPROCEDURE)
+        return ProcedureDef(name=name, params=params, body=body, access=access)
 
 
-    def parse_function_definition(self):
-        self.eat("KEYWORD", "FUNCTION")
-        name = self.eat("IDENTIFIER").value
+    def parse_function_definition(self, access="PUBLIC"):
+        self.eat(KEYWORD, KW_FUNCTION)
+        name = self.eat(IDENTIFIER).value
 
         params = []
-        if self.current() and self.current().type == "LPAREN":
+        if self.at(LPAREN):
             params = self.parse_param_list()
 
-        self.eat("KEYWORD", "RETURNS")
-        if self.current() and self.current().type in ("KEYWORD", "IDENTIFIER"):
-            return_type = self.eat(self.current().type).value
+        self.eat(KEYWORD, KW_RETURNS)
+        if self.at(KEYWORD) or self.at(IDENTIFIER):
+            return_type = self.eat().value
         else:
-            raise SyntaxError(f"Expected return type, got {self.current()}")
+            raise SyntaxError(f"Expected return type, got {self.token}")
 
         body = []
-        while not (self.current() and self.current().type == "KEYWORD" and self.current().value == "ENDFUNCTION"):
+        while not self.at_keyword(KW_ENDFUNCTION):
             stmt = self.parse_statement()
             if stmt:
                 body.append(stmt)
-        self.eat("KEYWORD", "ENDFUNCTION")
-        return FunctionDef(name=name, params=params, return_type=return_type, body=body)
+        self.eat(KEYWORD, KW_ENDFUNCTION)
+        return FunctionDef(name=name, params=params, return_type=return_type, body=body, access=access)
 
 
     def parse_call(self):
         is_statement = False
-        if self.current().type == "KEYWORD" and self.current().value == "CALL":
-            self.eat("KEYWORD", "CALL")
+        if self.at_keyword(KW_CALL):
+            self.eat(KEYWORD, KW_CALL)
             is_statement = True
 
-        name = self.eat("IDENTIFIER").value
+        name = self.eat(IDENTIFIER).value
 
         args = []
-        if self.current() and self.current().type == "LPAREN":
-            self.eat("LPAREN")
-            while self.current() and self.current().type != "RPAREN":
+        if self.at(LPAREN):
+            self.eat(LPAREN)
+            while self.token is not None and self.token.kind != RPAREN:
                 args.append(self.parse_expression())
-                if self.current() and self.current().type == "COMMA":
-                    self.eat("COMMA")
+                if self.at(COMMA):
+                    self.eat(COMMA)
                 else:
                     break
-            self.eat("RPAREN")
+            self.eat(RPAREN)
 
         call_node = Call(name=name, args=args)
         if is_statement:
@@ -538,135 +583,139 @@ class Parser:
 
 
     def parse_return(self):
-        self.eat("KEYWORD", "RETURN")
-        if self.current() and self.current().type not in ("KEYWORD",):
+        self.eat(KEYWORD, KW_RETURN)
+        if self.token and self.token.kind != KEYWORD:
             expr = self.parse_expression()
         else:
             expr = None
         return Return(expr=expr)
 
     
-    def parse_expression(self):
+    def parse_expression(self, min_prec=1, left=None):
+        # 优先级爬升：同一优先级的运算在循环里往左结合，
+        # 递归深度只跟优先级层数有关，不跟运算链的长度有关。
+        # left 是调用方已经解析好的最左操作数
+        if left is None:
+            left = self.parse_unary()
+        while True:
+            op = self.peek_binary_operator()
+            if op is None:
+                return left
+            prec = BINARY_PRECEDENCE[op]
+            if prec < min_prec:
+                return left
+            self.advance()
+            right = self.parse_expression(prec + 1)
+            left = BinaryOp(left=left, operator=op, right=right)
+
+    def peek_binary_operator(self):
+        # 当前 token 是二元运算符就返回运算符，否则返回 None（不消耗 token）
+        token = self.token
+        if token is None:
+            return None
+        kind = token.kind
+        if kind == OPERATOR:
+            return token.value
+        if kind == LOGICOP:
+            return token.value if token.kw != KW_NOT else None
+        return OPERATOR_TOKENS.get(kind)
+
+    def parse_unary(self):
+        token = self.token
+        if token is None:
+            raise SyntaxError("Unexpected end of expression")
+
+        # NOT 优先级最高，只作用于紧跟的一个操作数
+        if token.kw == KW_NOT:
+            self.eat(LOGICOP)
+            return UnaryOp(operator="NOT", operand=self.parse_unary())
+
         # 前缀取地址 ^x
-        if self.current() and self.current().type == "CARET":
-            self.eat("CARET")
-            target = self.parse_expression()
-            return AddressOf(target=target)
+        if token.kind == CARET:
+            self.eat(CARET)
+            return AddressOf(target=self.parse_unary())
+
+        return self.parse_primary()
 
+    def parse_primary(self):
+        token = self.token
 
-        # 先处理左侧：变量、字段访问、或者函数调用
-        if self.current() and self.current().type == "IDENTIFIER":
+        # 变量、字段访问、函数调用、数组访问
+        if token.kind == IDENTIFIER:
             node = self.parse_possible_field_access()
 
             # 可能的函数调用
-            if isinstance(node, Var) and self.current() and self.current().type == "LPAREN":
+            if isinstance(node, Var) and self.at(LPAREN):
                 name = node.name
                 args = []
-                self.eat("LPAREN")
-                while self.current() and self.current().type != "RPAREN":
+                self.eat(LPAREN)
+                while self.token is not None and self.token.kind != RPAREN:
                     args.append(self.parse_expression())
-                    if self.current() and self.current().type == "COMMA":
-                        self.eat("COMMA")
+                    if self.at(COMMA):
+                        self.eat(COMMA)
                     else:
                         break
-                self.eat("RPAREN")
+                self.eat(RPAREN)
                 node = Call(name=name, args=args)
 
             # 数组访问
-            if isinstance(node, Var) and self.current() and self.current().type == "LBRACKET":
+            if isinstance(node, Var) and self.at(LBRACKET):
                 name = node.name
-                self.eat("LBRACKET")
+                self.eat(LBRACKET)
                 indices = [self.parse_expression()]
-                while self.current() and self.current().type == "COMMA":
-                    self.eat("COMMA")
+                while self.at(COMMA):
+                    self.eat(COMMA)
                     indices.append(self.parse_expression())
-                self.eat("RBRACKET")
+                self.eat(RBRACKET)
                 node = ArrayAccess(name=name, indices=indices)
 
             # 后缀解引用 node^
-            if self.current() and self.current().type == "CARET":
-                self.eat("CARET")
+            if self.at(CARET):
+                self.eat(CARET)
                 node = Dereference(pointer=node)
 
-            # 一元与二元操作
-            OPERATOR_TOKS = ("OPERATOR", "GTE", "LTE", "NEQ", "STRCOMB", "LOGICOP")
-            if self.current() and self.current().type in OPERATOR_TOKS:
-                tok = self.eat(self.current().type)
-                if tok.type == "NEQ":
-                    op = "<>"
-                elif tok.type == "GTE":
-                    op = ">="
-                elif tok.type == "LTE":
-                    op = "<="
-                elif tok.type == "STRCOMB":
-                    op = "&"
-                elif tok.value == "AND":
-                    op = "AND"
-                elif tok.value == "OR":
-                    op = "OR"
-                else:
-                    op = tok.value
-                right = self.parse_expression()
-                return BinaryOp(left=node, operator=op, right=right)
-
             return node
-        else:
-            UnaryOpToks = ("NOT")
-            if self.current() and self.current().type == "LOGICOP" and self.current().value in UnaryOpToks:
-                tok = self.eat(self.current().type)
-                op = tok.value
-                right = self.parse_expression()
-                return UnaryOp(operator=op, operand=right)
-
 
-        # 不是标识符的左操作数：数字/字符串/括号
-        token = self.current()
-        if not token:
-            raise SyntaxError("Unexpected end of expression")
-
-        if token.type == "NUMBER":
-            self.eat("NUMBER")
-            left = Number(token.value)
-            return left
-        elif token.type == "STRING":
-            self.eat("STRING")
-            left = String(token.value.strip('"'))
-            return left
-        elif token.type == "LPAREN":
-            self.eat("LPAREN")
-            left = self.parse_expression()
-            self.eat("RPAREN")
+        # 数字/字符串/括号
+        if token.kind == NUMBER or token.kind == STRING:
+            self.advance()
+            return self.literal(token)
+        elif token.kind == LPAREN:
+            self.eat(LPAREN)
+            node = self.parse_expression()
+            self.eat(RPAREN)
+            return node
         else:
             raise SyntaxError(f"Invalid left operand: {token}")
 
 
     def parse_lvalue(self):
-        if self.current().type != "IDENTIFIER":
-            raise SyntaxError(f"Expected lvalue identifier, got {self.current()}")
-        name = self.eat("IDENTIFIER").value
+        if not self.at(IDENTIFIER):
+            raise SyntaxError(f"Expected lvalue identifier, got {self.token}")
+        name = self.eat(IDENTIFIER).value
 
         # 基础 node 是变量
         node = Var(name)
 
         # 字段访问：s.name
-        if self.current() and self.current().type == "DOT":
-            self.eat("DOT")
-            field = self.eat("IDENTIFIER").value
+        if self.at(DOT):
+            self.eat(DOT)
+            field = self.eat(IDENTIFIER).value
             node = FieldAccess(node.name, field)
 
         # 数组访问：A[i]
-        if self.current() and self.current().type == "LBRACKET":
-            self.eat("LBRACKET")
+        if self.at(LBRACKET):
+            self.eat(LBRACKET)
             indices = [self.parse_expression()]
-            while self.current() and self.current().type == "COMMA":
-                self.eat("COMMA")
+            while self.at(COMMA):
+                self.eat(COMMA)
                 indices.append(self.parse_expression())
-            self.eat("RBRACKET")
+            self.eat(RBRACKET)
             node = ArrayAccess(name=node.name, indices=indices)
 
         # 指针解引用：p^ / p^^
-        while self.current() and self.current().type == "CARET":
-            self.eat("CARET")
+        while self.at(CARET):
+            self.eat(CARET)
             node = Dereference(pointer=node)
 
         return node
@@ -0,0 +1,64 @@
+# 数组存储：旧的 {tuple: value} 字典 vs PseudoArray 的连续存储
+# 用法: python -m benchmarks.bench_arrays [N]
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.arrays import PseudoArray
+
+code = """
+DECLARE Grid : ARRAY[1:{n}, 1:{n}] OF INTEGER
+DECLARE r : INTEGER
+DECLARE c : INTEGER
+FOR r <- 1 TO {n}
+    FOR c <- 1 TO {n}
+        Grid[r, c] <- r * c
+    NEXT c
+NEXT r
+OUTPUT Grid[{n}, {n}]
+"""
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    count = n * n
+
+    def old_dict():
+        # 旧实现：每个赋过值的元素一个 tuple key
+        return {(r, c): r * c for r in range(1, n + 1) for c in range(1, n + 1)}
+
+    def dense():
+        array = PseudoArray("Grid", [1, 1], [n, n], "INTEGER", 0)
+        for r in range(1, n + 1):
+            for c in range(1, n + 1):
+                array.set2(r, c, r * c)
+        return array
+
+    _, old_bytes = measure(old_dict)
+    _, new_bytes = measure(dense)
+    print(f"{n}x{n} INTEGER grid memory")
+    print(f"{'tuple-keyed dict':<30} {old_bytes / count:8.1f} bytes/element")
+    print(f"{'PseudoArray (array.array)':<30} {new_bytes / count:8.1f} bytes/element")
+
+    ast = Parser(tokenize(code.format(n=n))).parse()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Interpreter().eval(ast)
+    print(f"{'fill grid (tree engine)':<30} {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
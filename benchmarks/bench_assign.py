@@ -0,0 +1,78 @@
+# 赋值吞吐量：右边类型在编译期就确定的赋值（exact）跳过转换，对照组每次赋值都按声明类型转换
+# 用法: python -m benchmarks.bench_assign [N]
+import contextlib
+import io
+import sys
+import time
+
+from app.evaluator.ast import Assign, annotate, walk
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.resolver import resolve_program
+from app.evaluator.tokenizer import tokenize
+from app.evaluator.transpiler import PythonInterpreter
+from app.evaluator.vm import VM
+from app.parser.parser import Parser
+
+code = """
+DECLARE A : ARRAY[1:{n}] OF INTEGER
+DECLARE R : ARRAY[1:{n}] OF REAL
+DECLARE i : INTEGER
+DECLARE n : INTEGER
+DECLARE x : INTEGER
+DECLARE y : REAL
+DECLARE s : STRING
+DECLARE flag : BOOLEAN
+DECLARE c : CHAR
+n <- {n}
+x <- 0
+y <- 0.0
+FOR i <- 1 TO n
+    x <- x + i * 2
+    y <- y + i / 2
+    s <- "item" & "x"
+    flag <- x > i AND y > 1.5
+    c <- "c"
+    A[i] <- x - i
+    R[i] <- y * 0.5
+NEXT i
+OUTPUT x, y, s, flag, c, A[n], R[n]
+"""
+
+
+def parse(n, exact):
+    ast = Parser(tokenize(code.format(n=n))).parse()
+    resolve_program(ast)
+    if not exact:
+        # 对照组：去掉 exact 标记，每次赋值都转换
+        for node in walk(ast):
+            if isinstance(node, Assign):
+                annotate(node, exact=False)
+    return ast
+
+
+def run(engine, ast):
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        engine().eval(ast)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{n} iterations, 7 assignments each")
+    outputs = set()
+    for label, engine in (("tree", Interpreter), ("closure", ClosureInterpreter),
+                          ("vm", VM), ("python", PythonInterpreter)):
+        times = []
+        for exact in (False, True):
+            elapsed, output = min(run(engine, parse(n, exact)) for _ in range(3))
+            outputs.add(output)
+            times.append(elapsed)
+        print(f"{label:<8} convert every store {times[0] * 1000:8.1f} ms   exact stores {times[1] * 1000:8.1f} ms")
+    assert len(outputs) == 1, outputs
+
+
+if __name__ == "__main__":
+    main()
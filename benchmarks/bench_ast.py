@@ -0,0 +1,43 @@
+# python -m benchmarks.bench_ast [programs] [blocks]
+# 常驻内存：同时保留很多份解析好的程序（比如判题服务缓存的提交），AST 一共占多少
+import sys
+import tracemalloc
+
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from benchmarks.bench_parser import generate
+
+
+def count_nodes(program):
+    seen = set()
+    todo = [program]
+    while todo:
+        item = todo.pop()
+        if isinstance(item, (list, tuple)):
+            todo.extend(item)
+        elif hasattr(item, "__dataclass_fields__") and id(item) not in seen:
+            seen.add(id(item))
+            todo.extend(getattr(item, name) for name in item.__dataclass_fields__)
+    return len(seen)
+
+
+def main():
+    programs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    blocks = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    sources = [generate(blocks) + f"OUTPUT {i}\n" for i in range(programs)]
+    token_lists = [tokenize(source) for source in sources]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [Parser(tokens).parse() for tokens in token_lists]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    nodes = sum(count_nodes(program) for program in kept)
+    size = after - before
+    print(f"{programs} programs x {blocks} blocks: {nodes} distinct nodes")
+    print(f"{'resident AST memory':<40} {size / 1e6:8.2f} MB ({size / nodes:.0f} bytes/node)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# python -m benchmarks.bench_astcodec [blocks]
+# AST 二进制格式 vs pickle：大小、编码、解码速度
+import pickle
+import sys
+import time
+
+from app.evaluator import astcodec
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from benchmarks.bench_parser import generate
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def compare(label, program):
+    print(label)
+    formats = [
+        ("pickle", lambda p: pickle.dumps(p, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ("astcodec", astcodec.dumps, astcodec.loads),
+    ]
+    for name, dumps, loads in formats:
+        try:
+            data = dumps(program)
+        except RecursionError:
+            print(f"  {name:<10} RecursionError")
+            continue
+        encode = best(lambda: dumps(program))
+        decode = best(lambda: loads(data))
+        print(f"  {name:<10} {len(data):>10} bytes  encode {encode * 1000:8.2f} ms  decode {decode * 1000:8.2f} ms")
+
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate(blocks)
+    compare(f"{blocks} blocks, {source.count(chr(10))} lines", Parser(tokenize(source)).parse())
+    # 很长的运算链：pickle 要递归，格式本身是后序的操作码流，不受深度影响
+    chain = "x <- " + " + ".join(["1"] * 20000) + "\n"
+    compare("20000-term expression", Parser(tokenize(chain)).parse())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# 内建函数调用：调用点在加载时解析到实现函数，对照组每次调用都把名字大写化再逐个比较
+# 用法: python -m benchmarks.bench_builtins [N]
+import contextlib
+import io
+import sys
+import time
+
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.library import LIBRARY
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+
+code = """
+DECLARE i : INTEGER
+DECLARE n : INTEGER
+DECLARE s : STRING
+DECLARE t : STRING
+DECLARE total : INTEGER
+n <- {n}
+s <- "The Quick Brown Fox"
+total <- 0
+FOR i <- 1 TO n
+    t <- TO_UPPER(LEFT(s, MOD(i, 19) + 1))
+    total <- total + LENGTH(t) + ASC(MID(s, MOD(i, 19) + 1, 1))
+    IF IS_NUM(NUM_TO_STR(i)) THEN
+        total <- total + DIV(i, 7)
+    ENDIF
+NEXT i
+OUTPUT total, t
+"""
+
+NAMES = tuple(LIBRARY)
+
+
+def legacy_call(interpreter, name, args):
+    # 原来的做法：按名字逐个比较
+    for candidate in NAMES:
+        if name == candidate:
+            return LIBRARY[candidate].fn(*args) if not LIBRARY[candidate].stateful \
+                else LIBRARY[candidate].fn(interpreter, *args)
+    raise Exception(f"Unknown builtin {name}")
+
+
+class LegacyInterpreter(Interpreter):
+    def _eval_call(self, node):
+        name = node.name.upper()
+        if name in NAMES:
+            return legacy_call(self, name, [self.eval(arg) for arg in node.args])
+        return self._execute_call(node, expect_return=True)
+
+
+class LegacyClosureInterpreter(ClosureInterpreter):
+    def _compile_call(self, node):
+        if node.name.upper() not in NAMES:
+            return super()._compile_call(node)
+        args = tuple(self.compile(arg) for arg in node.args)
+        return lambda: legacy_call(self, node.name.upper(), [fn() for fn in args])
+
+
+def run(engine, n):
+    ast = Parser(tokenize(code.format(n=n))).parse()
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        engine().eval(ast)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"{n} iterations, 9 built-in calls each")
+    outputs = set()
+    for label, legacy, engine in (("tree", LegacyInterpreter, Interpreter),
+                                  ("closure", LegacyClosureInterpreter, ClosureInterpreter)):
+        times = []
+        for cls in (legacy, engine):
+            elapsed, output = min(run(cls, n) for _ in range(3))
+            outputs.add(output)
+            times.append(elapsed)
+        print(f"{label:<8} compare names {times[0] * 1000:8.1f} ms   resolved call sites {times[1] * 1000:8.1f} ms")
+    assert len(outputs) == 1, outputs
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# python -m benchmarks.bench_cache [blocks]
+# 同一个程序反复加载：每次 tokenize + parse vs 从 AST 缓存读回
+import os
+import sys
+import tempfile
+import time
+
+from app.evaluator.tokenizer import tokenize_iter
+from app.parser.cache import ASTCache
+from app.parser.parser import Parser
+from benchmarks.bench_parser import generate
+
+
+def bench(label, fn, repeat=5):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:8.2f} ms")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "program.pseudo")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(generate(blocks))
+        cache = ASTCache(os.path.join(tmp, "cache"))
+
+        def parse():
+            with open(filename, encoding="utf-8") as f:
+                Parser(tokenize_iter(f)).parse()
+
+        print(f"{blocks} blocks, {os.path.getsize(filename)} bytes")
+        parsed = bench("tokenize + parse", parse)
+        cache.load(filename)  # 先写一次缓存
+        size = sum(entry.stat().st_size for entry in os.scandir(cache.directory))
+        cached = bench("cache hit", lambda: cache.load(filename))
+        print(f"{'':<40} {parsed / cached:8.2f}x faster, {size} bytes on disk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# 调用密集的递归程序：阶乘、二分查找、Ackermann
+# 用法: python -m benchmarks.bench_calls
+import contextlib
+import io
+import time
+
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.vm import VM
+
+code = """
+FUNCTION Fact(n : INTEGER) RETURNS INTEGER
+   IF n = 0 THEN
+      RETURN 1
+   ENDIF
+   RETURN n * Fact(n - 1)
+ENDFUNCTION
+
+FUNCTION Ack(m : INTEGER, n : INTEGER) RETURNS INTEGER
+   IF m = 0 THEN
+      RETURN n + 1
+   ENDIF
+   IF n = 0 THEN
+      RETURN Ack(m - 1, 1)
+   ENDIF
+   RETURN Ack(m - 1, Ack(m, n - 1))
+ENDFUNCTION
+
+DECLARE Data : ARRAY[1:1000] OF INTEGER
+DECLARE i : INTEGER
+DECLARE found : INTEGER
+
+FUNCTION Search(target : INTEGER, lo : INTEGER, hi : INTEGER) RETURNS INTEGER
+   DECLARE mid : INTEGER
+   IF lo > hi THEN
+      RETURN 0
+   ENDIF
+   mid <- lo + hi
+   mid <- INT(mid / 2)
+   IF Data[mid] = target THEN
+      RETURN mid
+   ENDIF
+   IF Data[mid] < target THEN
+      RETURN Search(target, mid + 1, hi)
+   ENDIF
+   RETURN Search(target, lo, mid - 1)
+ENDFUNCTION
+
+FOR i <- 1 TO 1000
+   Data[i] <- i * 3
+NEXT i
+found <- 0
+FOR i <- 1 TO 1000
+   IF Search(i * 3, 1, 1000) = i THEN
+      found <- found + 1
+   ENDIF
+NEXT i
+OUTPUT found
+OUTPUT Fact(20)
+OUTPUT Ack(2, 30)
+"""
+
+
+def bench(label, fn, repeat=3):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:8.2f} ms")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    ast = Parser(tokenize(code)).parse()
+    for engine in (Interpreter, ClosureInterpreter, VM):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                engine().eval(ast)
+        bench(engine.__name__, run)
+
+
+if __name__ == "__main__":
+    main()
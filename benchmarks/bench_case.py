@@ -0,0 +1,56 @@
+# CASE OF：常量标签的跳转表 vs 逐个比较
+# 用法: python -m benchmarks.bench_case [循环次数]
+import contextlib
+import io
+import sys
+import time
+
+from app.evaluator.ast import CaseOf, annotate
+from app.evaluator.loops import walk
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.vm import VM
+
+BRANCHES = 50
+
+
+def menu_program(n):
+    # 菜单式程序：一个 50 个分支的 CASE 放在长循环里，选项均匀分布
+    lines = ["DECLARE i : INTEGER", "DECLARE total : INTEGER", "total <- 0",
+             f"FOR i <- 1 TO {n}", f"    CASE OF i - INT(i / {BRANCHES + 10}) * {BRANCHES + 10}"]
+    for k in range(BRANCHES - 5):
+        lines.append(f"        {k}: total <- total + {k}")
+    lines.append(f"        {BRANCHES - 5} TO {BRANCHES}: total <- total + 1")
+    lines += ["    OTHERWISE", "        total <- total - 1", "    ENDCASE", "NEXT i", "OUTPUT total"]
+    return "\n".join(lines) + "\n"
+
+
+def run(engine, code, linear):
+    ast = Parser(tokenize(code)).parse()
+    if linear:
+        # 预先标成“不能建表”，执行时走逐个比较
+        for node in walk(ast):
+            if isinstance(node, CaseOf):
+                annotate(node, table=False)
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        engine().eval(ast)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    code = menu_program(n)
+    print(f"CASE OF with {BRANCHES} branches, {n} executions")
+    for name, engine in (("tree", Interpreter), ("closure", ClosureInterpreter), ("vm", VM)):
+        linear, linear_out = min(run(engine, code, True) for _ in range(3))
+        table, table_out = min(run(engine, code, False) for _ in range(3))
+        assert linear_out == table_out
+        print(f"{name:<8} linear {linear * 1000:8.1f} ms   table {table * 1000:8.1f} ms   {linear / table:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# 逐个字符拼长字符串：& 的结果超过 ropes.LEAF 个字符后先不拼（Rope），
+# 对照组把 LEAF 调到无穷大，每次 & 都复制整串（原来的 str(left) + str(right)）
+# 用法: python -m benchmarks.bench_concat [N]
+import contextlib
+import io
+import sys
+import time
+
+from app.evaluator import ropes
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.tokenizer import tokenize
+from app.evaluator.transpiler import PythonInterpreter
+from app.evaluator.vm import VM
+from app.parser.parser import Parser
+
+code = """
+DECLARE s : STRING
+DECLARE r : STRING
+DECLARE i : INTEGER
+s <- ""
+FOR i <- 1 TO {n}
+    s <- s & CHR(97 + MOD(i, 26))
+NEXT i
+r <- ""
+FOR i <- 1 TO {n}
+    r <- MID(s, i, 1) & r
+NEXT i
+OUTPUT LENGTH(s), LENGTH(r), LEFT(r, 5)
+"""
+
+LEAF = ropes.LEAF
+
+
+def run(engine, ast, leaf):
+    ropes.LEAF = leaf
+    out = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out):
+            engine().eval(ast)
+    finally:
+        ropes.LEAF = LEAF
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    ast = Parser(tokenize(code.format(n=n))).parse()
+    print(f"append then prepend {n} characters")
+    outputs = set()
+    for label, engine in (("tree", Interpreter), ("closure", ClosureInterpreter),
+                          ("vm", VM), ("python", PythonInterpreter)):
+        times = []
+        for leaf in (sys.maxsize, LEAF):
+            elapsed, output = run(engine, ast, leaf)
+            outputs.add(output)
+            times.append(elapsed)
+        print(f"{label:<8} copy every time {times[0] * 1000:9.1f} ms   rope {times[1] * 1000:9.1f} ms")
+    assert len(outputs) == 1, outputs
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# 对比 Interpreter.eval 旧的 isinstance 链和现在的查表分派
+# 用法: python -m benchmarks.bench_dispatch
+import contextlib
+import io
+import time
+
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.ast import *
+
+# 旧 eval 里 isinstance 的检查顺序
+LEGACY_ORDER = [
+    Program, ArrayAccess, Declare, Assign, Var, Number, Output, BinaryOp,
+    UnaryOp, While, If, String, For, RepeatUntil, CaseOf, Input, FieldAccess,
+    TypeDef, ProcedureDef, FunctionDef, CallStmt, Call, Return, AddressOf,
+    Dereference, ClassDef,
+]
+
+code = """
+DECLARE i : INTEGER
+DECLARE total : INTEGER
+total <- 0
+i <- 0
+WHILE i < 20000
+    total <- total + i
+    i <- i + 1
+ENDWHILE
+OUTPUT total
+"""
+
+
+def ladder_dispatch(node):
+    for klass in LEGACY_ORDER:
+        if isinstance(node, klass):
+            return klass
+    raise Exception(f"Unknown node type: {type(node)}")
+
+
+def collect_nodes(node, out):
+    out.extend(walk(node))
+    return out
+
+
+def bench(label, fn, repeat=5):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:8.2f} ms")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    ast = Parser(tokenize(code)).parse()
+    nodes = collect_nodes(ast, []) * 2000
+    interp = Interpreter()
+    for n in nodes[:100]:
+        interp._handlers.get(type(n)) or interp._resolve_handler(type(n))
+    handlers = interp._handlers
+
+    print(f"per-node dispatch over {len(nodes)} nodes")
+    old = bench("isinstance ladder", lambda: [ladder_dispatch(n) for n in nodes])
+    new = bench("dispatch table", lambda: [handlers[n.__class__] for n in nodes])
+    print(f"{'per node (ladder / table)':<40} {old / len(nodes) * 1e9:6.1f} ns / {new / len(nodes) * 1e9:6.1f} ns")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            Interpreter().eval(ast)
+
+    bench("WHILE loop, 20000 iterations", run)
+
+
+if __name__ == "__main__":
+    main()
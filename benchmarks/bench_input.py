@@ -0,0 +1,80 @@
+# 同一个程序跑很多组输入：对照组替换 builtins.input、redirect_stdout 截获输出（提示也混在里面），
+# 新做法每组输入一个 LinesFeed，输出写进 BufferSink，不显示提示
+# 用法: python -m benchmarks.bench_input [组数]
+import builtins
+import contextlib
+import io
+import sys
+import time
+
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.feeds import LinesFeed
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.sinks import BufferSink
+from app.evaluator.tokenizer import tokenize
+from app.evaluator.vm import VM
+from app.parser.parser import Parser
+
+code = """
+DECLARE n : INTEGER
+DECLARE x : INTEGER
+DECLARE best : INTEGER
+INPUT n
+best <- 0
+FOR i <- 1 TO n
+    INPUT x
+    IF x > best THEN
+        best <- x
+    ENDIF
+NEXT i
+OUTPUT best
+"""
+
+
+def vectors(count, size=200):
+    return [[str(size)] + [str((k * 7919 + i * 104729) % 100_000) for i in range(size)] for k in range(count)]
+
+
+def patched(engine, ast, data):
+    results = []
+    saved = builtins.input
+    try:
+        for lines in data:
+            it = iter(lines)
+            builtins.input = lambda prompt="": next(it)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                engine().eval(ast)
+            # 去掉混在输出里的提示
+            results.append(out.getvalue().rsplit(": ", 1)[-1])
+    finally:
+        builtins.input = saved
+    return results
+
+
+def fed(engine, ast, data):
+    results = []
+    for lines in data:
+        sink = BufferSink()
+        engine(output=sink, input=LinesFeed(lines)).eval(ast)
+        results.append(sink.getvalue())
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    ast = Parser(tokenize(code)).parse()
+    data = vectors(count)
+    print(f"{count} input vectors, 201 lines each")
+    for label, engine in (("tree", Interpreter), ("closure", ClosureInterpreter), ("vm", VM)):
+        times, results = [], []
+        for fn in (patched, fed):
+            start = time.perf_counter()
+            results.append(fn(engine, ast, data))
+            times.append(time.perf_counter() - start)
+        assert results[0] == results[1]
+        print(f"{label:<8} patched input() {times[0] * 1000:8.1f} ms   LinesFeed {times[1] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
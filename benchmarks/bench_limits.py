@@ -0,0 +1,114 @@
+# 执行预算的开销：对照组是完全没有计数代码的循环 / 调用（树遍历用原来的循环写法，
+# vm 把 LOOP 换回普通跳转），和默认的“不设上限”、设了很大上限（每轮都计数）比较
+# 用法: python -m benchmarks.bench_limits [N]
+import sys
+import time
+
+from app.evaluator.bytecode import JUMP, JUMP_IF_FALSE, LOOP, LOOP_IF_FALSE, compile_program
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.interpreter import RETURN, Interpreter, for_range
+from app.evaluator.sinks import BufferSink
+from app.evaluator.tokenizer import tokenize
+from app.evaluator.transpiler import PythonInterpreter
+from app.evaluator.vm import VM
+from app.parser.parser import Parser
+
+code = """
+DECLARE i : INTEGER
+DECLARE j : INTEGER
+DECLARE total : INTEGER
+FUNCTION Step(x : INTEGER) RETURNS INTEGER
+    RETURN x + 1
+ENDFUNCTION
+total <- 0
+FOR i <- 1 TO {n}
+    j <- 0
+    WHILE j < 5
+        j <- Step(j)
+    ENDWHILE
+    REPEAT
+        total <- total + j
+        j <- j - 1
+    UNTIL j = 0
+NEXT i
+OUTPUT total
+"""
+
+HUGE = 10 ** 12
+
+
+class BareInterpreter(Interpreter):
+    # 没有计数代码的循环（加执行预算之前的写法）
+    def _eval_while(self, node):
+        while self.eval(node.condition):
+            for stmt in node.body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+
+    def _eval_for(self, node):
+        start = self.eval(node.start)
+        end = self.eval(node.end)
+        step = 1 if node.step is None else self.eval(node.step)
+        store = self._store
+        for i in for_range(start, end, step):
+            store(node, i)
+            for stmt in node.body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+
+    def _eval_repeat_until(self, node):
+        while True:
+            for stmt in node.body:
+                if self.eval(stmt) is RETURN:
+                    return RETURN
+            if self.eval(node.condition):
+                break
+
+
+def bare_code(code):
+    # LOOP / LOOP_IF_FALSE 换回普通跳转，过程/函数里的也换
+    for k, (op, arg) in enumerate(code.instructions):
+        if op == LOOP:
+            code.instructions[k] = (JUMP, arg[0])
+        elif op == LOOP_IF_FALSE:
+            code.instructions[k] = (JUMP_IF_FALSE, arg[0])
+        elif isinstance(arg, tuple) and len(arg) == 3 and hasattr(arg[2], "instructions"):
+            bare_code(arg[2])
+    return code
+
+
+class BareVM(VM):
+    def eval(self, node):
+        return self.run(bare_code(compile_program(node)))
+
+
+def run(make, ast):
+    sink = BufferSink()
+    start = time.perf_counter()
+    make(sink).eval(ast)
+    return time.perf_counter() - start, sink.getvalue()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    ast = Parser(tokenize(code.format(n=n))).parse()
+    print(f"{n} outer iterations, {n * 15} steps")
+    outputs = set()
+    for label, bare, engine in (("tree", BareInterpreter, Interpreter), ("closure", ClosureInterpreter, ClosureInterpreter),
+                                ("vm", BareVM, VM), ("python", PythonInterpreter, PythonInterpreter)):
+        variants = (lambda sink: bare(output=sink),
+                    lambda sink: engine(output=sink),
+                    lambda sink: engine(output=sink, max_steps=HUGE, time_limit=HUGE))
+        times = []
+        for make in variants:
+            elapsed, output = min(run(make, ast) for _ in range(5))
+            outputs.add(output)
+            times.append(elapsed)
+        print(f"{label:<8} no checks {times[0] * 1000:8.1f} ms   disabled {times[1] * 1000:8.1f} ms "
+              f"({(times[1] / times[0] - 1) * 100:+5.1f}%)   enabled {times[2] * 1000:8.1f} ms "
+              f"({(times[2] / times[0] - 1) * 100:+5.1f}%)")
+    assert len(outputs) == 1, outputs
+
+
+if __name__ == "__main__":
+    main()
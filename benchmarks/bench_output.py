@@ -0,0 +1,70 @@
+# 大量 OUTPUT：对照组每条 OUTPUT 一次 print()（写到行缓冲的流，每行都刷新），
+# 新做法按块写到同一个流；另外比较截获输出：redirect_stdout 到 StringIO 和 BufferSink
+# 用法: python -m benchmarks.bench_output [N]
+import contextlib
+import io
+import os
+import sys
+import time
+
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.sinks import BufferSink, StdoutSink
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+
+code = """
+DECLARE i : INTEGER
+FOR i <- 1 TO {n}
+    OUTPUT "line", i, i * 2
+NEXT i
+"""
+
+
+class PrintOutput:
+    # 原来的做法：每条 OUTPUT 直接 print
+    def _output(self, values):
+        print(" ".join("TRUE" if v is True else "FALSE" if v is False else str(v) for v in values))
+
+
+class PrintInterpreter(PrintOutput, Interpreter):
+    pass
+
+
+class PrintClosureInterpreter(PrintOutput, ClosureInterpreter):
+    pass
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    ast = Parser(tokenize(code.format(n=n))).parse()
+    print(f"{n} OUTPUT statements")
+    for label, legacy, engine in (("tree", PrintInterpreter, Interpreter),
+                                  ("closure", PrintClosureInterpreter, ClosureInterpreter)):
+        with open(os.devnull, "w", buffering=1) as stream:     # 行缓冲，和终端一样每行都写
+            def printed():
+                with contextlib.redirect_stdout(stream):
+                    legacy().eval(ast)
+            blocks = lambda: engine(output=StdoutSink(stream)).eval(ast)
+            times = [timed(printed), timed(blocks)]
+        print(f"{label:<8} print per line  {times[0] * 1000:8.1f} ms   block sink   {times[1] * 1000:8.1f} ms")
+
+        out = io.StringIO()
+
+        def redirected():
+            with contextlib.redirect_stdout(out):
+                legacy().eval(ast)
+        sink = BufferSink()
+        times = [timed(redirected), timed(lambda: engine(output=sink).eval(ast))]
+        assert out.getvalue() == sink.getvalue()
+        print(f"{label:<8} redirect stdout {times[0] * 1000:8.1f} ms   buffer sink  {times[1] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# 解析吞吐量：在生成的大文件上测 tokenize 和 parse 的速度
+# 用法: python -m benchmarks.bench_parser [块数]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from app.evaluator.tokenizer import tokenize, tokenize_iter
+from app.parser.parser import Parser
+
+BLOCK = """
+DECLARE Total{i} : INTEGER
+DECLARE Scores{i} : ARRAY[1:10] OF INTEGER
+Total{i} <- 0
+FOR k <- 1 TO 10
+    Scores{i}[k] <- k * 3 + Total{i} - 1
+    IF Scores{i}[k] > 10 AND k < 5 OR Total{i} = 0 THEN
+        Total{i} <- Total{i} + Scores{i}[k] * 2
+    ELSE
+        Total{i} <- Total{i} - 1
+    ENDIF
+NEXT k
+WHILE Total{i} > 100
+    Total{i} <- Total{i} / 2
+ENDWHILE
+FUNCTION Scale{i}(x : INTEGER) RETURNS INTEGER
+    RETURN x * {i} + 1
+ENDFUNCTION
+OUTPUT "Total: " & Total{i}, Scale{i}(Total{i})
+"""
+
+
+@dataclass
+class LegacyToken:
+    # 原来的 Token：普通 dataclass，type 是字符串
+    type: str
+    value: str
+
+
+class LegacyParser(Parser):
+    # 旧的 parse_statement：标识符开头先整个当表达式解析一遍，再回退交给 parse_assign。
+    # 要回退，所以 token 放在 list 里按下标取
+    def __init__(self, tokens):
+        super().__init__(())
+        self.token_list = list(tokens)
+        self.seek(0)
+
+    def seek(self, pos):
+        self.pos = pos
+        self.token = self.token_list[pos] if pos < len(self.token_list) else None
+
+    def advance(self):
+        self.seek(self.pos + 1)
+
+    def parse_statement(self):
+        token = self.current()
+        if token.type in ("IDENTIFIER", "CARET"):
+            saved_pos = self.pos
+            try:
+                self.parse_expression()
+                if self.current() and self.current().type == "ASSIGN":
+                    self.seek(saved_pos)
+                    return self.parse_assign()
+                raise SyntaxError(f"Unexpected expression start: {token}")
+            except Exception:
+                self.seek(saved_pos)
+                raise SyntaxError(f"Unexpected expression start: {token}")
+        return super().parse_statement()
+
+
+def generate(blocks):
+    return "".join(BLOCK.format(i=i) for i in range(blocks))
+
+
+def bench(label, fn, repeat=3):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:8.2f} ms")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    source = generate(blocks)
+    tokens = tokenize(source)
+    lines = source.count("\n")
+    print(f"{blocks} blocks, {lines} lines, {len(source)} bytes, {len(tokens)} tokens")
+
+    elapsed = bench("tokenize", lambda: tokenize(source))
+    print(f"{'':<40} {lines / elapsed:10.0f} lines/s")
+    slotted = peak_memory(lambda: tokenize(source))
+    legacy = peak_memory(lambda: [LegacyToken(t.type, t.value) for t in tokenize_iter(source)])
+    print(f"{'token list, dataclass Token':<40} {legacy / 1e6:8.1f} MB")
+    print(f"{'token list, slotted Token':<40} {slotted / 1e6:8.1f} MB ({legacy / slotted:.2f}x smaller)")
+    legacy = bench("parse (legacy backtracking)", lambda: LegacyParser(tokens).parse())
+    elapsed = bench("parse", lambda: Parser(tokens).parse())
+    print(f"{'':<40} {lines / elapsed:10.0f} lines/s ({legacy / elapsed:.2f}x legacy)")
+
+    # 大文件：整个读进来再 tokenize 成 list vs 边读边 tokenize
+    with tempfile.NamedTemporaryFile("w", suffix=".pseudo", delete=False, encoding="utf-8") as f:
+        f.write(generate(blocks * 10))
+    try:
+        def whole():
+            with open(f.name, encoding="utf-8") as src:
+                tokenize(src.read())
+
+        def streaming():
+            with open(f.name, encoding="utf-8") as src:
+                for _ in tokenize_iter(src):
+                    pass
+
+        size = os.path.getsize(f.name) / 1e6
+        print(f"tokenize {size:.1f} MB file, peak memory")
+        print(f"{'read + tokenize() list':<40} {peak_memory(whole) / 1e6:8.1f} MB")
+        print(f"{'tokenize_iter(file)':<40} {peak_memory(streaming) / 1e6:8.1f} MB")
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# 变量读取：旧的 FrameWrapper 链（动态作用域）vs resolver 绑定的槽位
+# 用法: python -m benchmarks.bench_scopes
+import contextlib
+import io
+import time
+
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.compiler import ClosureInterpreter
+
+code = """
+DECLARE calls : INTEGER
+FUNCTION Fib(n : INTEGER) RETURNS INTEGER
+   calls <- calls + 1
+   IF n < 2 THEN
+      RETURN n
+   ENDIF
+   RETURN Fib(n - 1) + Fib(n - 2)
+ENDFUNCTION
+calls <- 0
+OUTPUT Fib(20)
+OUTPUT calls
+"""
+
+
+class LegacyFrameWrapper:
+    # 旧实现：每层调用包一层，找全局变量要一路 __contains__ + __getitem__
+    def __init__(self, local, outer):
+        self.local = local
+        self.outer = outer
+
+    def __getitem__(self, key):
+        if key in self.local:
+            return self.local[key]
+        if key in self.outer:
+            return self.outer[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.local or key in self.outer
+
+
+def bench(label, fn, repeat=5):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:8.2f} ms")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    depth = 30
+    reads = 10000
+    env = {"calls": 0}
+    for _ in range(depth):
+        env = LegacyFrameWrapper({"n": 1}, env)
+    frame = [0]
+
+    def legacy():
+        for _ in range(reads):
+            if "calls" not in env:
+                raise Exception
+            env["calls"]
+
+    def slots():
+        for _ in range(reads):
+            frame[0]
+
+    print(f"{reads} global reads at call depth {depth}")
+    bench("FrameWrapper chain", legacy)
+    bench("resolved slot", slots)
+
+    ast = Parser(tokenize(code)).parse()
+    for engine in (Interpreter, ClosureInterpreter):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                engine().eval(ast)
+        bench(f"Fib(20), {engine.__name__}", run, repeat=3)
+
+
+if __name__ == "__main__":
+    main()
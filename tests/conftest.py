@@ -0,0 +1,57 @@
+import ast as pyast
+import contextlib
+import io
+import pathlib
+
+import pytest
+
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.tokenizer import tokenize
+from app.evaluator.transpiler import PythonInterpreter
+from app.evaluator.vm import VM
+from app.parser.parser import Parser
+from app.evaluator.optimizer import optimize as optimize_program
+
+TESTS_DIR = pathlib.Path(__file__).parent
+
+# 交叉比对用的全部执行引擎
+ENGINES = (Interpreter, ClosureInterpreter, VM, PythonInterpreter)
+
+
+def parse(source):
+    return Parser(tokenize(source)).parse()
+
+
+def load_sample_programs():
+    # 收集 tests/ 下脚本里的 code = \"\"\"...\"\"\" 程序，用来交叉比对各个执行引擎
+    programs = []
+    for path in sorted(TESTS_DIR.glob("test_*.py")):
+        tree = pyast.parse(path.read_text(encoding="utf-8"))
+        for stmt in tree.body:
+            if (isinstance(stmt, pyast.Assign) and len(stmt.targets) == 1
+                    and isinstance(stmt.targets[0], pyast.Name) and stmt.targets[0].id == "code"
+                    and isinstance(stmt.value, pyast.Constant)):
+                programs.append((path.stem, stmt.value.value))
+    return programs
+
+
+def run_program(engine, code, optimize=False):
+    # 返回 (输出, 异常描述)；解析失败或运行出错都算作结果的一部分
+    out = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(out):
+        try:
+            program = parse(code)
+            if optimize:
+                program = optimize_program(program)
+            engine().eval(program)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    return out.getvalue(), error
+
+
+@pytest.fixture
+def sample_programs():
+    # 带 INPUT 的程序需要交互输入，跳过
+    return [(name, code) for name, code in load_sample_programs() if "INPUT" not in code]
@@ -0,0 +1,31 @@
+import pytest
+
+from app.evaluator.ast import Number, String, Var, annotate
+from conftest import ENGINES, parse, run_program
+
+code = """
+DECLARE r : REAL
+r <- 3.5 * 2
+OUTPUT r, 1.25 + 1, "a" & "a"
+"""
+
+def test_literals_typed_and_shared():
+    program = parse(code)
+    mul = program.statements[1].value
+    assert mul.left == Number(3.5) and type(mul.right.value) is int
+    concat = program.statements[2].values[2]
+    assert concat.left is concat.right and concat.left == String("a")
+    assert Number("7").value == 7
+
+def test_real_literals_all_engines():
+    for engine in ENGINES:
+        assert run_program(engine, code) == ("7.0 2.25 aa\n", None), engine.__name__
+
+def test_nodes_slotted():
+    node = Var("x")
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.typo = 1
+    # resolver 的标注是可写的槽位，不影响相等
+    annotate(node, scope=1, slot=0)
+    assert (node.scope, node.slot) == (1, 0) and node == Var("x")
@@ -0,0 +1,47 @@
+import pytest
+
+from app.evaluator import astcodec
+from app.evaluator.ast import ArrayType, BinaryOp, Declare, Number, Program, RepeatUntil
+from conftest import load_sample_programs, parse
+
+def test_roundtrip_samples():
+    count = 0
+    for name, code in load_sample_programs():
+        if "INPUT" in code:
+            continue
+        try:
+            program = parse(code)
+        except Exception:
+            continue
+        data = astcodec.dumps(program)
+        copy = astcodec.loads(data)
+        assert astcodec.dumps(copy) == data, name
+        count += 1
+    assert count > 10
+
+def test_values_kept():
+    program = Program([
+        Declare("A", ArrayType([-3, 0], [2 ** 70, 5], "REAL")),
+        RepeatUntil([], Number(1.5)),
+    ])
+    copy = astcodec.loads(astcodec.dumps(program))
+    assert copy.statements[0] == program.statements[0]
+    assert copy.statements[1].condition == Number(1.5)
+    assert type(copy.statements[1].condition.value) is float
+
+def test_long_chain():
+    program = parse("x <- " + " + ".join(["1"] * 5000) + "\n")
+    copy = astcodec.loads(astcodec.dumps(program))
+    node, depth = copy.statements[0].value, 0
+    while isinstance(node, BinaryOp):
+        node, depth = node.left, depth + 1
+    assert depth == 4999
+
+def test_bad_data():
+    data = astcodec.dumps(parse("x <- 1\n"))
+    with pytest.raises(astcodec.ASTFormatError, match="Not a serialized AST"):
+        astcodec.loads(b"garbage")
+    with pytest.raises(astcodec.ASTFormatError, match="version"):
+        astcodec.loads(astcodec.MAGIC + bytes([astcodec.FORMAT_VERSION + 1]) + data[len(astcodec.MAGIC) + 1:])
+    with pytest.raises(astcodec.ASTFormatError):
+        astcodec.loads(data[:-3])
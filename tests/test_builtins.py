@@ -0,0 +1,91 @@
+import contextlib
+import datetime
+import io
+
+from app.evaluator.ast import *
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.library import LIBRARY, lookup
+from app.evaluator.resolver import resolve_program
+from app.evaluator.transpiler import transpile
+
+from conftest import ENGINES, parse, run_program
+
+code = """
+DECLARE s : STRING
+DECLARE d : DATE
+DECLARE n : INTEGER
+s <- "Hello World"
+d <- "2024-02-29"
+OUTPUT LEFT(s, 5), right(s, 5), MID(s, 7, 3), LENGTH(s)
+OUTPUT TO_UPPER(s), to_lower(s), UCASE("a"), LCASE("B")
+OUTPUT ASC("A"), CHR(97), NUM_TO_STR(12) & "!", NUM_TO_STR(2.5)
+OUTPUT STR_TO_NUM("42") + 1, STR_TO_NUM(" 2.5 "), IS_NUM("1e3"), IS_NUM("abc")
+n <- 0 - 7
+OUTPUT DIV(17, 5), MOD(17, 5), DIV(n, 2), MOD(n, 2), INT(3.9)
+OUTPUT ROUND(2.675, 2), ROUND(2.5, 0), ROUND(n / 2, 0), ROUND(1234, n + 5)
+OUTPUT DAY(d), MONTH(d), YEAR(d)
+n <- 0
+WHILE IS_NUM(LEFT("123x", n + 1))
+    n <- n + 1
+ENDWHILE
+OUTPUT n
+"""
+
+
+def test_engines_agree():
+    expected = ("Hello World Wor 11\n"
+                "HELLO WORLD hello world A b\n"
+                "65 a 12! 2.5\n"
+                "43 2.5 TRUE FALSE\n"
+                "3 2 -4 1 3\n"
+                "2.68 3.0 -4.0 1200.0\n"
+                "29 2 2024\n"
+                "3\n", None)
+    for engine in ENGINES:
+        assert run_program(engine, code) == expected, engine.__name__
+
+
+def test_seeded_rand():
+    source = "FOR i <- 1 TO 5\n    OUTPUT RAND(100)\nNEXT i\n"
+    runs = {engine.__name__: [] for engine in ENGINES}
+    for engine in ENGINES:
+        for seed in (7, 7, 8):
+            interpreter = engine(seed=seed)
+            runs[engine.__name__].append(run_with(interpreter, source))
+    first = runs["Interpreter"]
+    assert first[0] == first[1] != first[2]
+    assert all(values == first for values in runs.values())
+    # 每个解释器有自己的随机数发生器，互不影响
+    a, b = Interpreter(seed=1), Interpreter(seed=1)
+    assert a.builtins["RAND"](1) == b.builtins["RAND"](1)
+    a.builtins["RAND"](1)
+    assert a.rng.getstate() != b.rng.getstate()
+
+
+def run_with(interpreter, source):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        interpreter.eval(parse(source))
+    return out.getvalue()
+
+
+def test_errors():
+    for engine in ENGINES:
+        assert run_program(engine, 'OUTPUT LEFT("abc")\n')[1] == "TypeError: LEFT expects 2 arguments, got 1", \
+            engine.__name__
+        assert run_program(engine, 'OUTPUT STR_TO_NUM("x1")\n')[1] == "ValueError: STR_TO_NUM: 'x1' is not a number", \
+            engine.__name__
+        assert run_program(engine, "OUTPUT ASC(65)\n")[1] == "TypeError: ASC expects a single character", \
+            engine.__name__
+
+
+def test_resolved_per_call_site():
+    program = parse("OUTPUT to_upper(\"a\"), Foo(1), NOW()\n")
+    resolve_program(program)
+    assert [node.builtin for node in walk(program) if isinstance(node, Call)].count(False) == 1
+    assert lookup("to_upper") is LIBRARY["TO_UPPER"]
+    assert isinstance(Interpreter().builtins["NOW"](), datetime.date)
+    # 翻译出来的 Python 只绑定用到的内建函数
+    source = transpile(parse('DECLARE _fn_LEFT : STRING\nOUTPUT LEFT("ab", 1)\n'))
+    assert "_fn_LEFT = rt.builtins['LEFT']" in source
+    assert "_fn_RIGHT" not in source
@@ -0,0 +1,84 @@
+import os
+
+from app.parser import cache
+from app.parser.cache import ASTCache
+from app.parser.parser import Parser
+
+code = """DECLARE total : INTEGER
+total <- 0
+FOR i <- 1 TO 3
+    total <- total + i
+NEXT i
+OUTPUT total
+"""
+
+def write(tmp_path, text, name="prog.pseudo"):
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+def entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(cache.SUFFIX))
+
+def test_hit_skips_parsing(tmp_path, monkeypatch):
+    filename = write(tmp_path, code)
+    first = cache.load_program(filename)
+    assert len(entries(tmp_path / cache.CACHE_DIR_NAME)) == 1
+
+    def fail(self):
+        raise AssertionError("parsed again")
+    monkeypatch.setattr(Parser, "parse", fail)
+    assert cache.load_program(filename) == first
+
+def test_changed_source_misses(tmp_path):
+    filename = write(tmp_path, code)
+    cache.load_program(filename)
+    write(tmp_path, code.replace("1 TO 3", "1 TO 4"))
+    program = cache.load_program(filename)
+    assert program.statements[2].end.value == 4
+    assert len(entries(tmp_path / cache.CACHE_DIR_NAME)) == 2
+
+def test_corrupt_entry_is_reparsed(tmp_path):
+    filename = write(tmp_path, code.replace("\n", "\r\n"))
+    store = ASTCache(str(tmp_path / "c"))
+    expected = store.load(filename)
+    [name] = entries(store.directory)
+    (tmp_path / "c" / name).write_bytes(b"garbage")
+    assert store.load(filename) == expected
+    assert store.get(name[:-len(cache.SUFFIX)]) == expected
+
+def test_lru_eviction(tmp_path):
+    store = ASTCache(str(tmp_path / "c"))
+    files = [write(tmp_path, code + f"OUTPUT {i}\n", f"p{i}.pseudo") for i in range(3)]
+    keys = [store.key(open(f, "rb").read()) for f in files]
+    store.load(files[0])
+    store.load(files[1])
+    store.max_bytes = sum(os.path.getsize(store.path(key)) for key in keys[:2]) + 10  # 只放得下两个
+    for key in keys[:2]:
+        os.utime(store.path(key), (1, 1))
+    store.load(files[0])      # 命中，p0 变成最近使用
+    store.load(files[2])      # 超出上限，淘汰最久没用的 p1
+    assert os.path.exists(store.path(keys[0])) and os.path.exists(store.path(keys[2]))
+    assert not os.path.exists(store.path(keys[1]))
+    assert not any(name.endswith(".tmp") for name in os.listdir(store.directory))
+
+def test_unwritable_cache_dir(tmp_path):
+    # 缓存目录的位置上是个文件：不缓存，照常解析
+    filename = write(tmp_path, code)
+    blocker = write(tmp_path, "", "not-a-dir")
+    program = cache.load_program(filename, cache_dir=blocker)
+    assert program == Parser(cache.tokenizer.tokenize(code)).parse()
+    assert cache.load_program(filename, cache_dir=os.path.join(blocker, "sub")) == program
+
+def test_bom_source_hits(tmp_path, monkeypatch):
+    # 存盘的 key 和查找用的 key 必须是同一个，BOM 文件第二次也要命中
+    filename = write(tmp_path, "\ufeff" + code)
+    store = ASTCache(str(tmp_path / "c"))
+    first = store.load(filename)
+    assert first == Parser(cache.tokenizer.tokenize(code)).parse()
+    assert entries(store.directory) == [store.key(open(filename, "rb").read()) + cache.SUFFIX]
+
+    def fail(self):
+        raise AssertionError("parsed again")
+    monkeypatch.setattr(Parser, "parse", fail)
+    assert store.load(filename) == first
@@ -0,0 +1,70 @@
+from app.evaluator.ast import *
+from app.evaluator.cases import build_case_table
+
+from conftest import ENGINES, parse, run_program
+
+code = """
+DECLARE i : INTEGER
+DECLARE lim : INTEGER
+DECLARE s : STRING
+lim <- 4
+FOR i <- 0 TO 10
+    CASE OF i
+        3: OUTPUT i, "three"
+        1 TO 5: OUTPUT i, "low"
+        7 TO 9: OUTPUT i, "mid"
+        8: OUTPUT i, "never"
+        9 TO 7: OUTPUT i, "empty"
+    OTHERWISE
+        OUTPUT i, "other"
+    ENDCASE
+NEXT i
+FOR i <- 2 TO 6
+    CASE OF i
+        3: OUTPUT i, "three"
+        lim TO 5: OUTPUT i, "var range"
+    ENDCASE
+NEXT i
+s <- "m"
+CASE OF s
+    "a" TO "f": OUTPUT "a-f"
+    1 TO 9: OUTPUT "digit"
+    "g" TO "z":
+        s <- "assigned"
+        OUTPUT s
+ENDCASE
+"""
+
+
+def test_case_engines():
+    expected = ("0 other\n1 low\n2 low\n3 three\n4 low\n5 low\n6 other\n7 mid\n8 mid\n9 mid\n10 other\n"
+                "3 three\n4 var range\n5 var range\nassigned\n", None)
+    for engine in ENGINES:
+        assert run_program(engine, code) == expected, engine.__name__
+
+
+def test_case_table_lookup():
+    labels = [Number(3), CaseRange(Number(1), Number(5)), CaseRange(Number(7), Number(9)),
+              Number(8), CaseRange(Number(4.5), Number(20)), String("x")]
+    table = build_case_table(labels)
+    # 先出现的分支优先，范围包含两端，数字和字符串互不匹配
+    assert [table.lookup(v) for v in (0, 1, 3, 4.6, 5, 6, 7, 8, 9, 9.5, 20, 21, "x", "3")] == \
+        [None, 1, 0, 1, 1, 4, 2, 2, 2, 4, 4, None, 5, None]
+    assert table.lookup({"a": 1}) is None
+    # 有变量标签就不建表
+    assert build_case_table([Number(1), Var("n")]) is None
+    assert build_case_table([CaseRange(Number(1), String("z"))]) is None
+
+
+def test_identifier_labels_and_assignments():
+    program = parse("""
+CASE OF x
+    y: z <- 1
+       w <- 2
+    y TO z:
+       OUTPUT 1
+ENDCASE
+""")
+    case = program.statements[0]
+    assert [label for label, _ in case.cases] == [Var("y"), CaseRange(Var("y"), Var("z"))]
+    assert [type(stmt) for stmt in case.cases[0][1]] == [Assign, Assign]
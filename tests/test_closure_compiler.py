@@ -0,0 +1,33 @@
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.compiler import ClosureInterpreter
+from conftest import run_program
+
+code = """
+FUNCTION Fact(n : INTEGER) RETURNS INTEGER
+   IF n = 0 THEN
+      RETURN 1
+   ELSE
+      RETURN n * Fact(n - 1)
+   ENDIF
+ENDFUNCTION
+
+DECLARE i : INTEGER
+DECLARE total : INTEGER
+total <- 0
+FOR i <- 1 TO 10
+    total <- total + Fact(i)
+NEXT i
+OUTPUT total
+CASE OF total
+    1: OUTPUT "one"
+ENDCASE
+"""
+
+def test_closure_compiler():
+    output, error = run_program(ClosureInterpreter, code)
+    assert error is None
+    assert output == "4037913\n"
+
+def test_closure_matches_tree(sample_programs):
+    for name, source in sample_programs:
+        assert run_program(ClosureInterpreter, source) == run_program(Interpreter, source), name
@@ -0,0 +1,118 @@
+import dataclasses
+
+from app.evaluator.ast import *
+from app.evaluator.bytecode import INDEX_STORE, compile_program
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.converters import converter, to_date
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.resolver import resolve_program
+from app.evaluator.vm import VM
+
+from conftest import ENGINES, parse, run_program
+
+code = """
+DECLARE A : ARRAY[1:3] OF INTEGER
+DECLARE R : ARRAY[1:3] OF REAL
+DECLARE i : INTEGER
+DECLARE x : INTEGER
+DECLARE y : REAL
+DECLARE s : STRING
+DECLARE c : CHAR
+DECLARE ok : BOOLEAN
+x <- 7
+y <- x
+FOR i <- 1 TO 3
+    A[i] <- x + i * 2
+    R[i] <- A[i] / 2
+NEXT i
+s <- "n=" & x
+c <- "z"
+ok <- x > 3 AND y < 10
+x <- y * 2
+OUTPUT x, y, s, c, ok, A[3], R[1]
+"""
+
+
+def exact_stores(program):
+    if isinstance(program, str):
+        program = parse(program)
+    resolve_program(program)
+    return [exact for _, exact in sorted((node.line, node.exact) for node in walk(program) if isinstance(node, Assign))]
+
+
+def test_engines_agree():
+    expected = ("14 7.0 n=7 z TRUE 13 4.5\n", None)
+    for engine in ENGINES:
+        assert run_program(engine, code) == expected, engine.__name__
+
+
+def test_exact_stores():
+    # 按行：x <- 7, y <- x, A[i] <- ..., R[i] <- ..., s, c, ok, x <- y * 2
+    assert exact_stores(code) == [True, False, True, True, True, True, True, False]
+    # 循环变量的步长是 REAL、作为 BYREF 实参、被取过地址、形参：读出来的类型都不确定
+    program = parse("""
+DECLARE i : INTEGER
+DECLARE j : INTEGER
+DECLARE k : INTEGER
+DECLARE m : INTEGER
+DECLARE p : ^INTEGER
+DECLARE t : INTEGER
+FUNCTION F(v : INTEGER, w : INTEGER) RETURNS INTEGER
+    t <- w
+    RETURN v
+ENDFUNCTION
+FOR i <- 1 TO 2 STEP 0.5
+    t <- i
+NEXT i
+t <- F(j, 1) + j
+p <- ^k
+t <- k
+t <- m
+""")
+    # 语法里还没有 BYREF，直接把形参换成按引用的
+    func = program.statements[6]
+    program.statements[6] = dataclasses.replace(func, params=[dataclasses.replace(func.params[0], byref=True),
+                                                             func.params[1]])
+    assert exact_stores(program) == [False, False, False, False, False, True]
+
+
+def test_converter_per_binding():
+    # 转换函数跟着绑定走：过程里同名的局部 INTEGER 不影响全局的 STRING，形参按自己的类型转换
+    source = """DECLARE x : STRING
+DECLARE y : REAL
+PROCEDURE P(y : INTEGER)
+    DECLARE x : INTEGER
+    x <- 3
+    y <- y + 0.5
+    OUTPUT y
+ENDPROCEDURE
+CALL P(2)
+x <- "h"
+y <- 2
+OUTPUT x, y
+"""
+    for engine in ENGINES:
+        assert run_program(engine, source) == ("2\nh 2.0\n", None), engine.__name__
+
+
+def test_vm_exact_array_stores():
+    # 数组元素的 exact 赋值在字节码里也不转换
+    program = parse("DECLARE A : ARRAY[1:2] OF INTEGER\nDECLARE R : ARRAY[1:2] OF REAL\nA[1] <- 3\nR[2] <- A[1]\n")
+    stores = [arg for op, arg in compile_program(program).instructions if op == INDEX_STORE]
+    assert [(name, exact) for _, _, _, name, exact in stores] == [("A", True), ("R", False)]
+    assert run_program(VM, code) == run_program(Interpreter, code)
+
+
+def test_skipped_conversion_keeps_errors():
+    # CHAR 的默认值 "" 本身通不过检查，复制时照样报错
+    source = "DECLARE a : CHAR\nDECLARE b : CHAR\nb <- a\n"
+    for engine in (Interpreter, ClosureInterpreter, VM):
+        assert run_program(engine, source)[1] == "TypeError: CHAR must be a single character string", engine.__name__
+
+
+def test_converters():
+    assert converter("INTEGER") is int
+    assert converter("Point") is None
+    assert converter(ArrayType([1], [3], "INTEGER")) is None
+    assert str(to_date("2024-02-29")) == "2024-02-29"
+    assert to_date(to_date("2024-02-29")) == to_date(" 2024-02-29 ")
@@ -0,0 +1,59 @@
+import array
+
+from app.evaluator.arrays import PseudoArray
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.vm import VM
+from conftest import ENGINES, run_program
+
+code = """
+DECLARE Grid : ARRAY[0:2, 1:3] OF INTEGER
+DECLARE Flags : ARRAY[1:2] OF BOOLEAN
+DECLARE r : INTEGER
+DECLARE c : INTEGER
+FOR r <- 0 TO 2
+    FOR c <- 1 TO 3
+        Grid[r, c] <- c + r * 10
+    NEXT c
+NEXT r
+Flags[2] <- TRUE
+OUTPUT Grid[2, 3], Grid[0, 1]
+OUTPUT Flags[1], Flags[2]
+OUTPUT Grid[3, 1]
+"""
+
+def test_dense_array():
+    for engine in (Interpreter, ClosureInterpreter, VM):
+        output, error = run_program(engine, code)
+        assert output == "23 1\nFALSE TRUE\n", engine.__name__
+        assert error == "Exception: Index 3 out of bounds for dimension 1 of array 'Grid'", engine.__name__
+
+def test_real_indices():
+    # / 的结果总是 REAL：整数值的当整数下标用，不是整数的报错
+    source = """DECLARE A : ARRAY[1:3] OF INTEGER
+DECLARE B : ARRAY[1:2, 1:2] OF STRING
+DECLARE C : ARRAY[1:2, 1:2, 1:2] OF INTEGER
+A[4 / 2] <- 7
+B[2 / 2, 6 / 3] <- "x"
+C[2 / 1, 1, 4 / 2] <- 5
+OUTPUT A[2.0], A[6 / 3], B[1, 2], B[1.0, 4 / 2], C[2, 1.0, 2]
+OUTPUT A[5 / 2]
+"""
+    for engine in ENGINES:
+        assert run_program(engine, source) == (
+            "7 7 x x 5\n", "Exception: Index 2.5 is not a whole number for dimension 1 of array 'A'"), engine.__name__
+
+def test_layout():
+    grid = PseudoArray("Grid", [0, 1], [2, 3], "INTEGER", 0)
+    assert isinstance(grid.data, array.array) and len(grid) == 9
+    assert grid.strides == [3, 1]
+    grid.set2(1, 2, 7)
+    assert grid.offset((1, 2)) == 4 and grid.data[4] == 7
+    assert grid.get((1, 2)) == 7
+
+    # 超出 64 位的整数放不进 array.array，退回 list
+    grid.set((2, 3), 2 ** 70)
+    assert isinstance(grid.data, list) and grid.get2(2, 3) == 2 ** 70 and grid.get2(1, 2) == 7
+
+    names = PseudoArray("Names", [1], [2], "STRING", "")
+    assert names.data == ["", ""]
@@ -0,0 +1,21 @@
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.ast import *
+
+class Tagged(Number):
+    pass
+
+def test_dispatch():
+    interpreter = Interpreter()
+    assert interpreter.eval(BinaryOp(Number("2"), "*", Number("21"))) == 42
+    # 子类沿 MRO 解析到父类的处理方法，并缓存
+    assert interpreter.eval(Tagged("7")) == 7
+    assert Tagged in interpreter._handlers
+    try:
+        interpreter.eval(object())
+    except Exception as e:
+        assert "Unknown node type" in str(e)
+    else:
+        raise AssertionError("expected unknown node type error")
+
+if __name__ == "__main__":
+    test_dispatch()
@@ -0,0 +1,68 @@
+import pytest
+
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.feeds import FileFeed, InputExhausted, LinesFeed, MmapFeed
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.sinks import BufferSink
+from app.evaluator.vm import VM
+
+from conftest import ENGINES, parse
+
+program = parse("""
+DECLARE n : INTEGER
+DECLARE total : REAL
+DECLARE x : REAL
+DECLARE name : STRING
+INPUT name
+INPUT n
+total <- 0
+FOR i <- 1 TO n
+    INPUT x
+    total <- total + x
+NEXT i
+OUTPUT name, total
+""")
+
+
+def run(engine, feed, **options):
+    sink = BufferSink()
+    engine(output=sink, input=feed, **options).eval(program)
+    return sink.getvalue()
+
+
+def test_scripted_lines():
+    for engine in ENGINES:
+        assert run(engine, LinesFeed(["Ann\n", "3", "1.5\r\n", "2", "0.5"])) == "Ann 4.0\n", engine.__name__
+        assert run(engine, LinesFeed("Bob\n1\n2\n")) == "Bob 2.0\n", engine.__name__
+
+
+def test_prompts():
+    # 非交互的 feed 要提示时，提示和读到的值一起记进输出
+    text = run(Interpreter, LinesFeed("Ann\n1\n2\n"), prompts=True)
+    assert text == ("Enter value for name: Ann\nEnter value for n: 1\n"
+                    "Enter value for x: 2\nAnn 2.0\n")
+
+
+def test_exhausted():
+    for engine in ENGINES:
+        with pytest.raises(InputExhausted, match=r"No input left for 'x' \(after 3 lines\)"):
+            run(engine, LinesFeed(["Ann", "3", "1"]))
+    with pytest.raises(ValueError, match="Invalid input for INTEGER"):
+        run(VM, LinesFeed(["Ann", "three"]))
+
+
+def test_files(tmp_path):
+    path = tmp_path / "vector.txt"
+    path.write_text("Cy\n2\n10\n20", encoding="utf-8")
+    feed = MmapFeed(str(path))
+    for engine in ENGINES:
+        feed.rewind()
+        assert run(engine, feed) == "Cy 30.0\n", engine.__name__
+    feed.close()
+    feed = FileFeed(str(path))
+    assert run(ClosureInterpreter, feed) == "Cy 30.0\n"
+    feed.close()
+    empty = tmp_path / "empty.txt"
+    empty.write_text("", encoding="utf-8")
+    with pytest.raises(InputExhausted, match="'name' \\(after 0 lines\\)"):
+        run(Interpreter, MmapFeed(str(empty)))
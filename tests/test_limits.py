@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.limits import ExecutionLimitExceeded
+from app.evaluator.sinks import BufferSink
+from app.evaluator.transpiler import transpile
+from app.evaluator.vm import VM
+
+from conftest import ENGINES, parse
+
+
+def run_limited(engine, program, **limits):
+    # 返回 (输出, 超限时的错误信息)
+    sink = BufferSink()
+    try:
+        engine(output=sink, **limits).eval(program)
+    except ExecutionLimitExceeded as e:
+        return sink.getvalue(), str(e), e.line
+    return sink.getvalue(), None, None
+
+
+loops = parse("""DECLARE i : INTEGER
+DECLARE n : INTEGER
+FUNCTION Twice(x : INTEGER) RETURNS INTEGER
+    RETURN x * 2
+ENDFUNCTION
+n <- 0
+FOR i <- 1 TO 3
+    n <- n + Twice(i)
+NEXT i
+OUTPUT n
+REPEAT
+    n <- n - 1
+UNTIL n < 10
+OUTPUT n
+WHILE n > 0
+    OUTPUT n
+ENDWHILE
+""")
+
+
+def test_same_stop_on_every_engine():
+    # FOR 3 轮 + 3 次调用 + REPEAT 2 次回边，WHILE 第 5 轮之后的回边超出
+    expected = ("12\n9\n" + "9\n" * 5, "Step limit of 12 exceeded at line 15", 15)
+    for engine in ENGINES:
+        assert run_limited(engine, loops, max_steps=12) == expected, engine.__name__
+    # 在调用处超出：报被调用的函数所在行
+    for engine in ENGINES:
+        assert run_limited(engine, loops, max_steps=2)[1:] == ("Step limit of 2 exceeded at line 3", 3), \
+            engine.__name__
+
+
+def test_deadline():
+    program = parse("DECLARE i : INTEGER\ni <- 0\nREPEAT\n    i <- i + 1\nUNTIL i < 0\n")
+    for engine in ENGINES:
+        start = time.perf_counter()
+        assert run_limited(engine, program, time_limit=0.05)[1:] == ("Time limit of 0.05s exceeded at line 3", 3)
+        assert time.perf_counter() - start < 2, engine.__name__
+
+
+def test_budget_per_run():
+    program = parse("FOR i <- 1 TO 5\n    OUTPUT i\nNEXT i\n")
+    for engine in ENGINES:
+        sink = BufferSink()
+        interpreter = engine(output=sink, max_steps=5)
+        interpreter.eval(program)
+        interpreter.eval(program)
+        assert sink.getvalue() == "1\n2\n3\n4\n5\n" * 2, engine.__name__
+
+
+def test_disabled_by_default():
+    assert Interpreter()._tick is None and VM().limits is None
+    assert "_tick(" not in transpile(loops)
+    assert "_tick(15)" in transpile(loops, ticks=True)
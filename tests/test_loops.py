@@ -0,0 +1,129 @@
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.loops import analyze_loop
+from app.evaluator.resolver import resolve_program
+
+from conftest import ENGINES, parse, run_program
+
+
+def assert_same(code, expected):
+    for engine in ENGINES:
+        assert run_program(engine, code) == expected, engine.__name__
+
+
+def test_step():
+    code = """
+DECLARE i : INTEGER
+DECLARE x : REAL
+FOR i <- 10 TO 1 STEP -3
+    OUTPUT i
+NEXT i
+FOR i <- 1 TO 10 STEP 4
+    OUTPUT i
+NEXT i
+FOR i <- 5 TO 1
+    OUTPUT "never"
+NEXT i
+FOR x <- 0 TO 1 STEP 0.25
+    OUTPUT x
+NEXT x
+FOR i <- 1 TO 3 STEP -1 + 2
+    OUTPUT i
+NEXT i
+"""
+    assert_same(code, ("10\n7\n4\n1\n1\n5\n9\n0\n0.25\n0.5\n0.75\n1.0\n1\n2\n3\n", None))
+    assert_same("FOR i <- 1 TO 3 STEP 0\n    OUTPUT i\nNEXT i\n",
+                ("", "Exception: FOR loop STEP cannot be 0"))
+
+
+def loop_info(code, index=-1):
+    program = parse(code)
+    resolve_program(program)
+    return analyze_loop(program.statements[index], set())
+
+
+def test_invariants():
+    info = loop_info("""
+DECLARE n : INTEGER
+DECLARE i : INTEGER
+DECLARE s : STRING
+FOR i <- 1 TO 10
+    OUTPUT n * 2 + i, LENGTH(s & "x"), i * 2, RAND(n)
+NEXT i
+""")
+    found = sorted(repr(node) for node in info.invariants)
+    assert found == ["BinaryOp(left=Var(name='n'), operator='*', right=Number(value=2))",
+                     "Call(name='LENGTH', args=[BinaryOp(left=Var(name='s'), operator='&', right=String(value='x'))])"]
+    # 循环里调用了用户过程就不分析
+    assert loop_info("""
+PROCEDURE P()
+ENDPROCEDURE
+WHILE TRUE
+    CALL P()
+ENDWHILE
+""") is None
+
+
+def test_bounds_checks():
+    info = loop_info("""
+DECLARE A : ARRAY[1:3, 1:3] OF INTEGER
+DECLARE r : INTEGER
+DECLARE c : INTEGER
+FOR c <- 1 TO 3
+    A[r, c] <- A[c, r] + A[c, c] + A[r + 1, c - 1]
+NEXT c
+""")
+    # A[c, c] 两个下标都是循环变量，A[r + 1, c - 1] 的下标不是循环变量本身，都不做
+    checks = sorted((position, repr(node.indices[1 - position])) for node, position, _ in info.checks)
+    assert checks == [(0, "Var(name='r')"), (1, "Var(name='r')")]
+    # 改了循环变量的循环不做
+    assert loop_info("""
+DECLARE A : ARRAY[1:3] OF INTEGER
+DECLARE c : INTEGER
+FOR c <- 1 TO 3
+    A[c] <- 1
+    c <- c + 1
+NEXT c
+""").checks == []
+
+
+def test_optimized_loops_match():
+    code = """
+DECLARE Grid : ARRAY[0:3, 2:5] OF INTEGER
+DECLARE Flags : ARRAY[1:4] OF BOOLEAN
+DECLARE r : INTEGER
+DECLARE c : INTEGER
+DECLARE n : INTEGER
+DECLARE total : INTEGER
+n <- 2
+FOR r <- 0 TO 3
+    FOR c <- 5 TO 2 STEP -1
+        Grid[r, c] <- r * 10 + c + n * 3
+    NEXT c
+    Flags[r + 1] <- r > 1
+NEXT r
+total <- 0
+FOR r <- 3 TO 0 STEP -1
+    n <- n + 1
+    FOR c <- 2 TO 5
+        total <- total + Grid[r, c] * n
+    NEXT c
+NEXT r
+FOR c <- 1 TO 4
+    OUTPUT Flags[c]
+NEXT c
+OUTPUT total
+c <- 0
+WHILE c < 3
+    c <- c + 1
+    IF c > 10 THEN
+        OUTPUT total / (n - n)
+    ENDIF
+ENDWHILE
+FOR c <- 1 TO 5
+    OUTPUT Grid[c, 2]
+NEXT c
+"""
+    expected = run_program(Interpreter, code)
+    assert expected[1] == "Exception: Index 4 out of bounds for dimension 1 of array 'Grid'"
+    assert expected[0] == "FALSE\nFALSE\nTRUE\nTRUE\n1564\n18\n28\n38\n"
+    assert_same(code, expected)
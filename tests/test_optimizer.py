@@ -0,0 +1,73 @@
+from app.evaluator.ast import *
+from app.evaluator.optimizer import optimize
+from app.evaluator.sinks import BufferSink
+
+from conftest import ENGINES, parse, run_program
+
+
+def test_same_output_as_unoptimized(sample_programs):
+    for name, code in sample_programs:
+        for engine in ENGINES:
+            assert run_program(engine, code, optimize=True) == run_program(engine, code), (name, engine.__name__)
+
+
+def test_constant_folding():
+    program = optimize(parse('x <- 2 * 3 + 4\nOUTPUT "a" & 1, NOT TRUE, 10 / 0, x + 1\n'))
+    assign, output = program.statements
+    assert assign.value == Number(10)
+    folded, negated, division, addition = output.values
+    assert folded == String("a1")
+    assert negated == Boolean(False)
+    # 运行时才报错的运算原样保留
+    assert division == BinaryOp(Number(10), "/", Number(0))
+    assert addition == BinaryOp(Var("x"), "+", Number(1))
+
+
+def test_true_false_become_constants():
+    program = optimize(parse("flag <- true\nWHILE FALSE\n  OUTPUT flag\nENDWHILE\n"))
+    assign, loop = program.statements
+    assert assign.target == Var("flag")
+    assert assign.value == Boolean(True)
+    assert loop.condition == Boolean(False)
+
+
+def test_dead_if_is_flattened():
+    program = optimize(parse(
+        "IF 1 > 2 THEN\n  OUTPUT 1\nELSE\n  IF TRUE THEN\n    OUTPUT 2\n    OUTPUT 3\n  ENDIF\nENDIF\n"
+        "IF FALSE THEN\n  OUTPUT 4\nENDIF\nOUTPUT 5\n"))
+    assert program.statements == [Output([Number(2)]), Output([Number(3)]), Output([Number(5)])]
+
+
+def test_dead_if_with_declare_is_kept():
+    # 过程里丢掉的分支声明了 x，x 就是局部变量，去掉 IF 会改变 x 指向哪个变量
+    code = """
+x <- 1
+PROCEDURE P()
+    IF FALSE THEN
+        DECLARE x : INTEGER
+    ENDIF
+    x <- 2
+ENDPROCEDURE
+CALL P()
+OUTPUT x
+"""
+    program = optimize(parse(code))
+    assert isinstance(program.statements[1].body[0], If)
+    for engine in ENGINES:
+        assert run_program(engine, code, optimize=True) == run_program(engine, code), engine.__name__
+
+
+def test_long_chain_does_not_recurse():
+    program = optimize(parse("OUTPUT " + " + ".join(["1"] * 20000) + "\n"))
+    assert program.statements[0].values == [Number(20000)]
+
+
+def test_original_still_runs_after_optimize():
+    # 优化结果不和原程序共用节点：原程序的槽位标注不会被优化后的程序覆盖
+    source = "IF FALSE THEN\n    OUTPUT z\nENDIF\nFOR i <- 1 TO 3\n    OUTPUT i\nNEXT i\n"
+    for engine in ENGINES:
+        program = parse(source)
+        sink = BufferSink()
+        for ast in (program, optimize(program), program):
+            engine(output=sink).eval(ast)
+        assert sink.getvalue() == "1\n2\n3\n" * 3, engine.__name__
@@ -0,0 +1,39 @@
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.ast import BinaryOp, UnaryOp, Var
+from conftest import ENGINES, run_program
+
+code = """
+DECLARE a : INTEGER
+DECLARE flag : BOOLEAN
+a <- 10
+flag <- FALSE
+OUTPUT a - 3 - 2
+OUTPUT 2 + 3 * 4, (2 + 3) * 4, a / 5 * 2
+OUTPUT "x" & 1 + 2
+OUTPUT NOT flag AND a > 3 * 3, 1 + 2 = 3 OR flag
+"""
+
+def parse_expr(text):
+    return Parser(tokenize(text)).parse_expression()
+
+def test_shape():
+    # a - b - c 是左结合的 (a - b) - c
+    tree = parse_expr("a - b - c")
+    assert tree == BinaryOp(BinaryOp(Var("a"), "-", Var("b")), "-", Var("c"))
+    # NOT 只作用于紧跟的操作数，AND 比 OR 先结合
+    tree = parse_expr("NOT a AND b OR c")
+    assert tree == BinaryOp(BinaryOp(UnaryOp("NOT", Var("a")), "AND", Var("b")), "OR", Var("c"))
+
+def test_precedence():
+    for engine in ENGINES:
+        output, error = run_program(engine, code)
+        assert error is None, engine.__name__
+        assert output == "5\n14 20 4.0\nx3\nTRUE TRUE\n", engine.__name__
+
+def test_long_chain():
+    # 很长的运算链不会撞上递归上限
+    chain = " + ".join(["1"] * 5000)
+    for engine in ENGINES:
+        output, error = run_program(engine, f"OUTPUT {chain} - 1\n")
+        assert (output, error) == ("4999\n", None), engine.__name__
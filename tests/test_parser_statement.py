@@ -0,0 +1,36 @@
+import pytest
+
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.ast import Assign, ArrayAccess, Dereference, FieldAccess, BinaryOp
+
+from conftest import parse
+
+code = """
+DECLARE A : ARRAY[1:3] OF INTEGER
+A[2] <- A[1] + 1
+"""
+
+def test_assignment_targets():
+    program = parse(code + "s.name <- \"x\"\np^ <- 3\n")
+    targets = [stmt.target for stmt in program.statements if isinstance(stmt, Assign)]
+    assert isinstance(targets[0], ArrayAccess)
+    assert isinstance(targets[1], FieldAccess)
+    assert isinstance(targets[2], Dereference)
+    assert isinstance(program.statements[1].value, BinaryOp)
+
+def test_parsed_once():
+    # 赋值语句只解析一遍：右边的表达式只从顶层进一次 parse_expression
+    calls = []
+    parser = Parser(tokenize("x <- a + b\n"))
+    original = parser.parse_expression
+    parser.parse_expression = lambda *args: calls.append(args) or original(*args)
+    parser.parse()
+    assert calls.count(()) == 1
+
+def test_error_messages():
+    # 语法错误指出具体位置，不再统一成 "Unexpected expression start"
+    with pytest.raises(SyntaxError, match="Unexpected end of expression"):
+        parse("x <- 1 +\n")
+    with pytest.raises(SyntaxError, match="Expected '<-'"):
+        parse("x 5\n")
@@ -0,0 +1,69 @@
+import dataclasses
+
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.vm import VM
+from app.evaluator.resolver import LOCAL, GLOBAL, REF, resolve_program
+from conftest import run_program
+
+code = """
+DECLARE x : INTEGER
+DECLARE p : ^INTEGER
+
+PROCEDURE Show()
+   OUTPUT x
+ENDPROCEDURE
+
+PROCEDURE Shadow(n : INTEGER)
+   DECLARE x : INTEGER
+   x <- n
+   CALL Show()
+ENDPROCEDURE
+
+x <- 1
+CALL Shadow(5)
+p <- ^x
+p^ <- 9
+OUTPUT x, p^
+"""
+
+def test_lexical_scope():
+    # Show 看到的是全局 x，不是调用者 Shadow 里的局部 x
+    for engine in (Interpreter, ClosureInterpreter, VM):
+        output, error = run_program(engine, code)
+        assert error is None, engine.__name__
+        assert output == "1\n9 9\n", engine.__name__
+
+def test_bindings():
+    program = resolve_program(Parser(tokenize(code)).parse())
+    assert program.global_names == ["x", "p"]
+    shadow = program.statements[3]
+    assert shadow.nlocals == 2
+    declare, assign = shadow.body[0], shadow.body[1]
+    assert (declare.scope, declare.slot) == (LOCAL, 1)
+    assert (assign.value.scope, assign.value.slot) == (LOCAL, 0)
+    show = program.statements[2]
+    assert (show.body[0].values[0].scope, show.body[0].values[0].slot) == (GLOBAL, 0)
+
+def test_byref():
+    program = Parser(tokenize("""
+FUNCTION Bump(n : INTEGER) RETURNS INTEGER
+   n <- n + 1
+   RETURN n
+ENDFUNCTION
+DECLARE v : INTEGER
+v <- 41
+OUTPUT Bump(v), v
+""")).parse()
+    # 语法里还没有 BYREF，直接把形参换成按引用的
+    func = program.statements[0]
+    program.statements[0] = dataclasses.replace(func, params=[dataclasses.replace(func.params[0], byref=True)])
+    for engine in (Interpreter, ClosureInterpreter):
+        outputs = []
+        interpreter = engine()
+        interpreter._output = outputs.append
+        interpreter.eval(program)
+        assert outputs == [[42, 42]], engine.__name__
+    assert program.statements[0].body[0].value.left.scope == REF
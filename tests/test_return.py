@@ -0,0 +1,49 @@
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.vm import VM
+from conftest import run_program
+
+code = """
+FUNCTION FirstOver(limit : INTEGER) RETURNS INTEGER
+   DECLARE i : INTEGER
+   DECLARE j : INTEGER
+   FOR i <- 1 TO 10
+      j <- 0
+      WHILE j < 10
+         j <- j + 1
+         REPEAT
+            CASE OF j
+               3: IF limit < i * j THEN
+                     RETURN i * j
+                  ENDIF
+            ENDCASE
+         UNTIL TRUE
+      ENDWHILE
+   NEXT i
+   RETURN 0
+ENDFUNCTION
+
+PROCEDURE Early(n : INTEGER)
+   IF n > 0 THEN
+      RETURN
+   ENDIF
+   OUTPUT "not positive"
+ENDPROCEDURE
+
+OUTPUT FirstOver(10)
+CALL Early(1)
+CALL Early(0)
+OUTPUT FirstOver(100)
+"""
+
+def test_return_unwinds_blocks():
+    for engine in (Interpreter, ClosureInterpreter, VM):
+        output, error = run_program(engine, code)
+        assert error is None, engine.__name__
+        assert output == "12\nnot positive\n0\n", engine.__name__
+
+def test_top_level_return():
+    for engine in (Interpreter, ClosureInterpreter, VM):
+        output, error = run_program(engine, 'OUTPUT "a"\nRETURN 1\nOUTPUT "b"\n')
+        assert output == "a\n", engine.__name__
+        assert error == "Exception: RETURN outside of a FUNCTION or PROCEDURE", engine.__name__
@@ -0,0 +1,77 @@
+from app.evaluator.compiler import ClosureInterpreter
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.ropes import LEAF, Rope, concat
+from app.evaluator.vm import VM
+
+from conftest import ENGINES, run_program
+
+code = """
+DECLARE s : STRING
+DECLARE r : STRING
+DECLARE rle : STRING
+DECLARE i : INTEGER
+DECLARE run : INTEGER
+PROCEDURE Show(t : STRING)
+    OUTPUT LENGTH(t), LEFT(t, 6), RIGHT(t, 6)
+ENDPROCEDURE
+s <- ""
+FOR i <- 1 TO 600
+    IF MOD(i, 7) = 0 THEN
+        s <- s & "b"
+    ELSE
+        s <- s & "a"
+    ENDIF
+NEXT i
+r <- ""
+FOR i <- 1 TO LENGTH(s)
+    r <- MID(s, i, 1) & r
+NEXT i
+rle <- ""
+run <- 1
+FOR i <- 2 TO LENGTH(r) + 1
+    IF i <= LENGTH(r) AND MID(r, i, 1) = MID(r, i - 1, 1) THEN
+        run <- run + 1
+    ELSE
+        rle <- rle & run & MID(r, i - 1, 1)
+        run <- 1
+    ENDIF
+NEXT i
+OUTPUT LENGTH(s), LENGTH(r), LENGTH(rle), LEFT(rle, 12)
+OUTPUT s = r, s < r & "z", r & "" = r, TO_UPPER(MID(s, 590, 11))
+CALL Show(s & s)
+"""
+
+
+def test_engines_agree():
+    expected = ("600 600 342 5a1b6a1b6a1b\n"
+                "FALSE TRUE TRUE AAAAABAAAAA\n"
+                "1200 aaaaaa baaaaa\n", None)
+    for engine in ENGINES:
+        assert run_program(engine, code) == expected, engine.__name__
+
+
+def test_concat():
+    assert concat("a", 1) == "a1" and type(concat(True, "x")) is str
+    short = "x" * LEAF
+    rope = concat(short, "y")
+    assert type(rope) is Rope and len(rope) == LEAF + 1
+    assert rope == short + "y" and "y" + short != rope and hash(rope) == hash(short + "y")
+    assert f"{rope:>{LEAF + 2}}" == " " + short + "y"
+    # 逐个字符往两头拼：短串并进叶子，LENGTH 不用拼成整串
+    value = rope
+    for k in range(100_000):
+        value = concat(value, "ab") if k % 2 else concat("c", value)
+    assert len(value) == LEAF + 1 + 150_000 and value.flat is None
+    flat = str(value)
+    assert flat == "c" * 50_000 + short + "y" + "ab" * 50_000 and value.flat is flat
+    # 拼好的节点照样能再接
+    assert str(concat(value, "!")) == flat + "!"
+    assert str(concat(rope, rope)) == 2 * (short + "y")
+
+
+def test_conversions_keep_errors():
+    long_digits = "1" * (LEAF + 1)
+    assert int(concat(long_digits, "2")) == int(long_digits + "2")
+    source = f'DECLARE n : INTEGER\nDECLARE ok : BOOLEAN\nn <- "{long_digits}" & "7"\nOUTPUT MOD(n, 10)\nok <- "{long_digits}" & "x"\n'
+    for engine in (Interpreter, ClosureInterpreter, VM):
+        assert run_program(engine, source) == ("7\n", "TypeError: Invalid BOOLEAN string"), engine.__name__
@@ -0,0 +1,63 @@
+from app.evaluator import astcodec
+from app.evaluator.ast import *
+from app.evaluator.optimizer import optimize
+from app.evaluator.shortcircuit import find_hazards, report
+
+from conftest import ENGINES, parse, run_program
+
+code = """
+DECLARE A : ARRAY[1:3] OF INTEGER
+DECLARE i : INTEGER
+DECLARE calls : INTEGER
+FUNCTION Touch(x : INTEGER) RETURNS BOOLEAN
+    calls <- calls + 1
+    RETURN x > 0
+ENDFUNCTION
+calls <- 0
+A[1] <- 4
+A[2] <- 5
+A[3] <- 6
+i <- 1
+WHILE i <= 3 AND A[i] <> 100
+    i <- i + 1
+ENDWHILE
+OUTPUT i
+OUTPUT FALSE AND Touch(1), TRUE OR Touch(1), calls
+OUTPUT TRUE AND Touch(1), FALSE OR Touch(0), calls
+OUTPUT i > 3 OR A[i] = 0 AND Touch(1), 1 = 1 AND 2 = 2 AND 3 = 4 AND Touch(1), calls
+"""
+
+
+def test_short_circuit_engines():
+    expected = ("4\nFALSE TRUE 0\nTRUE FALSE 2\nTRUE FALSE 2\n", None)
+    for engine in ENGINES:
+        assert run_program(engine, code) == expected, engine.__name__
+        assert run_program(engine, code, optimize=True) == expected, engine.__name__
+
+
+def test_optimizer_folds_decided_left_side():
+    program = optimize(parse("OUTPUT FALSE AND Touch(1), TRUE OR Touch(1), x AND FALSE\n"))
+    assert program.statements[0].values == [Boolean(False), Boolean(True),
+                                            BinaryOp(Var("x"), "AND", Boolean(False))]
+
+
+def test_hazard_report():
+    program = parse(code)
+    hazards = find_hazards(program)
+    assert [(h.line, h.operator, h.calls) for h in hazards] == \
+        [(18, "AND", ["Touch"]), (18, "OR", ["Touch"]), (19, "AND", ["Touch"]), (19, "OR", ["Touch"]),
+         (20, "OR", ["Touch"]), (20, "AND", ["Touch"])]
+    assert hazards[4].text == "i > 3 OR A[i] = 0 AND Touch(1)"
+    text = report(parse("FUNCTION F(n : INTEGER) RETURNS BOOLEAN\n"
+                       "    RETURN n > 0 OR RAND(2) > 1\nENDFUNCTION\n"))
+    assert text == ("line 2, in F: n > 0 OR RAND(2) > 1\n"
+                    "    calls RAND only when the left side of OR is FALSE")
+    assert report(parse("OUTPUT a AND LENGTH(s) > 1\n")).startswith("No AND / OR")
+
+
+def test_statement_lines_survive_codec():
+    program = parse(code)
+    decoded = astcodec.loads(astcodec.dumps(program))
+    assert [stmt.line for stmt in decoded.statements] == [stmt.line for stmt in program.statements]
+    assert decoded.statements[3].line == 5
+    assert decoded.statements[3].body[0].line == 6
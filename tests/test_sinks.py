@@ -0,0 +1,68 @@
+import io
+import threading
+
+import pytest
+
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.sinks import BufferSink, CallbackSink, FileSink, OutputLimitExceeded, StdoutSink
+from app.evaluator.vm import VM
+
+from conftest import ENGINES, parse
+
+
+def test_buffer_per_interpreter():
+    program = parse("FOR i <- 1 TO 3\n    OUTPUT i, i > 1, \"x\" & i\nNEXT i\n")
+    for engine in ENGINES:
+        sink = BufferSink()
+        engine(output=sink).eval(program)
+        assert sink.getvalue() == "1 FALSE x1\n2 TRUE x2\n3 TRUE x3\n", engine.__name__
+
+
+def test_threads_capture_separately():
+    sinks = [BufferSink() for _ in range(8)]
+
+    def run(k):
+        program = parse(f"FOR i <- 1 TO 2000\n    OUTPUT {k}\nNEXT i\n")
+        ENGINES[k % len(ENGINES)](output=sinks[k]).eval(program)
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(len(sinks))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for k, sink in enumerate(sinks):
+        assert sink.getvalue() == f"{k}\n" * 2000
+
+
+def test_flush_policies():
+    program = parse("FOR i <- 1 TO 4\n    OUTPUT \"abc\"\nNEXT i\n")
+    for policy, chunks in (("line", ["abc\n"] * 4), ("block", ["abc\nabc\nabc\n", "abc\n"]), ("end", ["abc\n" * 4])):
+        calls = []
+        Interpreter(output=CallbackSink(calls.append, flush=policy, buffer_size=10)).eval(program)
+        assert calls == chunks, policy
+
+
+def test_limit_keeps_earlier_output():
+    program = parse("FOR i <- 1 TO 10\n    OUTPUT \"héllo\"\nNEXT i\n")
+    for engine in ENGINES:
+        sink = BufferSink(limit=20)
+        with pytest.raises(OutputLimitExceeded, match="Output limit of 20 bytes exceeded"):
+            engine(output=sink).eval(program)
+        # 每行 7 个字节（é 占两个）
+        assert sink.getvalue() == "héllo\n" * 2, engine.__name__
+
+
+def test_flushed_on_error(tmp_path):
+    path = tmp_path / "out.txt"
+    sink = FileSink(str(path), flush="end")
+    with pytest.raises(Exception, match="Division by zero|division by zero"):
+        VM(output=sink).eval(parse("OUTPUT 1\nOUTPUT 2 / 0\n"))
+    sink.close()
+    assert path.read_text(encoding="utf-8") == "1\n"
+
+
+def test_default_stdout_is_line_buffered(capsys):
+    # 直接 eval 单个语句没有“程序结束”的 flush，默认的标准输出 sink 要每行都写出去
+    Interpreter().eval(parse("OUTPUT 1, \"a\"\n").statements[0])
+    assert capsys.readouterr().out == "1 a\n"
+    assert StdoutSink().flush_policy == "line" and FileSink(io.StringIO()).flush_policy == "block"
@@ -0,0 +1,43 @@
+import io
+
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.tokenizer import tokenize, tokenize_iter
+from app.parser.parser import Parser
+
+code = """DECLARE s : STRING // 注释
+s <- "http://example.com"
+OUTPUT s
+"""
+
+def pairs(tokens):
+    return [(t.type, t.value) for t in tokens]
+
+def test_comment_inside_string_kept():
+    values = [t.value for t in tokenize(code)]
+    assert '"http://example.com"' in values
+    assert "注释" not in " ".join(map(str, values))
+
+def test_lines_and_crlf():
+    expected = pairs(tokenize(code))
+    assert pairs(tokenize_iter(code.splitlines(keepends=True))) == expected
+    assert pairs(tokenize(code.replace("\n", "\r\n"))) == expected
+
+def test_parser_accepts_stream(capsys):
+    # 从文件对象边读边解析，结果和一次性 tokenize 一样
+    program = Parser(tokenize_iter(io.StringIO(code))).parse()
+    Interpreter().eval(program)
+    assert capsys.readouterr().out.strip() == "http://example.com"
+
+def test_kinds_and_positions():
+    from app.evaluator.tokenizer import KEYWORD, IDENTIFIER, KW_DECLARE, KW_STRING
+    tokens = tokenize(code)
+    declare, name, _, type_ = tokens[:4]
+    assert (declare.kind, declare.kw) == (KEYWORD, KW_DECLARE)
+    assert (name.kind, name.line, name.col) == (IDENTIFIER, 1, 9)
+    assert type_.kw == KW_STRING and type_.type == "KEYWORD"
+    assert (tokens[4].line, tokens[4].col) == (2, 1)
+
+def test_syntax_error_position():
+    import pytest
+    with pytest.raises(SyntaxError, match="got OUTPUT at line 2, column 10"):
+        Parser(tokenize("x <- 1\nIF x > 0 OUTPUT x\nENDIF\n")).parse()
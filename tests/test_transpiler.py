@@ -0,0 +1,72 @@
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.transpiler import PythonInterpreter, TranspileError, transpile
+from conftest import run_program
+
+code = """
+FUNCTION Sum(n : INTEGER) RETURNS INTEGER
+   IF n = 0 THEN
+      RETURN 0
+   ENDIF
+   RETURN n + Sum(n - 1)
+ENDFUNCTION
+
+PROCEDURE Bump(k : INTEGER)
+   total <- total + k
+ENDPROCEDURE
+
+PROCEDURE Tally(n : INTEGER)
+   FOR j <- 1 TO n
+      total <- total + 1
+   NEXT j
+ENDPROCEDURE
+
+DECLARE A : ARRAY[1:3, 1:2] OF INTEGER
+DECLARE i : INTEGER
+DECLARE total : INTEGER
+total <- 0
+FOR i <- 1 TO 3
+    A[i, 2] <- i * i
+    CALL Bump(A[i, 2])
+NEXT i
+OUTPUT A[3, 2], total, Sum(10)
+FOR j <- 1 TO 3
+    CALL Tally(2)
+    OUTPUT j
+NEXT j
+OUTPUT total
+OUTPUT A[i + 1, 1]
+"""
+
+def test_transpiler():
+    source = transpile(Parser(tokenize(code)).parse())
+    assert "for i in _for_range(1, 3):" in source
+    assert "def Sum(n):" in source
+    assert "nonlocal _depth, total" in source
+    output, error = run_program(PythonInterpreter, code)
+    assert output == "9 14 55\n1\n2\n3\n20\n"
+    # 越界检查和 ArrayAccess 的报错一样
+    assert error == "Exception: Index 4 out of bounds for dimension 1 of array 'A'"
+    assert run_program(Interpreter, code) == (output, error)
+
+def test_transpiler_matches_tree(sample_programs):
+    for name, source in sample_programs:
+        try:
+            program = Parser(tokenize(source)).parse()
+        except Exception:
+            program = None  # 解析失败时两边报同样的错
+        try:
+            if program is not None:
+                transpile(program)
+        except TranspileError:
+            continue  # 指针等不支持翻译的程序
+        assert run_program(PythonInterpreter, source) == run_program(Interpreter, source), name
+
+def test_assign_before_declare():
+    # 给没声明过的变量赋值和其他引擎一样报错；前面一定已经声明过的就不生成检查
+    for source in ("y <- 5\nOUTPUT y\n", "IF FALSE THEN\n  DECLARE y : INTEGER\nENDIF\ny <- 5\n",
+                   "PROCEDURE P()\n  z <- 1\nENDPROCEDURE\nCALL P()\n"):
+        assert run_program(PythonInterpreter, source) == run_program(Interpreter, source), source
+        assert run_program(PythonInterpreter, source)[1].endswith("used before declaration.")
+    assert "_undeclared('y')" not in transpile(Parser(tokenize("DECLARE y : INTEGER\ny <- 5\n")).parse())
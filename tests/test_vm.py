@@ -0,0 +1,64 @@
+from app.evaluator.tokenizer import tokenize
+from app.parser.parser import Parser
+from app.evaluator.interpreter import Interpreter
+from app.evaluator.vm import VM
+from app.evaluator.bytecode import compile_program, disassemble
+from conftest import ENGINES, run_program
+
+code = """
+FUNCTION Sum(n : INTEGER) RETURNS INTEGER
+   IF n = 0 THEN
+      RETURN 0
+   ENDIF
+   RETURN n + Sum(n - 1)
+ENDFUNCTION
+
+DECLARE A : ARRAY[1:3] OF INTEGER
+DECLARE i : INTEGER
+FOR i <- 1 TO 3
+    A[i] <- i * i
+NEXT i
+OUTPUT A[3]
+OUTPUT Sum(100)
+"""
+
+# 树遍历在这个深度会 RecursionError，VM 用自己的帧栈
+deep_code = code.replace("Sum(100)", "Sum(3000)")
+
+def test_vm():
+    output, error = run_program(VM, code)
+    assert error is None
+    assert output == "9\n5050\n"
+    output, error = run_program(VM, deep_code)
+    assert error is None
+    assert output == "9\n4501500\n"
+
+def test_disassemble():
+    listing = disassemble(compile_program(Parser(tokenize(code)).parse()))
+    assert "Disassembly of MODULE <module>" in listing
+    assert "Disassembly of FUNCTION Sum" in listing
+    assert "FOR_ITER" in listing and "RETURN_VALUE" in listing
+
+def test_vm_matches_tree(sample_programs):
+    for name, source in sample_programs:
+        assert run_program(VM, source) == run_program(Interpreter, source), name
+
+def test_deep_recursion():
+    # 10^5 层递归，不需要 sys.setrecursionlimit
+    output, error = run_program(VM, code.replace("Sum(100)", "Sum(100000)"))
+    assert error is None
+    assert output == "9\n5000050000\n"
+
+def test_stack_overflow():
+    for engine in ENGINES:
+        output, error = run_program(lambda: engine(max_depth=50), code)
+        assert output == "9\n"
+        assert error == "StackOverflow: Stack overflow: more than 50 nested calls (in 'Sum')"
+    # 其他引擎先撞上 Python 的递归上限，同样报成 StackOverflow，带上层数、过程名和 max_depth
+    for engine in ENGINES:
+        if engine is not VM:
+            output, error = run_program(engine, code.replace("Sum(100)", "Sum(100000)"))
+            assert error.startswith("StackOverflow: Stack overflow: Python's recursion limit reached after "), \
+                engine.__name__
+            assert error.endswith("nested calls (in 'Sum'), before max_depth 200000 "
+                                  "(the vm engine keeps calls on its own stack)"), engine.__name__